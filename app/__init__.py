@@ -1,18 +1,62 @@
-"""Initialize Flask app with SQLAlchemy and Flask-Migrate.
+"""Flask app factory with SQLAlchemy and Flask-Migrate.
 
-Creates a Flask app instance, configures it using 'config.py',
-sets up SQLAlchemy for database operations, and configures Flask-Migrate.
+`create_app` builds a Flask app configured from 'config.py', binds the
+shared SQLAlchemy and Flask-Migrate extensions to it with the configured
+connection pool and read replicas, creates the caches and the optional
+group commit writer, installs the JSON provider, installs the request metrics
+and opt-in profiling, registers the outbox relay command and mounts the order
+routes. Each process, e.g. each
+pre-forked server worker, creates its own app, so database connections are
+never shared across a fork.
 """
 
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
+from app.replicas import RoutingSession
 
-app = Flask(__name__)
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+migrate = Migrate()
 
-app.config.from_pyfile('config.py')
 
-db = SQLAlchemy(app)
-migrate = Migrate(app, db)
+def create_app(config=None):
+    """
+    Creates and configures an app instance.
 
-from app import routes
+    Args:
+    - config (dict or None): Settings overriding those read from 'config.py'.
+
+    Returns:
+    - Flask: The configured app.
+    """
+    # pylint: disable=import-outside-toplevel
+    from app.cache import init_cache
+    from app.group_commit import init_group_commit
+    from app.idempotency import init_idempotency
+    from app.json_provider import init_json
+    from app.metrics import init_metrics
+    from app.outbox import init_outbox
+    from app.pool import engine_options
+    from app.profiling import init_profiling
+    from app.replicas import init_replicas
+    from app.routes import bp
+
+    app = Flask(__name__)
+    app.config.from_pyfile('config.py')
+    if config:
+        app.config.update(config)
+    init_json(app)
+
+    init_replicas(app)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+    db.init_app(app)
+    migrate.init_app(app, db)
+    init_cache(app)
+    init_group_commit(app)
+    init_idempotency(app)
+    init_outbox(app)
+    init_metrics(app)
+    init_profiling(app)
+
+    app.register_blueprint(bp)
+    return app
@@ -0,0 +1,166 @@
+"""
+The 'cache' module provides the caches used for serialized single-order
+lookups, order statistics and idempotency keys.
+
+Backends implement the small `CacheBackend` interface, so the default
+in-process LRU cache can be swapped for a shared store such as Redis by adding a
+class with the same methods and selecting it in `create_cache`.
+"""
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+
+
+class CacheBackend:
+    """
+    Interface of the order cache backends.
+
+    Values are never None, so `get` returns None to signal a miss.
+    """
+
+    def get(self, key):
+        """Returns the value cached under `key`, or None on a miss."""
+        raise NotImplementedError
+
+    def set(self, key, value):
+        """Caches `value` under `key`."""
+        raise NotImplementedError
+
+    def delete(self, key):
+        """Removes `key` from the cache if present."""
+        raise NotImplementedError
+
+    def clear(self):
+        """Removes every entry from the cache."""
+        raise NotImplementedError
+
+    def stats(self):
+        """Returns a dict of counters describing the cache."""
+        raise NotImplementedError
+
+
+class NullCache(CacheBackend):
+    """Backend that caches nothing, used when caching is disabled."""
+
+    def __init__(self):
+        self.misses = 0
+
+    def get(self, key):
+        self.misses += 1
+
+    def set(self, key, value):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def clear(self):
+        pass
+
+    def stats(self):
+        return {'backend': 'none', 'hits': 0, 'misses': self.misses,
+                'evictions': 0, 'expirations': 0, 'size': 0, 'max_size': 0}
+
+
+class LRUCache(CacheBackend):
+    """
+    Thread-safe in-process cache bounded in size and entry age.
+
+    When full, the least recently used entry is evicted. Entries older than
+    `ttl` seconds are treated as misses and dropped when next read.
+    """
+
+    def __init__(self, max_size, ttl, clock=time.monotonic):
+        """
+        Args:
+        - max_size (int): Maximum number of entries.
+        - ttl (float): Seconds an entry stays valid after being set.
+        - clock (callable): Source of monotonic time, in seconds.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= self.clock():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (self.clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'backend': 'memory', 'hits': self.hits, 'misses': self.misses,
+                    'evictions': self.evictions, 'expirations': self.expirations,
+                    'size': len(self._entries), 'max_size': self.max_size}
+
+
+def create_cache(config, prefix='ORDER_CACHE'):
+    """
+    Builds the cache selected by the `<prefix>_BACKEND` setting.
+
+    Args:
+    - config (dict): Flask app configuration.
+    - prefix (str): Prefix of the cache's `_BACKEND`, `_MAX_SIZE` and `_TTL`
+      settings.
+
+    Returns:
+    - CacheBackend: `LRUCache` for 'memory', `NullCache` for 'none'.
+
+    Raises:
+    - ValueError: If the backend name is unknown.
+    """
+    backend = config.get(f'{prefix}_BACKEND', 'memory')
+    if backend == 'memory':
+        return LRUCache(config[f'{prefix}_MAX_SIZE'], config[f'{prefix}_TTL'])
+    if backend == 'none':
+        return NullCache()
+    raise ValueError(f"Unknown {prefix}_BACKEND '{backend}'")
+
+
+def init_cache(app):
+    """Creates the order and order statistics caches of `app` from its configuration."""
+    app.extensions['order_cache'] = create_cache(app.config)
+    app.extensions['order_stats_cache'] = create_cache(app.config, 'ORDER_STATS_CACHE')
+
+
+def get_order_cache():
+    """Returns the order cache of the current app."""
+    return current_app.extensions['order_cache']
+
+
+def get_order_stats_cache():
+    """Returns the order statistics cache of the current app."""
+    return current_app.extensions['order_stats_cache']
@@ -13,3 +13,92 @@ else:
     SQLALCHEMY_DATABASE_URI = os.environ.get('SQLALCHEMY_DATABASE_URI')
 
 SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+# Connection pool, turned into SQLALCHEMY_ENGINE_OPTIONS by the app factory.
+# Size it to at least the request threads of a server worker
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+# Seconds a request waits for a connection before failing
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 30))
+# Seconds after which connections are replaced, below server-side idle limits
+DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+
+# Read replicas: comma-separated database URIs serving the reads of GET requests
+DB_REPLICA_URIS = [uri.strip() for uri in os.environ.get('DB_REPLICA_URIS', '').split(',')
+                   if uri.strip()]
+# Seconds a client keeps reading from the primary after a write
+DB_REPLICA_STICKY_SECONDS = int(os.environ.get('DB_REPLICA_STICKY_SECONDS', 5))
+# Seconds a replica is skipped after failing a statement
+DB_REPLICA_RETRY_SECONDS = float(os.environ.get('DB_REPLICA_RETRY_SECONDS', 30))
+
+# Maximum number of IDs bound into a single IN (...) clause when batch loading
+IN_CLAUSE_CHUNK_SIZE = int(os.environ.get('IN_CLAUSE_CHUNK_SIZE', 500))
+
+# Keyset pagination of order listings (?limit=&cursor=)
+ORDERS_PAGE_DEFAULT_LIMIT = int(os.environ.get('ORDERS_PAGE_DEFAULT_LIMIT', 100))
+ORDERS_PAGE_MAX_LIMIT = int(os.environ.get('ORDERS_PAGE_MAX_LIMIT', 1000))
+
+# Orders fetched per round-trip when streaming GET /orders as NDJSON
+ORDERS_STREAM_BATCH_SIZE = int(os.environ.get('ORDERS_STREAM_BATCH_SIZE', 1000))
+
+# Group commit of POST /orders: creations arriving within GROUP_COMMIT_MAX_DELAY_MS
+# of the first one waiting are written by a writer thread in one transaction of
+# up to GROUP_COMMIT_MAX_BATCH orders; callers withdraw orders still queued after
+# GROUP_COMMIT_TIMEOUT s
+GROUP_COMMIT_ENABLED = os.environ.get('GROUP_COMMIT_ENABLED', 'false').lower() in (
+    '1', 'true', 'yes')
+GROUP_COMMIT_MAX_BATCH = int(os.environ.get('GROUP_COMMIT_MAX_BATCH', 100))
+GROUP_COMMIT_MAX_DELAY_MS = float(os.environ.get('GROUP_COMMIT_MAX_DELAY_MS', 5))
+GROUP_COMMIT_TIMEOUT = float(os.environ.get('GROUP_COMMIT_TIMEOUT', 30))
+
+# Orders written per transaction by POST /orders/bulk
+BULK_INSERT_CHUNK_SIZE = int(os.environ.get('BULK_INSERT_CHUNK_SIZE', 1000))
+
+# Cache of serialized orders for GET /orders/<id>: 'memory' (LRU) or 'none'
+ORDER_CACHE_BACKEND = os.environ.get('ORDER_CACHE_BACKEND', 'memory')
+ORDER_CACHE_MAX_SIZE = int(os.environ.get('ORDER_CACHE_MAX_SIZE', 10000))
+ORDER_CACHE_TTL = float(os.environ.get('ORDER_CACHE_TTL', 30))
+
+# Cache of GET /orders/stats results, kept briefly so dashboard refreshes
+# share one set of aggregation queries
+ORDER_STATS_CACHE_BACKEND = os.environ.get('ORDER_STATS_CACHE_BACKEND', 'memory')
+ORDER_STATS_CACHE_MAX_SIZE = int(os.environ.get('ORDER_STATS_CACHE_MAX_SIZE', 256))
+ORDER_STATS_CACHE_TTL = float(os.environ.get('ORDER_STATS_CACHE_TTL', 10))
+
+# Idempotency-Key support of POST /orders: keys are honoured for IDEMPOTENCY_KEY_TTL
+# seconds; with IDEMPOTENCY_SWEEP_INTERVAL > 0 each process deletes expired keys
+# every that many seconds, otherwise run `flask idempotency-sweep` periodically
+IDEMPOTENCY_KEY_TTL = int(os.environ.get('IDEMPOTENCY_KEY_TTL', 86400))
+IDEMPOTENCY_SWEEP_INTERVAL = float(os.environ.get('IDEMPOTENCY_SWEEP_INTERVAL', 0))
+IDEMPOTENCY_SWEEP_BATCH_SIZE = int(os.environ.get('IDEMPOTENCY_SWEEP_BATCH_SIZE', 1000))
+
+# Cache of stored idempotency keys in front of the idempotency_keys table
+IDEMPOTENCY_CACHE_BACKEND = os.environ.get('IDEMPOTENCY_CACHE_BACKEND', 'memory')
+IDEMPOTENCY_CACHE_MAX_SIZE = int(os.environ.get('IDEMPOTENCY_CACHE_MAX_SIZE', 10000))
+IDEMPOTENCY_CACHE_TTL = float(os.environ.get('IDEMPOTENCY_CACHE_TTL', 300))
+
+# Age below which GET /orders/changes holds changes back, so transactions that
+# are still committing are not skipped
+CHANGES_FEED_LAG_SECONDS = float(os.environ.get('CHANGES_FEED_LAG_SECONDS', 2))
+
+# Delivery of order events by `flask outbox-relay`: sink is 'ndjson' or 'queue'
+OUTBOX_SINK = os.environ.get('OUTBOX_SINK', 'ndjson')
+OUTBOX_NDJSON_PATH = os.environ.get('OUTBOX_NDJSON_PATH', 'order-events.ndjson')
+OUTBOX_BATCH_SIZE = int(os.environ.get('OUTBOX_BATCH_SIZE', 100))
+OUTBOX_POLL_INTERVAL = float(os.environ.get('OUTBOX_POLL_INTERVAL', 1))
+
+# Published order events are kept OUTBOX_RETENTION seconds, then deleted by the
+# idle relay or `flask outbox-purge`; 0 keeps them until `outbox-purge --older-than`
+OUTBOX_RETENTION = float(os.environ.get('OUTBOX_RETENTION', 7 * 86400))
+OUTBOX_PURGE_BATCH_SIZE = int(os.environ.get('OUTBOX_PURGE_BATCH_SIZE', 1000))
+
+# Opt-in request profiling: requests sending PROFILING_HEADER, and a
+# PROFILING_SAMPLE_RATE share of the others, run under cProfile; those taking
+# PROFILING_SLOW_MS or longer are dumped to PROFILING_DIR
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+PROFILING_HEADER = os.environ.get('PROFILING_HEADER', 'X-Profile')
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', 0))
+PROFILING_SLOW_MS = float(os.environ.get('PROFILING_SLOW_MS', 500))
+PROFILING_DIR = os.environ.get('PROFILING_DIR', 'profiles')
+PROFILING_MAX_FILES = int(os.environ.get('PROFILING_MAX_FILES', 50))
@@ -0,0 +1,201 @@
+"""
+The 'group_commit' module coalesces concurrent order creations into shared transactions.
+
+With `GROUP_COMMIT_ENABLED` set, `OrderService.create_new_order` hands each
+order to the app's `GroupCommitWriter` instead of committing it itself. A
+writer thread takes the first waiting order, gathers the orders arriving
+within the next `GROUP_COMMIT_MAX_DELAY_MS`, up to `GROUP_COMMIT_MAX_BATCH`,
+and writes them with one multi-row INSERT per table and a single commit, so
+one fsync serves the whole batch. Each caller waits for its own order ID or
+error; a caller giving up after `GROUP_COMMIT_TIMEOUT` cancels its order
+unless the writer already took it, in which case it waits for the outcome.
+
+If a batch fails, its orders are retried one transaction each, so an
+invalid order only fails its own caller. Each process, e.g. each server
+worker, has its own writer, started on the first order it receives.
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from flask import current_app
+from app import db
+from app.cache import get_order_cache
+
+
+class GroupCommitWriter:
+    """
+    Writes the orders submitted from many threads in batches, one transaction each.
+    """
+
+    def __init__(self, app, max_batch_size=100, max_delay=0.005):
+        """
+        Args:
+        - app (Flask): Application whose database receives the orders.
+        - max_batch_size (int): Maximum orders written per transaction.
+        - max_delay (float): Seconds the writer waits after the first order
+          of a batch for more orders to join it.
+        """
+        self.app = app
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._batches = 0
+        self._orders = 0
+        self._largest_batch = 0
+
+    def submit(self, order_data, idempotency=None):
+        """
+        Queues an order for the next batch, starting the writer if needed.
+
+        Args:
+        - order_data (dict): Validated order payload, as for `create_new_order`.
+        - idempotency (tuple or None): `(key, request_hash)` to store with the order.
+
+        Returns:
+        - Future: Resolves to the ID of the created order, or raises the
+          error that prevented its creation.
+        """
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self.run, name='group-commit-writer', daemon=True
+                )
+                self._thread.start()
+        future = Future()
+        self._queue.put((order_data, idempotency, future))
+        return future
+
+    def stop(self, timeout=None):
+        """Stops the writer thread once the orders queued before the call are written."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout)
+
+    def run(self):
+        """
+        Writes batches until stopped.
+
+        Each order is claimed by marking its future running as it is taken
+        from the queue; orders whose caller already gave up and cancelled
+        their future are dropped instead.
+        """
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first] if first[2].set_running_or_notify_cancel() else []
+            deadline = time.monotonic() + self.max_delay
+            stopping = False
+            while len(batch) < self.max_batch_size:
+                try:
+                    entry = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if entry is None:
+                    stopping = True
+                    break
+                if entry[2].set_running_or_notify_cancel():
+                    batch.append(entry)
+            if not batch:
+                if stopping:
+                    return
+                continue
+            try:
+                self.write_batch(batch)
+            except Exception as exception:
+                logging.exception("Error writing a group commit batch: %s", str(exception))
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(exception)
+            if stopping:
+                return
+
+    def write_batch(self, batch):
+        """
+        Creates the orders of a batch and resolves their futures.
+
+        Args:
+        - batch (list): `(order_data, idempotency, future)` tuples.
+        """
+        # pylint: disable=import-outside-toplevel
+        from app.services import OrderService
+
+        service = OrderService()
+        with self.app.app_context():
+            try:
+                order_ids = service._insert_orders(  # pylint: disable=protected-access
+                    [order_data for order_data, _, _ in batch],
+                    [idempotency for _, idempotency, _ in batch]
+                )
+                db.session.commit()
+            except Exception as exception:
+                db.session.rollback()
+                logging.warning("Group commit of %d orders failed, writing them one by one: %s",
+                                len(batch), str(exception))
+                order_ids = [self._write_one(service, *entry) for entry in batch]
+            else:
+                for (_, _, future), order_id in zip(batch, order_ids):
+                    future.set_result(order_id)
+            finally:
+                db.session.remove()
+            # IDs of deleted orders can be reused, e.g. by SQLite
+            for order_id in order_ids:
+                if order_id is not None:
+                    get_order_cache().delete(order_id)
+
+        with self._lock:
+            self._batches += 1
+            self._orders += len(batch)
+            self._largest_batch = max(self._largest_batch, len(batch))
+
+    @staticmethod
+    def _write_one(service, order_data, idempotency, future):
+        """Creates one order in its own transaction and resolves its future."""
+        try:
+            order_id = service._insert_orders(  # pylint: disable=protected-access
+                [order_data], [idempotency]
+            )[0]
+            db.session.commit()
+        except Exception as exception:
+            db.session.rollback()
+            future.set_exception(exception)
+            return None
+        future.set_result(order_id)
+        return order_id
+
+    def stats(self):
+        """
+        Reports the work done so far.
+
+        Returns:
+        - dict: Number of `batches` committed and `orders` written, the
+          `largest_batch` and the number of orders `queued` right now.
+        """
+        with self._lock:
+            return {
+                'batches': self._batches,
+                'orders': self._orders,
+                'largest_batch': self._largest_batch,
+                'queued': self._queue.qsize(),
+            }
+
+
+def init_group_commit(app):
+    """Creates the group commit writer of `app` if `GROUP_COMMIT_ENABLED` is set."""
+    if app.config['GROUP_COMMIT_ENABLED']:
+        app.extensions['group_commit'] = GroupCommitWriter(
+            app,
+            max_batch_size=app.config['GROUP_COMMIT_MAX_BATCH'],
+            max_delay=app.config['GROUP_COMMIT_MAX_DELAY_MS'] / 1000
+        )
+
+
+def get_group_commit_writer():
+    """Returns the group commit writer of the current app, or None if it is disabled."""
+    return current_app.extensions.get('group_commit')
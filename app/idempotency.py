@@ -0,0 +1,223 @@
+"""
+The 'idempotency' module lets clients safely retry POST /orders with an `Idempotency-Key` header.
+
+The key of a successful creation is stored in the `idempotency_keys` table in
+the same transaction as the order, together with a hash of the request body
+and the new order's ID. A request repeating a stored key gets the original
+response back, marked `Idempotent-Replayed: true`, without being validated
+or touching the order tables. A key reused for a different body is refused.
+When two requests with the same key race, the unique index lets only one of
+them commit, and the other replays its response.
+
+Keys are looked up through an in-process cache in front of the table and
+honoured for `IDEMPOTENCY_KEY_TTL` seconds. Expired keys are deleted by
+`flask idempotency-sweep`, e.g. from cron, or by a sweeper thread in each
+process when `IDEMPOTENCY_SWEEP_INTERVAL` is set.
+"""
+import hashlib
+import json
+import logging
+import threading
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from sqlalchemy import delete, insert, select
+from app import db
+from app.cache import create_cache
+from app.models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyKeyMismatchError(Exception):
+    """Raised when an idempotency key is reused with a different request body."""
+
+
+def request_fingerprint(payload):
+    """Returns the SHA-256 of `payload` serialized as canonical JSON."""
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def find_order_for_key(key, request_hash):
+    """
+    Looks up the order created by an earlier request with an idempotency key.
+
+    Args:
+    - key (str): The idempotency key.
+    - request_hash (str): Fingerprint of the current request body.
+
+    Returns:
+    - int or None: ID of the order, or None if the key is unknown or expired.
+
+    Raises:
+    - IdempotencyKeyMismatchError: If the key was used for another body.
+    """
+    sweeper = current_app.extensions.get('idempotency_sweeper')
+    if sweeper is not None:
+        sweeper.ensure_started()
+
+    cache = current_app.extensions['idempotency_cache']
+    entry = cache.get(key)
+    if entry is None:
+        row = db.session.execute(
+            select(IdempotencyKey.request_hash, IdempotencyKey.order_id,
+                   IdempotencyKey.expires_at).where(IdempotencyKey.key == key)
+        ).first()
+        if row is None:
+            return None
+        entry = {'request_hash': row.request_hash, 'order_id': row.order_id,
+                 'expires_at': row.expires_at}
+        cache.set(key, entry)
+    if entry['expires_at'] <= datetime.utcnow():
+        return None
+    if entry['request_hash'] != request_hash:
+        raise IdempotencyKeyMismatchError(
+            f"{IDEMPOTENCY_HEADER} was already used with a different request"
+        )
+    return entry['order_id']
+
+
+def remember_key(key, request_hash, order_id):
+    """
+    Caches the key of an order just created, so that retries of its request
+    are answered without reading the table.
+    """
+    current_app.extensions['idempotency_cache'].set(key, {
+        'request_hash': request_hash, 'order_id': order_id,
+        'expires_at': datetime.utcnow() + timedelta(
+            seconds=current_app.config['IDEMPOTENCY_KEY_TTL']
+        )
+    })
+
+
+def record_keys(entries):
+    """
+    Stores idempotency keys in the current transaction.
+
+    Expired rows still holding one of the keys are replaced.
+
+    Args:
+    - entries (list): `(key, request_hash, order_id)` tuples.
+    """
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=current_app.config['IDEMPOTENCY_KEY_TTL'])
+    db.session.execute(
+        delete(IdempotencyKey).where(
+            IdempotencyKey.key.in_([key for key, _, _ in entries]),
+            IdempotencyKey.expires_at <= now
+        ).execution_options(synchronize_session=False)
+    )
+    db.session.execute(insert(IdempotencyKey), [
+        {'key': key, 'request_hash': request_hash, 'order_id': order_id,
+         'created_at': now, 'expires_at': expires_at}
+        for key, request_hash, order_id in entries
+    ])
+
+
+def sweep_expired_keys(batch_size=1000):
+    """
+    Deletes the expired idempotency keys, one transaction per batch.
+
+    Args:
+    - batch_size (int): Keys deleted per transaction.
+
+    Returns:
+    - int: Number of keys deleted.
+    """
+    deleted = 0
+    while True:
+        expired = select(IdempotencyKey.id).where(
+            IdempotencyKey.expires_at <= datetime.utcnow()
+        ).limit(batch_size)
+        count = db.session.execute(
+            delete(IdempotencyKey).where(IdempotencyKey.id.in_(expired))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        deleted += count
+        if count < batch_size:
+            return deleted
+
+
+class IdempotencySweeper:
+    """
+    Deletes expired idempotency keys from a background thread, every `interval` seconds.
+
+    The thread is started by the first keyed request of each process, so
+    server workers forked from a preloaded app each run their own.
+    """
+
+    def __init__(self, app, interval, batch_size=1000):
+        """
+        Args:
+        - app (Flask): Application whose database holds the keys.
+        - interval (float): Seconds between sweeps.
+        - batch_size (int): Keys deleted per transaction.
+        """
+        self.app = app
+        self.interval = interval
+        self.batch_size = batch_size
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def run_once(self):
+        """Deletes the expired keys and returns how many there were."""
+        with self.app.app_context():
+            try:
+                return sweep_expired_keys(self.batch_size)
+            except Exception:
+                db.session.rollback()
+                raise
+            finally:
+                db.session.remove()
+
+    def run(self):
+        """Sweeps until stopped."""
+        while not self._stopping.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as exception:
+                logging.exception("Error sweeping idempotency keys: %s", str(exception))
+
+    def ensure_started(self):
+        """Starts the sweeper thread unless it is running."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                self._thread = threading.Thread(
+                    target=self.run, name='idempotency-sweeper', daemon=True
+                )
+                self._thread.start()
+
+    def stop(self, timeout=None):
+        """Stops the sweeper thread."""
+        self._stopping.set()
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout)
+
+
+def init_idempotency(app):
+    """
+    Creates the idempotency key cache and optional sweeper of `app`, and
+    registers the `flask idempotency-sweep` command.
+    """
+    app.extensions['idempotency_cache'] = create_cache(app.config, 'IDEMPOTENCY_CACHE')
+    if app.config['IDEMPOTENCY_SWEEP_INTERVAL'] > 0:
+        app.extensions['idempotency_sweeper'] = IdempotencySweeper(
+            app, app.config['IDEMPOTENCY_SWEEP_INTERVAL'],
+            app.config['IDEMPOTENCY_SWEEP_BATCH_SIZE']
+        )
+
+    @app.cli.command('idempotency-sweep')
+    def idempotency_sweep_command():
+        """Delete the expired idempotency keys."""
+        deleted = sweep_expired_keys(app.config['IDEMPOTENCY_SWEEP_BATCH_SIZE'])
+        click.echo(f"Deleted {deleted} expired idempotency keys")
@@ -0,0 +1,55 @@
+"""
+The 'json_provider' module plugs a faster JSON encoder into Flask.
+
+When orjson is installed, `OrjsonProvider` encodes and decodes with it while
+producing the same documents as Flask's default provider: keys are sorted and
+dates still use the HTTP date format, since datetimes are passed through to
+Flask's own `default` hook. Without orjson, the default provider is used.
+"""
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+# Keyword arguments Flask passes for compact output, which orjson always produces
+_COMPACT_KWARGS = {'separators': (',', ':')}
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider encoding with orjson, matching `DefaultJSONProvider` output."""
+
+    def dumps(self, obj, **kwargs):
+        """
+        Serializes `obj` as JSON.
+
+        Calls with options orjson does not support, such as the indentation
+        used in debug mode, fall back to the standard library encoder.
+        """
+        if kwargs and kwargs != _COMPACT_KWARGS:
+            return super().dumps(obj, **kwargs)
+        try:
+            return orjson.dumps(
+                obj,
+                default=self.default,
+                option=orjson.OPT_SORT_KEYS
+                | orjson.OPT_NON_STR_KEYS
+                | orjson.OPT_PASSTHROUGH_DATETIME
+            ).decode('utf-8')
+        except TypeError:
+            # e.g. integers wider than 64 bits
+            return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        """Deserializes JSON from text or UTF-8 bytes."""
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+
+def init_json(app):
+    """Installs the fastest available JSON provider on `app`."""
+    if orjson is not None:
+        app.json_provider_class = OrjsonProvider
+        app.json = OrjsonProvider(app)
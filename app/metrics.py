@@ -0,0 +1,243 @@
+"""
+The 'metrics' module provides thread-safe instruments for runtime statistics
+and the per-route request metrics served by GET /metrics.
+
+`init_metrics` times every request and, through SQLAlchemy engine events, the
+SQL statements it runs, and records them by route template and status code.
+`RequestMetrics.render` writes them in the Prometheus text format. Metrics
+live in process memory, so each server worker reports its own.
+"""
+import threading
+import time
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Upper bounds in seconds of the default histogram buckets
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class Histogram:
+    """
+    Counts observed values into cumulative buckets, Prometheus style.
+
+    Each bucket counts the observations less than or equal to its upper
+    bound; the implicit '+Inf' bucket counts them all.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """
+        Args:
+        - buckets (tuple): Increasing upper bounds of the buckets.
+        """
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        """Records one observation of `value`."""
+        index = len(self.buckets)
+        for position, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = position
+                break
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def snapshot(self):
+        """
+        Reads the histogram.
+
+        Returns:
+        - dict: Observation `count` and `sum`, and cumulative `buckets`
+          keyed by upper bound, ending with '+Inf'.
+        """
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        buckets = {}
+        cumulative = 0
+        for bound, count in zip(self.buckets + ('+Inf',), counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {'count': cumulative, 'sum': total, 'buckets': buckets}
+
+
+# Upper bounds of the statements-per-request histogram buckets
+STATEMENT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 500)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _label_text(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class CounterFamily:
+    """Counters of one metric, one per combination of label values."""
+
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels, amount=1):
+        """Adds `amount` to the counter of the `labels` values."""
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels):
+        """Returns the counter of the `labels` values."""
+        with self._lock:
+            return self._values.get(labels, 0)
+
+    def render(self):
+        """Returns the family in the Prometheus text format, as lines."""
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        lines += [f'{self.name}{_label_text(self.label_names, labels)} {value}'
+                  for labels, value in values]
+        return lines
+
+
+class HistogramFamily:
+    """Histograms of one metric, one per combination of label values."""
+
+    def __init__(self, name, help_text, label_names, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = buckets
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        """Records `value` in the histogram of the `labels` values."""
+        with self._lock:
+            histogram = self._histograms.get(labels)
+            if histogram is None:
+                histogram = self._histograms[labels] = Histogram(self.buckets)
+        histogram.observe(value)
+
+    def snapshot(self, labels):
+        """Reads the histogram of the `labels` values, or None if it is empty."""
+        with self._lock:
+            histogram = self._histograms.get(labels)
+        return histogram.snapshot() if histogram else None
+
+    def render(self):
+        """Returns the family in the Prometheus text format, as lines."""
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        for labels, histogram in histograms:
+            snapshot = histogram.snapshot()
+            for bound, count in snapshot['buckets'].items():
+                label_text = _label_text(self.label_names, labels, [('le', bound)])
+                lines.append(f'{self.name}_bucket{label_text} {count}')
+            label_text = _label_text(self.label_names, labels)
+            lines.append(f"{self.name}_sum{label_text} {snapshot['sum']}")
+            lines.append(f"{self.name}_count{label_text} {snapshot['count']}")
+        return lines
+
+
+class RequestMetrics:
+    """The request and SQL metrics of an app."""
+
+    def __init__(self):
+        self.requests = CounterFamily(
+            'http_requests_total', 'HTTP requests handled.', ('method', 'route', 'status'))
+        self.errors = CounterFamily(
+            'http_request_errors_total', 'HTTP requests answered with a 5xx status.',
+            ('method', 'route', 'status'))
+        self.latency = HistogramFamily(
+            'http_request_duration_seconds', 'Time to produce the response.',
+            ('method', 'route'))
+        self.db_statements = HistogramFamily(
+            'http_request_db_statements', 'SQL statements executed per request.',
+            ('method', 'route'), STATEMENT_BUCKETS)
+        self.db_time = HistogramFamily(
+            'http_request_db_seconds', 'Time spent executing SQL per request.',
+            ('method', 'route'))
+
+    def record(self, method, route, status, duration, statements, db_seconds):
+        """Records one finished request."""
+        self.requests.inc((method, route, str(status)))
+        if status >= 500:
+            self.errors.inc((method, route, str(status)))
+        self.latency.observe((method, route), duration)
+        self.db_statements.observe((method, route), statements)
+        self.db_time.observe((method, route), db_seconds)
+
+    def render(self, extra_lines=()):
+        """
+        Writes all metrics in the Prometheus text exposition format.
+
+        Args:
+        - extra_lines (iterable): Further lines, e.g. gauges, to append.
+
+        Returns:
+        - str: The exposition text.
+        """
+        lines = []
+        for family in (self.requests, self.errors, self.latency,
+                       self.db_statements, self.db_time):
+            lines += family.render()
+        lines += extra_lines
+        return '\n'.join(lines) + '\n'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # pylint: disable=unused-argument,too-many-arguments
+    if has_request_context() and 'db_statements' in g:
+        context.metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # pylint: disable=unused-argument,too-many-arguments
+    started = getattr(context, 'metrics_started', None)
+    if started is not None and has_request_context() and 'db_statements' in g:
+        g.db_statements += 1
+        g.db_seconds += time.perf_counter() - started
+
+
+def init_metrics(app):
+    """Creates the request metrics of `app` and installs the hooks feeding them."""
+    metrics = app.extensions['metrics'] = RequestMetrics()
+
+    # Listening on the Engine class covers the primary and replica engines
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+    @app.before_request
+    def start_request_metrics():
+        g.request_started = time.perf_counter()
+        g.db_statements = 0
+        g.db_seconds = 0.0
+
+    @app.after_request
+    def record_request_metrics(response):
+        if 'request_started' in g:
+            # Route templates keep the number of label values bounded
+            route = request.url_rule.rule if request.url_rule else '<unmatched>'
+            metrics.record(
+                request.method, route, response.status_code,
+                time.perf_counter() - g.request_started, g.db_statements, g.db_seconds
+            )
+        return response
+
+
+def get_request_metrics():
+    """Returns the request metrics of the current app."""
+    return current_app.extensions['metrics']
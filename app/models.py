@@ -12,12 +12,40 @@ class StatusEnum(PyEnum):
     PROCESSING = 'processing'
     SHIPPED = 'shipped'
 
+# Statuses each status may change to; orders only ever move forward
+STATUS_TRANSITIONS = {
+    StatusEnum.PENDING: (StatusEnum.PROCESSING, StatusEnum.SHIPPED),
+    StatusEnum.PROCESSING: (StatusEnum.SHIPPED,),
+    StatusEnum.SHIPPED: (),
+}
+
+def source_statuses(target_status):
+    """
+    Lists the statuses from which an order may change to `target_status`.
+
+    Args:
+    - target_status (StatusEnum): The requested new status.
+
+    Returns:
+    - list: Statuses allowed to transition to `target_status`.
+    """
+    return [status for status, targets in STATUS_TRANSITIONS.items()
+            if target_status in targets]
+
 class Order(db.Model):
     """
     Represents an order in the database.
     """
 
     __tablename__ = 'orders'
+    # The composite indexes also serve equality lookups on their leading
+    # column alone, so user_id and status need no single-column indexes
+    __table_args__ = (
+        db.Index('ix_orders_user_id_created_at', 'user_id', 'created_at'),
+        db.Index('ix_orders_status_created_at', 'status', 'created_at'),
+        db.Index('ix_orders_created_at_id', 'created_at', 'id'),
+        db.Index('ix_orders_updated_at_id', 'updated_at', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, nullable=False)
@@ -31,6 +59,8 @@ class Order(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow)
     status = db.Column(db.Enum(StatusEnum), default=StatusEnum.PENDING)
+    # Incremented on every change, used to build ETags
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
 
     def __repr__(self):
         return f"<Order id={self.id}, user_id={self.user_id}, " \
@@ -45,7 +75,7 @@ class OrderItem(db.Model):
     __tablename__ = 'order_items'
 
     id = db.Column(db.Integer, primary_key=True)
-    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'))
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), index=True)
     product_id = db.Column(db.Integer)
     quantity = db.Column(db.Integer)
     price = db.Column(db.Float)
@@ -55,3 +85,96 @@ class OrderItem(db.Model):
         return f"<OrderItem id={self.id}, order_id={self.order_id}, " \
                f"product_id={self.product_id}, quantity={self.quantity}, " \
                f"price={self.price}>"
+
+
+class OrderTombstone(db.Model):
+    """
+    Records the cancellation of an order, which deletes its row, so that
+    the change feed can report it.
+    """
+
+    __tablename__ = 'order_tombstones'
+    __table_args__ = (
+        db.Index('ix_order_tombstones_deleted_at_order_id', 'deleted_at', 'order_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<OrderTombstone order_id={self.order_id}, deleted_at={self.deleted_at}>"
+
+
+class OutboxEvent(db.Model):
+    """
+    An order lifecycle event waiting to be published to other services.
+
+    Events are written in the same transaction as the change they describe
+    and delivered afterwards by the outbox relay, which sets `published_at`.
+    """
+
+    __tablename__ = 'outbox_events'
+    __table_args__ = (
+        db.Index('ix_outbox_events_published_at_id', 'published_at', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    event_type = db.Column(db.String(50), nullable=False)
+    order_id = db.Column(db.Integer, nullable=False)
+    payload = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    published_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f"<OutboxEvent id={self.id}, event_type='{self.event_type}', " \
+               f"order_id={self.order_id}, published_at={self.published_at}>"
+
+
+class UserOrderSummary(db.Model):
+    """
+    Aggregates of a user's orders, maintained incrementally by the order
+    service in the same transaction as every order change.
+    """
+
+    __tablename__ = 'user_order_summaries'
+
+    user_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    order_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    total_spend = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    pending_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    processing_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    shipped_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    last_order_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f"<UserOrderSummary user_id={self.user_id}, " \
+               f"order_count={self.order_count}, total_spend={self.total_spend}>"
+
+
+class IdempotencyKey(db.Model):
+    """
+    An order creation identified by the `Idempotency-Key` header of its request.
+
+    It is written in the same transaction as the order, so a retried request
+    carrying the same key gets the original response instead of a new order
+    until `expires_at`.
+    """
+
+    __tablename__ = 'idempotency_keys'
+    __table_args__ = (
+        db.Index('ix_idempotency_keys_key', 'key', unique=True),
+        db.Index('ix_idempotency_keys_expires_at', 'expires_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(255), nullable=False)
+    # SHA-256 of the request body, to refuse a key reused for another request
+    request_hash = db.Column(db.String(64), nullable=False)
+    order_id = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<IdempotencyKey key='{self.key}', order_id={self.order_id}, " \
+               f"expires_at={self.expires_at}>"
@@ -0,0 +1,309 @@
+"""
+The 'outbox' module implements the transactional outbox for order lifecycle events.
+
+Services record an event row in the same transaction as the order change it
+describes, so an event exists if and only if the change was committed. The
+`OutboxRelay` delivers pending events to an `EventSink` in batches, outside
+the request path, and marks them published. Delivery is at least once: after
+a crash between publishing and marking, a batch is delivered again, so
+consumers should de-duplicate on the event `id`.
+
+Run the relay as its own process with `flask outbox-relay`. Published events
+are kept for `OUTBOX_RETENTION` seconds, then deleted by the relay while it
+is idle, or by `flask outbox-purge`.
+"""
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+import click
+from sqlalchemy import delete, insert, literal, select, update
+from app import db
+from app.models import OutboxEvent
+
+ORDER_CREATED = 'order.created'
+ORDER_STATUS_CHANGED = 'order.status_changed'
+ORDER_CANCELED = 'order.canceled'
+
+# Minimum seconds between two purges of published events by a relay
+PURGE_INTERVAL = 60
+
+
+def record_events(event_type, events):
+    """
+    Adds events to the outbox in the current transaction.
+
+    Args:
+    - event_type (str): Type shared by the events.
+    - events (list): `(order_id, payload)` tuples, where payload is a dict.
+    """
+    now = datetime.utcnow()
+    db.session.execute(insert(OutboxEvent), [
+        {'event_type': event_type, 'order_id': order_id,
+         'payload': json.dumps(payload), 'created_at': now}
+        for order_id, payload in events
+    ])
+
+
+def record_events_for(event_type, payload, order_ids_statement):
+    """
+    Adds one event per order selected by a statement, with one INSERT ... SELECT.
+
+    Args:
+    - event_type (str): Type of the events.
+    - payload (dict): Payload shared by the events.
+    - order_ids_statement (Select): Selects the IDs of the orders concerned.
+    """
+    subquery = order_ids_statement.subquery()
+    db.session.execute(
+        insert(OutboxEvent).from_select(
+            ['event_type', 'order_id', 'payload', 'created_at'],
+            select(
+                literal(event_type, OutboxEvent.event_type.type),
+                subquery.c[0],
+                literal(json.dumps(payload), OutboxEvent.payload.type),
+                literal(datetime.utcnow(), OutboxEvent.created_at.type)
+            )
+        )
+    )
+
+
+def purge_published_events(older_than, batch_size=1000):
+    """
+    Deletes events published more than `older_than` seconds ago, one
+    transaction per batch.
+
+    Args:
+    - older_than (float): Seconds published events are kept.
+    - batch_size (int): Events deleted per transaction.
+
+    Returns:
+    - int: Number of events deleted.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=older_than)
+    deleted = 0
+    while True:
+        published = select(OutboxEvent.id).where(
+            OutboxEvent.published_at <= cutoff
+        ).limit(batch_size)
+        count = db.session.execute(
+            delete(OutboxEvent).where(OutboxEvent.id.in_(published))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        deleted += count
+        if count < batch_size:
+            return deleted
+
+
+class EventSink:
+    """Destination of published events."""
+
+    def publish(self, events):
+        """
+        Delivers a batch of events, raising if any could not be delivered.
+
+        Args:
+        - events (list): Event dicts with `id`, `type`, `order_id`,
+          `occurred_at` and `data`.
+        """
+        raise NotImplementedError
+
+
+class NdjsonFileSink(EventSink):
+    """Appends events as NDJSON lines to a local file."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def publish(self, events):
+        with open(self.path, 'a', encoding='utf-8') as stream:
+            for event in events:
+                stream.write(json.dumps(event) + '\n')
+            stream.flush()
+            os.fsync(stream.fileno())
+
+
+class QueueSink(EventSink):
+    """Puts events on an in-process queue, for local consumers and tests."""
+
+    def __init__(self, event_queue=None):
+        self.queue = event_queue if event_queue is not None else queue.Queue()
+
+    def publish(self, events):
+        for event in events:
+            self.queue.put(event)
+
+
+def create_sink(config):
+    """
+    Builds the sink selected by the `OUTBOX_SINK` setting.
+
+    Args:
+    - config (dict): Flask app configuration.
+
+    Returns:
+    - EventSink: `NdjsonFileSink` for 'ndjson', `QueueSink` for 'queue'.
+
+    Raises:
+    - ValueError: If the sink name is unknown.
+    """
+    sink = config.get('OUTBOX_SINK', 'ndjson')
+    if sink == 'ndjson':
+        return NdjsonFileSink(config['OUTBOX_NDJSON_PATH'])
+    if sink == 'queue':
+        return QueueSink()
+    raise ValueError(f"Unknown OUTBOX_SINK '{sink}'")
+
+
+class OutboxRelay:
+    """
+    Drains the outbox to a sink in batches.
+
+    Use `run_once` to deliver one batch, or `start` to keep draining from a
+    background thread until `stop` is called. With a `retention`, a draining
+    relay also deletes old published events when the outbox is drained, at
+    most every `PURGE_INTERVAL` seconds.
+    """
+
+    def __init__(self, app, sink, batch_size=100, poll_interval=1.0, retention=None):
+        """
+        Args:
+        - app (Flask): Application whose database holds the outbox.
+        - sink (EventSink): Destination of the events.
+        - batch_size (int): Maximum events delivered per batch.
+        - poll_interval (float): Seconds to wait when the outbox is drained.
+        - retention (float): Seconds published events are kept, or None to
+          keep them.
+        """
+        self.app = app
+        self.sink = sink
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self._stopping = threading.Event()
+        self._thread = None
+        self._next_purge = 0
+
+    def run_once(self):
+        """
+        Publishes the oldest pending events and marks them published.
+
+        Returns:
+        - int: Number of events published.
+        """
+        with self.app.app_context():
+            try:
+                rows = db.session.execute(
+                    select(OutboxEvent).where(OutboxEvent.published_at.is_(None))
+                    .order_by(OutboxEvent.id).limit(self.batch_size)
+                    .with_for_update(skip_locked=True)
+                ).scalars().all()
+                if not rows:
+                    db.session.rollback()
+                    return 0
+
+                self.sink.publish([{
+                    'id': row.id,
+                    'type': row.event_type,
+                    'order_id': row.order_id,
+                    'occurred_at': row.created_at.isoformat(),
+                    'data': json.loads(row.payload)
+                } for row in rows])
+
+                db.session.execute(
+                    update(OutboxEvent)
+                    .where(OutboxEvent.id.in_([row.id for row in rows]))
+                    .values(published_at=datetime.utcnow())
+                    .execution_options(synchronize_session=False)
+                )
+                db.session.commit()
+                return len(rows)
+            except Exception:
+                db.session.rollback()
+                raise
+            finally:
+                db.session.remove()
+
+    def purge_once(self):
+        """Deletes the published events past retention and returns how many there were."""
+        with self.app.app_context():
+            try:
+                return purge_published_events(
+                    self.retention, self.app.config['OUTBOX_PURGE_BATCH_SIZE']
+                )
+            except Exception:
+                db.session.rollback()
+                raise
+            finally:
+                db.session.remove()
+
+    def _purge_if_due(self):
+        """Purges published events if a retention is set and the last purge is old enough."""
+        if self.retention is None or time.monotonic() < self._next_purge:
+            return
+        self._next_purge = time.monotonic() + PURGE_INTERVAL
+        try:
+            self.purge_once()
+        except Exception as exception:
+            logging.exception("Error purging outbox events: %s", str(exception))
+
+    def run(self):
+        """Publishes batches until stopped, pausing whenever the outbox is drained."""
+        while not self._stopping.is_set():
+            try:
+                published = self.run_once()
+            except Exception as exception:
+                logging.exception("Error relaying outbox events: %s", str(exception))
+                published = 0
+            if published < self.batch_size:
+                self._purge_if_due()
+                self._stopping.wait(self.poll_interval)
+
+    def start(self):
+        """Starts relaying from a daemon thread."""
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self.run, name='outbox-relay', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Stops the relay thread after its current batch."""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+def init_outbox(app):
+    """Registers the `flask outbox-relay` and `flask outbox-purge` commands on `app`."""
+
+    @app.cli.command('outbox-relay')
+    @click.option('--once', is_flag=True, help='Publish one batch and exit.')
+    def outbox_relay_command(once):
+        """Publish pending order events to the configured sink."""
+        relay = OutboxRelay(
+            app,
+            create_sink(app.config),
+            batch_size=app.config['OUTBOX_BATCH_SIZE'],
+            poll_interval=app.config['OUTBOX_POLL_INTERVAL'],
+            retention=app.config['OUTBOX_RETENTION'] or None
+        )
+        if once:
+            click.echo(f"Published {relay.run_once()} events")
+            return
+        relay.run()
+
+    @app.cli.command('outbox-purge')
+    @click.option('--older-than', type=float, default=None,
+                  help='Seconds published events are kept (default: OUTBOX_RETENTION).')
+    def outbox_purge_command(older_than):
+        """Delete order events published longer ago than the retention."""
+        if older_than is None:
+            older_than = app.config['OUTBOX_RETENTION']
+            if not older_than:
+                raise click.UsageError('--older-than is required when OUTBOX_RETENTION is 0')
+        deleted = purge_published_events(older_than, app.config['OUTBOX_PURGE_BATCH_SIZE'])
+        click.echo(f"Deleted {deleted} published events")
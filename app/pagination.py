@@ -0,0 +1,117 @@
+"""
+The 'pagination' module implements keyset (cursor) pagination for order listings.
+
+Pages are ordered by `(created_at, id)` and the position of the last row on a
+page is handed to clients as an opaque, URL-safe cursor. Fetching the next page
+seeks directly past that position through the `(created_at, id)` index of the
+orders table, or the `(user_id, created_at)` and `(status, created_at)` ones
+when filtered, so the cost of a page does not depend on how deep into the
+result set the client is.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from sqlalchemy import tuple_
+from app import db
+from app.models import Order
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+def encode_cursor(timestamp, row_id):
+    """
+    Encodes a keyset position as an opaque cursor.
+
+    Args:
+    - timestamp (datetime): Timestamp of the last row returned.
+    - row_id (int): ID of the last row returned.
+
+    Returns:
+    - str: URL-safe cursor pointing just after that row.
+    """
+    position = [timestamp.isoformat(), row_id]
+    raw = json.dumps(position, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decodes a cursor produced by `encode_cursor`.
+
+    Args:
+    - cursor (str): The opaque cursor received from a client.
+
+    Returns:
+    - tuple: The `(timestamp, id)` position encoded in the cursor.
+
+    Raises:
+    - InvalidCursorError: If the cursor is malformed.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, order_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(order_id)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError) as exception:
+        raise InvalidCursorError("Invalid cursor") from exception
+
+
+def parse_limit(value, default, maximum):
+    """
+    Validates a page size received as a query string parameter.
+
+    Args:
+    - value (str or None): Raw `limit` parameter.
+    - default (int): Page size to use when `value` is None.
+    - maximum (int): Largest accepted page size.
+
+    Returns:
+    - int: The page size.
+
+    Raises:
+    - ValueError: If `value` is not an integer between 1 and `maximum`.
+    """
+    if value is None:
+        return default
+    try:
+        limit = int(value)
+    except ValueError as exception:
+        raise ValueError("limit must be an integer") from exception
+    if not 1 <= limit <= maximum:
+        raise ValueError(f"limit must be between 1 and {maximum}")
+    return limit
+
+
+def paginate(statement, limit, cursor=None):
+    """
+    Fetches one page of orders from `statement` in `(created_at, id)` order.
+
+    One extra row is requested to find out whether another page exists without
+    issuing a separate COUNT query.
+
+    Args:
+    - statement (Select): Select on the orders table, optionally already
+      filtered, whose columns include `created_at` and `id`.
+    - limit (int): Maximum number of orders on the page.
+    - cursor (str or None): Cursor returned with the previous page.
+
+    Returns:
+    - tuple: The list of rows and the cursor of the next page, or None if
+      this is the last page.
+
+    Raises:
+    - InvalidCursorError: If the cursor is malformed.
+    """
+    if cursor:
+        statement = statement.where(
+            tuple_(Order.created_at, Order.id) > tuple_(*decode_cursor(cursor))
+        )
+    rows = db.session.execute(
+        statement.order_by(Order.created_at, Order.id).limit(limit + 1)
+    ).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1].created_at, rows[-1].id)
+    return rows, None
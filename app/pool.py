@@ -0,0 +1,124 @@
+"""
+The 'pool' module configures the database connection pool and measures it.
+
+`engine_options` builds `SQLALCHEMY_ENGINE_OPTIONS` from the `DB_POOL_*`
+settings, installing `TimedQueuePool`, a `QueuePool` that records how long
+requests wait for a connection and how often they give up. `pool_stats`
+reports the live state of an engine's pool for the health endpoint.
+"""
+import threading
+import time
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+from app.metrics import Histogram
+
+
+class PoolMetrics:
+    """Connection wait times and checkout timeouts of a pool."""
+
+    def __init__(self):
+        self.wait_seconds = Histogram()
+        self._timeouts = 0
+        self._lock = threading.Lock()
+
+    def record_timeout(self):
+        """Counts a checkout that gave up waiting."""
+        with self._lock:
+            self._timeouts += 1
+
+    @property
+    def timeouts(self):
+        """Number of checkouts that gave up waiting."""
+        with self._lock:
+            return self._timeouts
+
+
+class TimedQueuePool(QueuePool):
+    """
+    A `QueuePool` measuring the time spent obtaining each connection.
+
+    The time includes opening a new connection when the pool grows, which is
+    part of what a request waits for.
+    """
+
+    def __init__(self, creator, **kw):
+        super().__init__(creator, **kw)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.record_timeout()
+            raise
+        finally:
+            self.metrics.wait_seconds.observe(time.perf_counter() - start)
+
+    def recreate(self):
+        # Keep the history across engine.dispose(), which replaces the pool
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+def engine_options(config):
+    """
+    Builds the SQLAlchemy engine options of an app.
+
+    Options already present in `SQLALCHEMY_ENGINE_OPTIONS` win over the
+    `DB_POOL_*` settings. In-memory SQLite databases keep the single shared
+    connection Flask-SQLAlchemy gives them, so only pre-ping and recycling
+    apply to them.
+
+    Args:
+    - config (dict): Flask app configuration.
+
+    Returns:
+    - dict: Keyword arguments for `create_engine`.
+    """
+    options = dict(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    options.setdefault('pool_pre_ping', config['DB_POOL_PRE_PING'])
+    options.setdefault('pool_recycle', config['DB_POOL_RECYCLE'])
+
+    uri = config.get('SQLALCHEMY_DATABASE_URI')
+    if uri is None:
+        return options
+    url = make_url(uri)
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        return options
+
+    options.setdefault('poolclass', TimedQueuePool)
+    options.setdefault('pool_size', config['DB_POOL_SIZE'])
+    options.setdefault('max_overflow', config['DB_MAX_OVERFLOW'])
+    options.setdefault('pool_timeout', config['DB_POOL_TIMEOUT'])
+    return options
+
+
+def pool_stats(engine):
+    """
+    Reads the state of an engine's connection pool.
+
+    Args:
+    - engine (Engine): The engine.
+
+    Returns:
+    - dict: The pool `class` and, for queue pools, the connections `size`,
+      `checked_out`, `checked_in` and in `overflow`; timed pools also report
+      `timeouts` and the `wait_seconds` histogram.
+    """
+    pool = engine.pool
+    stats = {'class': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            'size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'checked_in': pool.checkedin(),
+            # Negative while the pool itself is not full yet
+            'overflow': max(pool.overflow(), 0),
+        })
+    if isinstance(pool, TimedQueuePool):
+        stats['timeouts'] = pool.metrics.timeouts
+        stats['wait_seconds'] = pool.metrics.wait_seconds.snapshot()
+    return stats
@@ -0,0 +1,218 @@
+"""
+The 'profiling' module profiles selected requests to show where their time goes.
+
+Profiling is opt-in: with `PROFILING_ENABLED` set, requests sending the
+`PROFILING_HEADER` header, and a `PROFILING_SAMPLE_RATE` share of the
+others, run under cProfile. Each profiled request gets a phase breakdown:
+`db` is the time spent executing SQL, measured by the engine events of the
+request metrics, `serialization` the time spent turning rows into dicts,
+`json` the time spent encoding JSON, and `other` the rest, including
+fetching result rows, view logic and hooks. Requests sending the header get
+the breakdown back in a `Server-Timing` header.
+
+Profiled requests taking at least `PROFILING_SLOW_MS` are dumped to
+`PROFILING_DIR` as a pstats file, readable with `python -m pstats`, with a
+JSON summary next to it. Only the newest `PROFILING_MAX_FILES` are kept.
+
+With profiling disabled no hooks are installed, and the phase timers reduce
+to a check of the request context.
+"""
+import contextlib
+import cProfile
+import json
+import logging
+import os
+import random
+import re
+import time
+from datetime import datetime
+from flask import g, has_request_context, request
+
+PHASES = ('db', 'serialization', 'json', 'other')
+PROFILE_SUFFIX = '.prof'
+SUMMARY_SUFFIX = '.json'
+
+_NO_PHASE = contextlib.nullcontext()
+
+
+class _PhaseTimer:
+    """Adds the time spent in a block to a phase of the profiled request."""
+
+    __slots__ = ('name', 'started')
+
+    def __init__(self, name):
+        self.name = name
+        self.started = None
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        phases = g.profile.phases
+        phases[self.name] = phases.get(self.name, 0.0) + time.perf_counter() - self.started
+        return False
+
+
+def phase(name):
+    """
+    Times a block as part of phase `name` of the current request's profile.
+
+    Args:
+    - name (str): One of `PHASES` other than 'db' and 'other'.
+
+    Returns:
+    - context manager: The timer, or a no-op outside profiled requests.
+    """
+    if has_request_context() and 'profile' in g:
+        return _PhaseTimer(name)
+    return _NO_PHASE
+
+
+class RequestProfile:
+    """The profiler and phase timings of one request."""
+
+    def __init__(self, trigger):
+        """
+        Args:
+        - trigger (str): Why the request is profiled, 'header' or 'sample'.
+        """
+        self.trigger = trigger
+        self.profiler = cProfile.Profile()
+        self.phases = {}
+        self.started = time.perf_counter()
+        self.db_started = g.get('db_seconds', 0.0)
+        self.duration = None
+
+    def finish(self):
+        """Stops the profiler and returns the phase breakdown in seconds."""
+        self.profiler.disable()
+        self.duration = time.perf_counter() - self.started
+        breakdown = {
+            'db': g.get('db_seconds', 0.0) - self.db_started,
+            'serialization': self.phases.get('serialization', 0.0),
+            'json': self.phases.get('json', 0.0),
+        }
+        breakdown['other'] = max(self.duration - sum(breakdown.values()), 0.0)
+        return breakdown
+
+
+def server_timing(breakdown, duration):
+    """Formats a phase breakdown as a `Server-Timing` header value."""
+    metrics = [f'{name};dur={breakdown[name] * 1000:.2f}' for name in PHASES]
+    metrics.append(f'total;dur={duration * 1000:.2f}')
+    return ', '.join(metrics)
+
+
+def _remove_quietly(path):
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(path)
+
+
+def rotate_profiles(directory, keep):
+    """Deletes all but the newest `keep` profiles in `directory`."""
+    profiles = sorted(name for name in os.listdir(directory) if name.endswith(PROFILE_SUFFIX))
+    for name in profiles[:max(len(profiles) - keep, 0)]:
+        base = os.path.join(directory, name[:-len(PROFILE_SUFFIX)])
+        _remove_quietly(base + PROFILE_SUFFIX)
+        _remove_quietly(base + SUMMARY_SUFFIX)
+
+
+def dump_profile(profile, breakdown, response, directory, keep):
+    """
+    Writes the profile of the current request and its JSON summary.
+
+    Files are named after the time, method, route and duration of the
+    request, so they sort chronologically.
+
+    Args:
+    - profile (RequestProfile): The finished profile.
+    - breakdown (dict): Seconds spent in each phase.
+    - response (Response): The response sent.
+    - directory (str): Directory of the profiles, created if missing.
+    - keep (int): Number of profiles kept in `directory`.
+
+    Returns:
+    - str: Path of the pstats file.
+    """
+    route = request.url_rule.rule if request.url_rule else '<unmatched>'
+    duration_ms = profile.duration * 1000
+    slug = re.sub(r'[^A-Za-z0-9]+', '_', route).strip('_') or 'root'
+    base = os.path.join(
+        directory,
+        f'{datetime.utcnow():%Y%m%dT%H%M%S%f}-{request.method}-{slug}-{duration_ms:.0f}ms'
+    )
+    os.makedirs(directory, exist_ok=True)
+    profile.profiler.dump_stats(base + PROFILE_SUFFIX)
+    with open(base + SUMMARY_SUFFIX, 'w', encoding='utf-8') as summary:
+        json.dump({
+            'method': request.method,
+            'path': request.full_path.rstrip('?'),
+            'route': route,
+            'status': response.status_code,
+            'trigger': profile.trigger,
+            'duration_ms': round(duration_ms, 3),
+            'phases_ms': {name: round(seconds * 1000, 3) for name, seconds in breakdown.items()},
+        }, summary, indent=2)
+    rotate_profiles(directory, keep)
+    return base + PROFILE_SUFFIX
+
+
+def init_profiling(app):
+    """
+    Installs the request profiling hooks on `app` if `PROFILING_ENABLED` is set.
+
+    Call it after `init_metrics`, whose SQL timings feed the 'db' phase, and
+    `init_json`, whose encoder is timed as the 'json' phase.
+    """
+    if not app.config['PROFILING_ENABLED']:
+        return
+    header = app.config['PROFILING_HEADER']
+    sample_rate = app.config['PROFILING_SAMPLE_RATE']
+
+    dumps = app.json.dumps
+
+    def timed_dumps(obj, **kwargs):
+        with phase('json'):
+            return dumps(obj, **kwargs)
+
+    app.json.dumps = timed_dumps
+
+    @app.before_request
+    def start_profile():
+        if header in request.headers:
+            trigger = 'header'
+        elif sample_rate > 0 and random.random() < sample_rate:
+            trigger = 'sample'
+        else:
+            return
+        profile = RequestProfile(trigger)
+        try:
+            profile.profiler.enable()
+        except ValueError:
+            # Another profiler is already active in this interpreter
+            return
+        g.profile = profile
+
+    @app.after_request
+    def finish_profile(response):
+        profile = g.pop('profile', None)
+        if profile is None:
+            return response
+        breakdown = profile.finish()
+        if profile.trigger == 'header':
+            response.headers['Server-Timing'] = server_timing(breakdown, profile.duration)
+        if profile.duration * 1000 >= app.config['PROFILING_SLOW_MS']:
+            try:
+                dump_profile(profile, breakdown, response,
+                             app.config['PROFILING_DIR'], app.config['PROFILING_MAX_FILES'])
+            except OSError:
+                logging.exception("Could not write the profile of %s", request.path)
+        return response
+
+    @app.teardown_request
+    def stop_profile(exception=None):  # pylint: disable=unused-argument
+        # Requests failing before after_request still stop their profiler
+        profile = g.pop('profile', None)
+        if profile is not None:
+            profile.profiler.disable()
@@ -0,0 +1,197 @@
+"""
+The 'replicas' module routes the reads of read-only requests to database replicas.
+
+Replicas are configured as `DB_REPLICA_URIS` and get engines named
+`replica_0`, `replica_1`, ... with the same pool settings as the primary.
+Each GET request, or request to a view marked `read_only`, is assigned a
+replica in round-robin order, and `RoutingSession` sends its plain SELECT
+statements there. Everything else, including views marked `primary_only`,
+locking reads and reads outside requests (CLI, relay), uses the primary.
+
+A statement failing on a replica is retried on the primary and the replica
+is skipped for `DB_REPLICA_RETRY_SECONDS`. After a successful write, the
+client gets a cookie routing its reads to the primary for
+`DB_REPLICA_STICKY_SECONDS`, so it reads its own writes despite replica lag;
+`reads_own_writes` and `reads_from_replica` let caches honour the same rules.
+"""
+import functools
+import itertools
+import logging
+import threading
+import time
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, exc
+from sqlalchemy.sql import Select
+from app.pool import engine_options
+
+REPLICA_NAME_PREFIX = 'replica_'
+STICKY_COOKIE = 'read_primary'
+READ_METHODS = ('GET', 'HEAD')
+
+
+class ReplicaSet:
+    """Hands out replicas in round-robin order, skipping those marked down."""
+
+    def __init__(self, engines, retry_seconds, clock=time.monotonic):
+        """
+        Args:
+        - engines (dict): Engine of each replica by name.
+        - retry_seconds (float): How long a replica marked down is skipped.
+        - clock (callable): Returns the current time in seconds.
+        """
+        self.engines = dict(engines)
+        self.names = list(self.engines)
+        self.retry_seconds = retry_seconds
+        self._clock = clock
+        self._order = itertools.cycle(self.names) if self.names else None
+        self._down_until = {}
+        self._lock = threading.Lock()
+
+    def choose(self):
+        """
+        Picks the next available replica.
+
+        Returns:
+        - str or None: Name of the replica, or None if none is available.
+        """
+        if self._order is None:
+            return None
+        now = self._clock()
+        with self._lock:
+            for _ in self.names:
+                name = next(self._order)
+                if self._down_until.get(name, 0) <= now:
+                    return name
+        return None
+
+    def mark_down(self, name):
+        """Skips the replica `name` for `retry_seconds`."""
+        with self._lock:
+            self._down_until[name] = self._clock() + self.retry_seconds
+
+    def status(self):
+        """Returns whether each replica is currently `up`."""
+        now = self._clock()
+        with self._lock:
+            return {name: self._down_until.get(name, 0) <= now for name in self.names}
+
+
+def _request_replica(clause):
+    """Returns the replica assigned to the current request if `clause` may use it."""
+    if not has_request_context() or not isinstance(clause, Select):
+        return None
+    if clause._for_update_arg is not None:  # pylint: disable=protected-access
+        return None
+    return g.get('db_replica')
+
+
+class RoutingSession(Session):
+    """
+    A Flask-SQLAlchemy session sending the plain reads of read-only requests
+    to the replica assigned to the request, and everything else to the
+    bind the model belongs to.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing:
+            replica = _request_replica(clause)
+            if replica is not None:
+                return current_app.extensions['replicas'].engines[replica]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def execute(self, statement, *args, **kwargs):
+        """Executes `statement`, retrying a read that failed on a replica on the primary."""
+        try:
+            return super().execute(statement, *args, **kwargs)
+        except exc.DBAPIError:
+            replica = _request_replica(statement)
+            if replica is None:
+                raise
+            logging.warning("Replica %s failed, reading from the primary", replica)
+            current_app.extensions['replicas'].mark_down(replica)
+            g.pop('db_replica')
+            self.rollback()
+            return super().execute(statement, *args, **kwargs)
+
+
+def read_only(view):
+    """Marks a view that never writes, so its reads may use a replica."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        return view(*args, **kwargs)
+    wrapper.read_only = True
+    return wrapper
+
+
+def primary_only(view):
+    """
+    Marks a read view that must see every committed row, so its reads never
+    use a replica, which may lag behind the primary.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        return view(*args, **kwargs)
+    wrapper.primary_only = True
+    return wrapper
+
+
+def _is_read_request():
+    view = current_app.view_functions.get(request.endpoint)
+    return request.method in READ_METHODS or getattr(view, 'read_only', False)
+
+
+def _may_use_replica():
+    view = current_app.view_functions.get(request.endpoint)
+    return (_is_read_request() and not getattr(view, 'primary_only', False)
+            and STICKY_COOKIE not in request.cookies)
+
+
+def init_replicas(app):
+    """
+    Creates the replica engines of `app` and installs the request routing hooks.
+
+    Call it before `SQLALCHEMY_ENGINE_OPTIONS` is resolved for the primary, so
+    each replica's pool options are derived from its own URI.
+    """
+    replicas = ReplicaSet(
+        {
+            f'{REPLICA_NAME_PREFIX}{index}': create_engine(
+                uri, **engine_options(dict(app.config, SQLALCHEMY_DATABASE_URI=uri))
+            )
+            for index, uri in enumerate(app.config.get('DB_REPLICA_URIS') or ())
+        },
+        app.config['DB_REPLICA_RETRY_SECONDS']
+    )
+    app.extensions['replicas'] = replicas
+    if not replicas.names:
+        return
+
+    @app.before_request
+    def assign_replica():
+        if _may_use_replica():
+            g.db_replica = replicas.choose()
+
+    @app.after_request
+    def stick_to_primary(response):
+        if not _is_read_request() and response.status_code < 400:
+            response.set_cookie(
+                STICKY_COOKIE, '1',
+                max_age=app.config['DB_REPLICA_STICKY_SECONDS'], httponly=True
+            )
+        return response
+
+
+def reads_from_replica():
+    """Whether the reads of the current request have so far gone to a replica."""
+    return has_request_context() and g.get('db_replica') is not None
+
+
+def reads_own_writes():
+    """Whether the current request's client wrote recently and must read from the primary."""
+    return has_request_context() and STICKY_COOKIE in request.cookies
+
+
+def get_replicas():
+    """Returns the replica set of the current app."""
+    return current_app.extensions['replicas']
@@ -1,91 +1,561 @@
 """
-This module contains routes for managing orders.
+This module contains routes for managing orders, registered on the `orders`
+blueprint by the app factory.
 
 Endpoints:
-- GET /health: Health check endpoint returning a success status.
-- POST /orders: Create a new order.
-- GET /orders: Retrieve all orders.
+- GET /health: Health check endpoint returning a success status, cache counters,
+  database connection pool statistics, including those of the read replicas, and
+  group commit counters when it is enabled.
+- GET /metrics: Request, SQL and connection pool metrics in the Prometheus text format.
+- POST /orders: Create a new order, in a transaction shared with concurrent
+  creations when group commit is enabled. With an `Idempotency-Key` header,
+  retries of a created order get the original response back (422 if the key
+  was used for a different body).
+- POST /orders/bulk: Create many orders from a JSON list or NDJSON body.
+- GET /orders: Retrieve all orders, or one page of them with ?limit=&cursor=.
+  List endpoints accept ?fields= and ?include=items to choose the returned fields.
+  With ?ids=1,2,3 only those orders are returned, along with the missing IDs.
+  With ?stream=1 or `Accept: application/x-ndjson` all orders are streamed as NDJSON.
+- POST /orders/lookup: Retrieve many orders by ID given as {"ids": [...]}.
+  Read-only, so like GET routes its reads may be served by a replica.
+- GET /orders/changes: Get orders created, updated or canceled since a cursor.
+  Always read from the primary, so a lagging replica cannot make it skip changes.
+- GET /orders/stats: Get order counts, revenue by day/week/month and top products,
+  optionally limited to orders created ?from= / ?to= ISO dates.
 - GET /orders/<int:order_id>: Get details of a specific order by order ID.
+  Supports ETag / If-None-Match and Last-Modified / If-Modified-Since.
 - PATCH /orders/<int:order_id>: Update the status of an order by order ID.
-- GET /orders/user/<int:user_id>: Get orders associated with a specific user.
+  Accepts optional `expected_status` / `expected_version` preconditions (409 on conflict).
+- PATCH /orders/status: Change the status of many orders selected by `ids` or `filter`.
+- GET /orders/user/<int:user_id>: Get orders associated with a specific user (pageable).
+- GET /users/<int:user_id>/order-summary: Get a user's order count, spend and last order.
 - DELETE /orders/<int:order_id>: Cancel an order by order ID.
-- GET /orders/status/<string:status>: Get orders by their status.
+- POST /orders/cancel: Cancel many orders by ID.
+- GET /orders/status/<string:status>: Get orders by their status (pageable).
 - GET /orders/<int:order_id>/items: Get all order items for a specific order.
+  Supports the same conditional requests as the order itself.
 """
+import json
 import logging
-from flask import jsonify, request
-from app.services import OrderService, OrderItemService
-from app import app
+from datetime import datetime, timezone
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from sqlalchemy.exc import IntegrityError
+from app.services import (
+    OrderConflictError, OrderService, OrderItemService, OrderStatsService,
+    UserOrderSummaryService
+)
+from app import db
+from app.cache import get_order_cache, get_order_stats_cache
+from app.group_commit import get_group_commit_writer
+from app.idempotency import (
+    IDEMPOTENCY_HEADER, MAX_KEY_LENGTH, REPLAYED_HEADER, IdempotencyKeyMismatchError,
+    find_order_for_key, remember_key, request_fingerprint
+)
 from app.models import StatusEnum
+from app.pagination import parse_limit
+from app.metrics import get_request_metrics
+from app.pool import pool_stats
+from app.replicas import get_replicas, primary_only, read_only
+from app.serializers import ORDER_FIELDS, ORDER_ITEM_FIELDS, USER_ORDER_FIELDS, parse_fields
+
+bp = Blueprint('orders', __name__)
 
 order_service = OrderService()
 order_item_service = OrderItemService()
+user_order_summary_service = UserOrderSummaryService()
+order_stats_service = OrderStatsService()
+
+# Largest number of products GET /orders/stats ranks with ?top=
+STATS_MAX_TOP = 100
+
+def _page_args():
+    """
+    Reads the keyset pagination parameters of a list request.
+
+    Returns:
+    - tuple or None: `(limit, cursor)` when the client asked for a page by
+      passing `limit` or `cursor`, otherwise None for the full listing.
 
-@app.route('/health', methods=['GET'])
+    Raises:
+    - ValueError: If `limit` is not a valid page size.
+    """
+    limit = request.args.get('limit')
+    cursor = request.args.get('cursor')
+    if limit is None and cursor is None:
+        return None
+    limit = parse_limit(
+        limit,
+        current_app.config['ORDERS_PAGE_DEFAULT_LIMIT'],
+        current_app.config['ORDERS_PAGE_MAX_LIMIT']
+    )
+    return limit, cursor
+
+@bp.route('/health', methods=['GET'])
 def health_check():
     """health check returning a success status"""
     application_status = {
-        'status': 'healthy'
+        'status': 'healthy',
+        'cache': get_order_cache().stats(),
+        'stats_cache': get_order_stats_cache().stats(),
+        'idempotency_cache': current_app.extensions['idempotency_cache'].stats(),
+        'db_pool': pool_stats(db.engine),
+        'db_replicas': {
+            name: dict(pool_stats(get_replicas().engines[name]), up=up)
+            for name, up in get_replicas().status().items()
+        }
     }
+    writer = get_group_commit_writer()
+    if writer is not None:
+        application_status['group_commit'] = writer.stats()
     return jsonify(application_status), 200
 
-@app.route('/orders', methods=['POST'])
+def _pool_metric_lines():
+    """
+    Describes the connection pools of the primary and replicas as metrics.
+
+    Returns:
+    - list: Lines in the Prometheus text format.
+    """
+    pools = {'primary': pool_stats(db.engine)}
+    for name, engine in get_replicas().engines.items():
+        pools[name] = pool_stats(engine)
+
+    lines = []
+    for metric, kind, key, help_text in (
+        ('db_pool_checked_out', 'gauge', 'checked_out', 'Connections in use.'),
+        ('db_pool_overflow', 'gauge', 'overflow', 'Connections open beyond the pool size.'),
+        ('db_pool_timeouts_total', 'counter', 'timeouts', 'Connection checkouts that timed out.'),
+    ):
+        lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} {kind}']
+        lines += [f'{metric}{{pool="{name}"}} {stats[key]}'
+                  for name, stats in pools.items() if key in stats]
+    return lines
+
+@bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Expose request, SQL and connection pool metrics to Prometheus."""
+    text = get_request_metrics().render(_pool_metric_lines())
+    return Response(text, mimetype='text/plain; version=0.0.4')
+
+def _projection(default_fields, include_items):
+    """
+    Reads the projection parameters of an order list request.
+
+    `?fields=` lists the order fields to return; naming `items` among them
+    includes the orders' items, which are otherwise skipped along with their
+    query. `?include=items` adds items to the view's default fields.
+
+    Args:
+    - default_fields (tuple): Fields of the view when `fields` is not given.
+    - include_items (bool): Whether the view includes items by default.
+
+    Returns:
+    - tuple: The `(fields, include_items)` to serialize.
+
+    Raises:
+    - ValueError: If a parameter names an unknown field.
+    """
+    fields = default_fields
+    requested = request.args.get('fields')
+    if requested is not None:
+        names = parse_fields(requested, ORDER_FIELDS + ('items',))
+        fields = tuple(name for name in names if name != 'items')
+        include_items = 'items' in names
+    include = request.args.get('include')
+    if include is not None:
+        # Parsed even when items are already included, so that an invalid
+        # value is rejected by every view
+        included = 'items' in parse_fields(include, ('items',))
+        include_items = include_items or included
+    return fields, include_items
+
+def _validate_order_data(order_data):
+    """
+    Checks an order payload against the rules for creating an order.
+
+    Args:
+    - order_data (dict): The order payload sent by the client.
+
+    Returns:
+    - str or None: Message describing the first problem found, or None if the
+      order is valid.
+    """
+    if not order_data:
+        return "No data provided"
+    if not isinstance(order_data, dict):
+        return "Order must be a JSON object"
+
+    required_fields = ['user_id', 'status', 'items']
+    for field in required_fields:
+        if field not in order_data:
+            return f"Missing '{field}' field"
+
+    valid_statuses = [
+        StatusEnum.PENDING.value,
+        StatusEnum.PROCESSING.value,
+        StatusEnum.SHIPPED.value
+    ]
+
+    status = order_data['status']
+    if not isinstance(status, str) or status.lower() not in valid_statuses:
+        return "Invalid status provided"
+
+    items = order_data['items']
+    if not isinstance(items, list):
+        return "Invalid items provided"
+    for item in items:
+        if not isinstance(item, dict) or not all(
+            isinstance(item.get(key), (int, float)) and not isinstance(item.get(key), bool)
+            for key in ('price', 'quantity')
+        ):
+            return "Invalid items provided"
+    return None
+
+@bp.route('/orders', methods=['POST'])
 def create_order():
     """Create a new order."""
     try:
         order_data = request.json
-        if not order_data:
-            return jsonify({"error": "No data provided"}), 400
-
-        required_fields = ['user_id', 'status', 'items']
-        for field in required_fields:
-            if field not in order_data:
-                return jsonify({"error": f"Missing '{field}' field"}), 400
+        idempotency = None
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if key is not None:
+            if not key or len(key) > MAX_KEY_LENGTH:
+                return jsonify({
+                    "error": f"{IDEMPOTENCY_HEADER} must be 1 to {MAX_KEY_LENGTH} characters"
+                }), 400
+            idempotency = (key, request_fingerprint(order_data))
+            order_id = find_order_for_key(*idempotency)
+            if order_id is not None:
+                return _order_created(order_id, replayed=True)
 
-        status = order_data['status'].lower()
-
-        valid_statuses = [
-            StatusEnum.PENDING.value,
-            StatusEnum.PROCESSING.value,
-            StatusEnum.SHIPPED.value
-        ]
+        error = _validate_order_data(order_data)
+        if error:
+            return jsonify({"error": error}), 400
 
-        if status not in valid_statuses:
-            return jsonify({"error": "Invalid status provided"}), 400
+        try:
+            order_id = order_service.create_new_order(order_data, idempotency)
+        except IntegrityError:
+            # A concurrent request with the same key stored it first
+            order_id = find_order_for_key(*idempotency) if idempotency else None
+            if order_id is None:
+                raise
+            return _order_created(order_id, replayed=True)
+        if idempotency:
+            remember_key(*idempotency, order_id)
+        return _order_created(order_id)
 
-        order_id = order_service.create_new_order(order_data)
-        return jsonify({"message": "New order created", "order_id": order_id}), 201
+    except IdempotencyKeyMismatchError as exception:
+        return jsonify({"error": str(exception)}), 422
 
     except KeyError as exception:
         return jsonify({"error": f"Missing key: {str(exception)}"}), 400
 
     except Exception as exception:
-        logging.error(f"Error processing order creation: {str(exception)}")
+        logging.exception("Error processing order creation: %r", exception)
+        return jsonify({"error": "An error occurred while processing the request"}), 500
+
+def _order_created(order_id, replayed=False):
+    """Respond to POST /orders, marking replays of an idempotency key."""
+    response = jsonify({"message": "New order created", "order_id": order_id})
+    if replayed:
+        response.headers[REPLAYED_HEADER] = 'true'
+    return response, 201
+
+def _read_bulk_orders():
+    """
+    Reads the orders of a bulk creation request.
+
+    The body is either a JSON array of orders, a JSON object with an `orders`
+    array, or newline-delimited JSON with one order per line.
+
+    Returns:
+    - list: The order payloads, not yet validated.
+
+    Raises:
+    - ValueError: If the body is not in one of the accepted formats.
+    """
+    if request.mimetype == 'application/x-ndjson':
+        orders_data = []
+        for line in request.stream:
+            if line.strip():
+                orders_data.append(json.loads(line))
+        return orders_data
+
+    payload = request.get_json(silent=True)
+    if isinstance(payload, dict):
+        payload = payload.get('orders')
+    if not isinstance(payload, list):
+        raise ValueError("Expected a list of orders")
+    return payload
+
+@bp.route('/orders/bulk', methods=['POST'])
+def create_orders_bulk():
+    """Create many orders in one request."""
+    try:
+        orders_data = _read_bulk_orders()
+    except ValueError as exception:
+        return jsonify({"error": str(exception)}), 400
+
+    try:
+        results = [None] * len(orders_data)
+        valid_indexes = []
+        for index, order_data in enumerate(orders_data):
+            error = _validate_order_data(order_data)
+            if error:
+                results[index] = {"index": index, "error": error}
+            else:
+                valid_indexes.append(index)
+
+        created = order_service.create_orders_bulk(
+            [orders_data[index] for index in valid_indexes]
+        )
+        for index, (order_id, error) in zip(valid_indexes, created):
+            if error:
+                results[index] = {"index": index, "error": error}
+            else:
+                results[index] = {"index": index, "order_id": order_id}
+
+        created_count = sum(1 for result in results if 'order_id' in result)
+        return jsonify({
+            "created": created_count,
+            "failed": len(results) - created_count,
+            "results": results
+        }), 200
+
+    except Exception as exception:
+        logging.error(f"Error processing bulk order creation: {str(exception)}")
         return jsonify({"error": "An error occurred while processing the request"}), 500
 
-@app.route('/orders', methods=['GET'])
+def _wants_stream():
+    """Whether the client asked for GET /orders as a stream of NDJSON lines."""
+    if request.args.get('stream', '').lower() in ('1', 'true'):
+        return True
+    best = request.accept_mimetypes.best_match(['application/json', 'application/x-ndjson'])
+    return best == 'application/x-ndjson'
+
+def _stream_orders(fields, include_items):
+    """Serialize every order as one JSON document per line."""
+    try:
+        for order in order_service.iter_all_orders(fields=fields, include_items=include_items):
+            yield current_app.json.dumps(order) + '\n'
+    except Exception as exception:
+        # Headers are already sent, so the failure can only end the stream
+        logging.exception("Error streaming orders: %s", str(exception))
+        raise
+
+def _parse_ids(values):
+    """
+    Converts a list of order IDs given as strings or numbers to integers.
+
+    Raises:
+    - ValueError: If the list is empty or a value is not an integer.
+    """
+    try:
+        order_ids = [int(value) for value in values if str(value).strip()]
+    except (TypeError, ValueError) as exception:
+        raise ValueError("'ids' must be a list of order IDs") from exception
+    if not order_ids:
+        raise ValueError("'ids' must be a list of order IDs")
+    return order_ids
+
+def _lookup_response(order_ids, fields, include_items):
+    """Respond with the orders matching `order_ids` and the IDs not found."""
+    orders, missing = order_service.get_orders_by_ids(order_ids, fields, include_items)
+    return jsonify({"orders": orders, "missing": missing}), 200
+
+@bp.route('/orders', methods=['GET'])
 def get_orders():
     """Route to retrieve all orders."""
     try:
-        orders = order_service.get_all_orders()
+        fields, include_items = _projection(ORDER_FIELDS, True)
+        if request.args.get('ids') is not None:
+            order_ids = _parse_ids(request.args['ids'].split(','))
+            return _lookup_response(order_ids, fields, include_items)
+        if _wants_stream():
+            return Response(
+                stream_with_context(_stream_orders(fields, include_items)),
+                mimetype='application/x-ndjson'
+            )
+        page = _page_args()
+        if page:
+            orders, next_cursor = order_service.get_orders_page(
+                *page, fields=fields, include_items=include_items)
+            return jsonify({"orders": orders, "next_cursor": next_cursor}), 200
+        orders = order_service.get_all_orders(fields, include_items)
         return jsonify(orders), 200
+    except ValueError as exception:
+        return jsonify({"error": str(exception)}), 400
     except Exception as exception:
         error_message = str(exception)
         return jsonify({"error": error_message}), 500
 
-@app.route('/orders/<int:order_id>', methods=['GET'])
+def _order_etag(order_id, version, updated_at, representation):
+    """Build the strong ETag of one representation of an order."""
+    stamp = updated_at.strftime('%Y%m%d%H%M%S%f') if updated_at else ''
+    return f"{representation}-{order_id}-{version}-{stamp}"
+
+def _is_not_modified(etag, last_modified):
+    """
+    Evaluate the conditional headers of a GET request.
+
+    If-None-Match takes precedence over If-Modified-Since, as in RFC 9110.
+
+    Args:
+    - etag (str): Current ETag of the resource.
+    - last_modified (datetime or None): Naive UTC modification time.
+
+    Returns:
+    - bool: True if the client's copy is current and 304 can be returned.
+    """
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified:
+        last_modified = last_modified.replace(microsecond=0, tzinfo=timezone.utc)
+        return last_modified <= request.if_modified_since
+    return False
+
+def _with_validators(response, etag, last_modified):
+    """Attach the ETag and Last-Modified headers to a response."""
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    return response
+
+def _conditional_order_response(order_id, representation):
+    """
+    Answer a conditional GET for an order with 304 when possible.
+
+    Args:
+    - order_id (int): ID of the requested order.
+    - representation (str): Name distinguishing the order's representations.
+
+    Returns:
+    - tuple: A 304 response, or None if the full response is needed, and the
+      order's `(version, updated_at)` if they were read, else None.
+    """
+    if not (request.if_none_match or request.if_modified_since):
+        return None, None
+    validators = order_service.get_order_validators(order_id)
+    if not validators:
+        return None, None
+    version, updated_at = validators
+    etag = _order_etag(order_id, version, updated_at, representation)
+    if _is_not_modified(etag, updated_at):
+        return (_with_validators(current_app.response_class(status=304), etag, updated_at),
+                validators)
+    return None, validators
+
+# CHANGES_FEED_LAG_SECONDS covers transactions still committing on the
+# primary, not replication lag: a lagging replica would let the cursor move
+# past changes it has not received yet
+@bp.route('/orders/changes', methods=['GET'])
+@primary_only
+def get_order_changes():
+    """Get the orders created, updated or canceled since a cursor."""
+    try:
+        limit = parse_limit(
+            request.args.get('limit'),
+            current_app.config['ORDERS_PAGE_DEFAULT_LIMIT'],
+            current_app.config['ORDERS_PAGE_MAX_LIMIT']
+        )
+        fields, include_items = _projection(ORDER_FIELDS, True)
+        changes, next_cursor, has_more = order_service.get_changes(
+            limit, request.args.get('since'), fields, include_items)
+        return jsonify({
+            "changes": changes,
+            "next_cursor": next_cursor,
+            "has_more": has_more
+        }), 200
+
+    except ValueError as exception:
+        return jsonify({"error": str(exception)}), 400
+    except Exception as exception:
+        logging.exception("Error: %s", str(exception))
+        return jsonify({"error": "An error occurred while processing the request"}), 500
+
+def _datetime_arg(name):
+    """
+    Reads an ISO 8601 date or date and time from the query string.
+
+    Args:
+    - name (str): Name of the query string parameter.
+
+    Returns:
+    - datetime or None: The value as naive UTC, or None if it is not given.
+
+    Raises:
+    - ValueError: If the value is not an ISO 8601 date or date and time.
+    """
+    value = request.args.get(name)
+    if value is None:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError as exception:
+        raise ValueError(f"{name} must be an ISO 8601 date or date and time") from exception
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+@bp.route('/orders/stats', methods=['GET'])
+def get_order_stats():
+    """Get aggregate order statistics computed in the database."""
+    try:
+        top = request.args.get('top', '10')
+        if not top.isdigit() or not 1 <= int(top) <= STATS_MAX_TOP:
+            raise ValueError(f"top must be between 1 and {STATS_MAX_TOP}")
+        stats = order_stats_service.get_stats(
+            start=_datetime_arg('from'),
+            end=_datetime_arg('to'),
+            bucket=request.args.get('bucket', 'day'),
+            top=int(top)
+        )
+        return jsonify(stats), 200
+
+    except ValueError as exception:
+        return jsonify({"error": str(exception)}), 400
+    except Exception as exception:
+        logging.exception("Error: %s", str(exception))
+        return jsonify({"error": "An error occurred while processing the request"}), 500
+
+@bp.route('/orders/lookup', methods=['POST'])
+@read_only
+def lookup_orders():
+    """Retrieve many orders by ID, for ID lists too long for a query string."""
+    try:
+        lookup_data = request.get_json(silent=True)
+        order_ids = lookup_data.get('ids') if isinstance(lookup_data, dict) else None
+        if not isinstance(order_ids, list) or not all(_is_valid_id(i) for i in order_ids):
+            return jsonify({"error": "'ids' must be a list of order IDs"}), 400
+        fields, include_items = _projection(ORDER_FIELDS, True)
+        return _lookup_response(_parse_ids(order_ids), fields, include_items)
+
+    except ValueError as exception:
+        return jsonify({"error": str(exception)}), 400
+    except Exception as exception:
+        logging.error(f"Error processing order lookup: {str(exception)}")
+        return jsonify({"error": "An error occurred while processing the request"}), 500
+
+@bp.route('/orders/<int:order_id>', methods=['GET'])
 def get_order_details(order_id):
     """Get details of a specific order by order ID."""
     try:
-        order = order_service.get_order_by_id(order_id)
+        not_modified, validators = _conditional_order_response(order_id, 'order')
+        if not_modified:
+            return not_modified
+
+        # A poller's conditional request also refreshes an order cached
+        # before another worker changed it
+        order = order_service.get_order_by_id(order_id, validators[0] if validators else None)
         if order:
-            return jsonify(order), 200
+            etag = _order_etag(order_id, order['version'], order['updated_at'], 'order')
+            return _with_validators(jsonify(order), etag, order['updated_at']), 200
         return jsonify({"message": "Order not found"}), 404
 
     except Exception as exception:
         return jsonify({"error": str(exception)}), 500
 
-@app.route('/orders/<int:order_id>', methods=['PATCH'])
+@bp.route('/orders/<int:order_id>', methods=['PATCH'])
 def update_order_status(order_id):
     """Update the status of an order by order ID."""
     try:
@@ -93,7 +563,7 @@ def update_order_status(order_id):
         if not status_data:
             return jsonify({"error": "No data provided"}), 400
 
-        new_status = status_data.get('status').lower()
+        new_status = status_data.get('status')
 
         if not new_status:
             return jsonify({"error": "Incomplete data provided"}), 400
@@ -104,31 +574,105 @@ def update_order_status(order_id):
             StatusEnum.SHIPPED.value
         ]
 
-        if new_status not in valid_statuses:
-            return jsonify({"error": "Invalid status provided"}), 400
+        for field in ('status', 'expected_status'):
+            value = status_data.get(field)
+            if value is not None and (
+                not isinstance(value, str) or value.lower() not in valid_statuses
+            ):
+                return jsonify({"error": "Invalid status provided"}), 400
+
+        expected_version = status_data.get('expected_version')
+        if expected_version is not None and (
+            not isinstance(expected_version, int) or isinstance(expected_version, bool)
+        ):
+            return jsonify({"error": "Invalid expected_version provided"}), 400
 
         success = order_service.update_order_status(order_id, status_data)
         if success:
             return jsonify({"message": "Order status updated"}), 200
         return jsonify({"message": "Order not found"}), 404
 
+    except OrderConflictError as exception:
+        return jsonify({"error": str(exception)}), 409
     except ValueError:
         return jsonify({"error": "Invalid JSON format"}), 400
     except Exception as exception:
         return jsonify({"error": str(exception)}), 500
 
-@app.route('/orders/user/<int:user_id>', methods=['GET'])
+def _is_valid_status(value):
+    """Whether `value` names one of the order statuses."""
+    return isinstance(value, str) and value.lower() in [status.value for status in StatusEnum]
+
+def _is_valid_id(value):
+    """Whether `value` is a usable order or user ID."""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+@bp.route('/orders/status', methods=['PATCH'])
+def update_orders_status_bulk():
+    """Change the status of many orders, selected by ID or by filter."""
+    try:
+        status_data = request.get_json(silent=True)
+        if not isinstance(status_data, dict):
+            return jsonify({"error": "No data provided"}), 400
+        if not _is_valid_status(status_data.get('status')):
+            return jsonify({"error": "Invalid status provided"}), 400
+
+        order_ids = status_data.get('ids')
+        filters = status_data.get('filter')
+        if (order_ids is None) == (filters is None):
+            return jsonify({"error": "Provide either 'ids' or 'filter'"}), 400
+        if order_ids is not None and (
+            not isinstance(order_ids, list) or not all(_is_valid_id(i) for i in order_ids)
+        ):
+            return jsonify({"error": "'ids' must be a list of order IDs"}), 400
+        if filters is not None and (
+            not isinstance(filters, dict) or not filters
+            or set(filters) - {'status', 'user_id'}
+            or ('status' in filters and not _is_valid_status(filters['status']))
+            or ('user_id' in filters and not _is_valid_id(filters['user_id']))
+        ):
+            return jsonify({"error": "'filter' accepts 'status' and 'user_id'"}), 400
+
+        counts = order_service.update_orders_status(
+            status_data['status'], order_ids=order_ids, filters=filters
+        )
+        return jsonify(counts), 200
+
+    except Exception as exception:
+        logging.error(f"Error processing bulk status update: {str(exception)}")
+        return jsonify({"error": "An error occurred while processing the request"}), 500
+
+@bp.route('/orders/user/<int:user_id>', methods=['GET'])
 def get_orders_by_user(user_id):
     """Get orders associated with a specific user."""
     try:
-        orders = order_service.get_orders_by_user(user_id)
+        fields, include_items = _projection(USER_ORDER_FIELDS, False)
+        page = _page_args()
+        if page:
+            orders, next_cursor = order_service.get_orders_page(
+                *page, user_id=user_id, fields=fields, include_items=include_items)
+            return jsonify({"orders": orders, "next_cursor": next_cursor}), 200
+        orders = order_service.get_orders_by_user(user_id, fields, include_items)
         return jsonify(orders), 200
 
+    except ValueError as exception:
+        return jsonify({"error": str(exception)}), 400
     except Exception as exception:
         logging.exception("Error: %s", str(exception))
         return jsonify({"error": "An error occurred while processing the request"}), 500
 
-@app.route('/orders/<int:order_id>', methods=['DELETE'])
+@bp.route('/users/<int:user_id>/order-summary', methods=['GET'])
+def get_user_order_summary(user_id):
+    """Get the precomputed order summary of a user."""
+    try:
+        summary = user_order_summary_service.get_summary(user_id)
+        return jsonify(summary), 200
+
+    except Exception as exception:
+        logging.exception("Error: %s", str(exception))
+        return jsonify({"error": "An error occurred while processing the request"}), 500
+
+@bp.route('/orders/<int:order_id>', methods=['DELETE'])
 def cancel_order(order_id):
     """Cancel an order by order ID."""
     try:
@@ -140,22 +684,63 @@ def cancel_order(order_id):
     except Exception as exception:
         return jsonify({"error": str(exception)}), 500
 
-@app.route('/orders/status/<string:status>', methods=['GET'])
+@bp.route('/orders/cancel', methods=['POST'])
+def cancel_orders_bulk():
+    """Cancel many orders by ID."""
+    try:
+        cancel_data = request.get_json(silent=True)
+        order_ids = cancel_data.get('ids') if isinstance(cancel_data, dict) else None
+        if not isinstance(order_ids, list) or not all(_is_valid_id(i) for i in order_ids):
+            return jsonify({"error": "'ids' must be a list of order IDs"}), 400
+
+        counts = order_service.cancel_orders(order_ids)
+        return jsonify(counts), 200
+
+    except Exception as exception:
+        logging.error(f"Error processing bulk cancellation: {str(exception)}")
+        return jsonify({"error": "An error occurred while processing the request"}), 500
+
+@bp.route('/orders/status/<string:status>', methods=['GET'])
 def get_orders_by_status(status):
     """Get orders by their status."""
     try:
-        orders = order_service.get_orders_by_status(status)
+        fields, include_items = _projection(ORDER_FIELDS, True)
+        page = _page_args()
+        if page:
+            orders, next_cursor = order_service.get_orders_page(
+                *page, status=status, fields=fields, include_items=include_items)
+            return jsonify({"orders": orders, "next_cursor": next_cursor}), 200
+        orders = order_service.get_orders_by_status(status, fields, include_items)
         return jsonify(orders), 200
 
+    except ValueError as exception:
+        return jsonify({"error": str(exception)}), 400
     except Exception as exception:
         return jsonify({"error": str(exception)}), 500
 
-@app.route('/orders/<int:order_id>/items', methods=['GET'])
+@bp.route('/orders/<int:order_id>/items', methods=['GET'])
 def get_order_items(order_id):
     """Get all order items for a specific order."""
     try:
-        items = order_item_service.get_order_items(order_id)
+        fields, representation = ORDER_ITEM_FIELDS, 'items'
+        if request.args.get('fields') is not None:
+            fields = parse_fields(request.args['fields'], ORDER_ITEM_FIELDS)
+            # Each projection is a representation of its own, with its own ETag
+            representation = 'items:' + ','.join(fields)
+
+        not_modified, validators = _conditional_order_response(order_id, representation)
+        if not_modified:
+            return not_modified
+
+        validators = validators or order_service.get_order_validators(order_id)
+        items = order_item_service.get_order_items(order_id, fields)
+        if validators:
+            version, updated_at = validators
+            etag = _order_etag(order_id, version, updated_at, representation)
+            return _with_validators(jsonify(items), etag, updated_at), 200
         return jsonify(items), 200
 
+    except ValueError as exception:
+        return jsonify({"error": str(exception)}), 400
     except Exception as exception:
         return jsonify({"error": str(exception)}), 500
@@ -0,0 +1,93 @@
+"""
+The 'serializers' module turns order and order item rows into JSON-ready dicts.
+
+Reads select only the columns a response needs with Core statements and hand
+the resulting rows to `serialize_rows`, which skips building ORM objects and
+their identity-map bookkeeping. Field lists double as the projection accepted
+from clients through `?fields=`.
+"""
+from app.models import Order, OrderItem
+from app.profiling import phase
+
+# Fields of an order in the full order representation
+ORDER_FIELDS = ('id', 'user_id', 'total_price', 'status', 'version', 'created_at', 'updated_at')
+
+# Fields of an order in the per-user listing
+USER_ORDER_FIELDS = ('id', 'user_id', 'total_price', 'status')
+
+# Fields of an item nested in an order
+ITEM_FIELDS = ('id', 'product_id', 'quantity', 'price', 'created_at')
+
+# Fields of an item listed on its own
+ORDER_ITEM_FIELDS = ('id', 'order_id', 'product_id', 'quantity', 'price', 'created_at')
+
+
+def parse_fields(value, allowed):
+    """
+    Parses a comma-separated list of field names.
+
+    Args:
+    - value (str): Raw value of a `fields` or `include` parameter.
+    - allowed (tuple): Accepted field names.
+
+    Returns:
+    - tuple: The requested names, without duplicates, in request order.
+
+    Raises:
+    - ValueError: If the list is empty or names an unknown field.
+    """
+    names = tuple(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+    if not names:
+        raise ValueError("No fields requested")
+    unknown = [name for name in names if name not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return names
+
+
+def _columns(table, fields, required):
+    """Columns selecting `fields`, followed by any `required` ones missing from it."""
+    names = list(fields) + [name for name in required if name not in fields]
+    return [table.c[name] for name in names]
+
+
+def order_columns(fields, *required):
+    """
+    Lists the `orders` columns to select for a projection.
+
+    Args:
+    - fields (tuple): Serialized order fields, selected first and in order.
+    - required (str): Extra columns the caller needs, e.g. `id` to attach
+      items, selected after `fields` unless already part of them.
+
+    Returns:
+    - list: Columns for a Core `select`.
+    """
+    return _columns(Order.__table__, fields, required)
+
+
+def item_columns(fields, *required):
+    """Lists the `order_items` columns to select, like `order_columns`."""
+    return _columns(OrderItem.__table__, fields, required)
+
+
+def serialize_rows(rows, fields):
+    """
+    Builds one dict per row from its first `len(fields)` values.
+
+    Args:
+    - rows (list): Rows selected with `order_columns` or `item_columns`.
+    - fields (tuple): Names of the leading values of each row.
+
+    Returns:
+    - list: Serialized rows, with statuses converted to their string value.
+    """
+    has_status = 'status' in fields
+    serialized = []
+    with phase('serialization'):
+        for row in rows:
+            data = dict(zip(fields, row))
+            if has_status and data['status'] is not None:
+                data['status'] = data['status'].value
+            serialized.append(data)
+    return serialized
@@ -3,21 +3,309 @@ The 'OrderService' module manages operations related to orders within the applic
 It includes functionalities for creating, retrieving, updating, and canceling orders,
 as well as calculating order totals and fetching orders based on specific criteria.
 """
-from datetime import datetime
+import logging
+from collections import namedtuple
+from concurrent import futures
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import case, delete, func, insert, literal, or_, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
 from app import db
-from app.models import Order, OrderItem
+from app.cache import get_order_cache, get_order_stats_cache
+from app.group_commit import get_group_commit_writer
+from app.idempotency import record_keys
+from app.models import (
+    Order, OrderItem, OrderTombstone, StatusEnum, UserOrderSummary, source_statuses
+)
+from app.outbox import (
+    ORDER_CANCELED, ORDER_CREATED, ORDER_STATUS_CHANGED, record_events, record_events_for
+)
+from app.pagination import decode_cursor, encode_cursor, paginate
+from app.replicas import reads_from_replica, reads_own_writes
+from app.serializers import (
+    ITEM_FIELDS, ORDER_FIELDS, ORDER_ITEM_FIELDS, USER_ORDER_FIELDS,
+    item_columns, order_columns, serialize_rows
+)
+
+
+class OrderConflictError(Exception):
+    """
+    Raised when an order cannot be changed because of its current state, i.e.
+    the requested status transition is not allowed or a precondition on the
+    order's status or version no longer holds.
+    """
+
+
+def _chunked(values, size):
+    """
+    Splits a sequence into consecutive chunks.
+
+    Args:
+    - values (list): Values to split.
+    - size (int): Maximum number of values per chunk.
+
+    Returns:
+    - generator: Lists of at most `size` values, in their original order.
+    """
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _created_payload(order_data, total_price):
+    """
+    Builds the payload of an `order.created` outbox event.
+
+    Args:
+    - order_data (dict): Validated order payload.
+    - total_price (float): Total price of the order.
+
+    Returns:
+    - dict: The order's user, status, total price and items.
+    """
+    return {
+        'user_id': order_data.get('user_id'),
+        'status': order_data.get('status').lower(),
+        'total_price': total_price,
+        'items': [
+            {
+                'product_id': item_data.get('product_id'),
+                'quantity': item_data.get('quantity'),
+                'price': item_data.get('price')
+            }
+            for item_data in order_data.get('items', [])
+        ]
+    }
+
+
+# Dialects whose INSERT supports ON CONFLICT ... DO UPDATE
+_UPSERT_INSERTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+# Result of `_update_order_status`, shaped like the row PostgreSQL returns
+_StatusChange = namedtuple('_StatusChange', ('user_id', 'old_status'))
+
+_SUMMARY_COUNTERS = ('order_count', 'total_spend') + tuple(
+    f'{status.value}_count' for status in StatusEnum
+)
+
+
+def _summary_delta(deltas, user_id):
+    """
+    Returns the pending change to a user's order summary, creating it if needed.
+
+    Args:
+    - deltas (dict): Changes being accumulated, by user ID.
+    - user_id (int): ID of the user.
+
+    Returns:
+    - dict: Amounts to add to each summary counter, plus the `last_order_at`
+      of any new order.
+    """
+    if user_id not in deltas:
+        deltas[user_id] = dict.fromkeys(_SUMMARY_COUNTERS, 0)
+        deltas[user_id]['last_order_at'] = None
+    return deltas[user_id]
+
+
+def _apply_summary_deltas(deltas, refresh_last_order=False):
+    """
+    Adds accumulated changes to the users' order summaries in one statement.
+
+    Summaries missing for a user are created, so concurrent first orders of
+    the same user cannot conflict. `last_order_at` only moves forward,
+    unless `refresh_last_order` asks to recompute it from the user's
+    remaining orders, which the (user_id, created_at) index answers directly.
+    Databases without INSERT ... ON CONFLICT are updated user by user with
+    `_apply_summary_delta`.
+
+    Args:
+    - deltas (dict): Changes by user ID, built with `_summary_delta`.
+    - refresh_last_order (bool): Whether orders were removed.
+    """
+    if not deltas:
+        return
+    dialect = db.session.get_bind().dialect.name
+    if dialect not in _UPSERT_INSERTS:
+        for user_id, delta in deltas.items():
+            _apply_summary_delta(user_id, delta, refresh_last_order)
+        return
+    statement = _UPSERT_INSERTS[dialect](UserOrderSummary)
+    summary = UserOrderSummary.__table__.c
+    changes = {name: summary[name] + statement.excluded[name] for name in _SUMMARY_COUNTERS}
+    if refresh_last_order:
+        changes['last_order_at'] = select(func.max(Order.created_at)).where(
+            Order.user_id == summary.user_id
+        ).scalar_subquery()
+    else:
+        changes['last_order_at'] = case(
+            (statement.excluded.last_order_at.is_(None), summary.last_order_at),
+            (or_(summary.last_order_at.is_(None),
+                 summary.last_order_at < statement.excluded.last_order_at),
+             statement.excluded.last_order_at),
+            else_=summary.last_order_at
+        )
+    db.session.execute(
+        statement.on_conflict_do_update(index_elements=['user_id'], set_=changes),
+        [dict(delta, user_id=user_id) for user_id, delta in deltas.items()]
+    )
+
+
+def _apply_summary_delta(user_id, delta, refresh_last_order):
+    """
+    Adds one user's change to their order summary without an upsert.
+
+    The summary is updated in place; if the user has none yet, it is
+    inserted in a savepoint, and the update retried once should a
+    concurrent transaction have inserted it first.
+
+    Args:
+    - user_id (int): ID of the user.
+    - delta (dict): The user's change, from `_summary_delta`.
+    - refresh_last_order (bool): Whether orders were removed.
+    """
+    summary = UserOrderSummary.__table__.c
+    changes = {name: summary[name] + delta[name] for name in _SUMMARY_COUNTERS}
+    last_order_at = delta['last_order_at']
+    if refresh_last_order:
+        last_order_at = select(func.max(Order.created_at)).where(
+            Order.user_id == user_id
+        ).scalar_subquery()
+        changes['last_order_at'] = last_order_at
+    elif last_order_at is not None:
+        changes['last_order_at'] = case(
+            (or_(summary.last_order_at.is_(None), summary.last_order_at < last_order_at),
+             last_order_at),
+            else_=summary.last_order_at
+        )
+    update_summary = update(UserOrderSummary).where(
+        summary.user_id == user_id
+    ).values(changes).execution_options(synchronize_session=False)
+    if db.session.execute(update_summary).rowcount:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.execute(insert(UserOrderSummary).values(
+                user_id=user_id, last_order_at=last_order_at,
+                **{name: delta[name] for name in _SUMMARY_COUNTERS}
+            ))
+    except IntegrityError:
+        if not db.session.execute(update_summary).rowcount:
+            raise
+
+
+def _count_new_order(delta, status, total_price, created_at):
+    """
+    Adds a new order to a user's summary change.
+
+    Args:
+    - delta (dict): The user's change, from `_summary_delta`.
+    - status (StatusEnum): Status of the order.
+    - total_price (float): Total price of the order.
+    - created_at (datetime): Creation time of the order.
+    """
+    delta['order_count'] += 1
+    delta['total_spend'] += total_price or 0
+    delta[f'{status.value}_count'] += 1
+    if delta['last_order_at'] is None or delta['last_order_at'] < created_at:
+        delta['last_order_at'] = created_at
+
+
+def _update_order_status(order_id, conditions, sources, new_status):
+    """
+    Moves an order to `new_status` with one conditional UPDATE.
+
+    The UPDATE reads the order's current status in a FROM subquery and only
+    matches if it is still that status and one of `sources`. PostgreSQL
+    returns it from the same statement; SQLite cannot return columns of a
+    FROM subquery, so there the status is read just before the UPDATE,
+    unless `sources` leaves only one possibility.
+
+    Args:
+    - order_id (int): ID of the order.
+    - conditions (list): Further conditions the order must meet.
+    - sources (list): Statuses allowed to change to `new_status`.
+    - new_status (StatusEnum): The new status.
+
+    Returns:
+    - Row or None: `user_id` and `old_status` of the updated order, or None
+      if no order matched.
+    """
+    previous = select(
+        Order.id, Order.status.label('old_status')
+    ).where(Order.id == order_id).subquery('previous')
+    statement = update(Order).values(
+        status=new_status,
+        updated_at=datetime.utcnow(),
+        version=Order.version + 1
+    ).execution_options(synchronize_session=False)
+
+    if db.session.get_bind().dialect.name == 'sqlite':
+        old_status = sources[0] if len(sources) == 1 else db.session.execute(
+            select(previous.c.old_status)
+        ).scalar()
+        if old_status not in sources:
+            return None
+        user_id = db.session.execute(
+            statement.where(Order.id == order_id, Order.status == old_status, *conditions)
+            .returning(Order.user_id)
+        ).scalar()
+        return None if user_id is None else _StatusChange(user_id, old_status)
+
+    return db.session.execute(
+        statement.where(
+            Order.id == previous.c.id,
+            Order.status == previous.c.old_status,
+            Order.status.in_(sources),
+            *conditions
+        ).returning(Order.user_id, previous.c.old_status)
+    ).first()
+
+
+def _load_items_by_order(order_ids, fields=ITEM_FIELDS):
+    """
+    Loads and serializes the items of many orders using batched IN queries.
+
+    The IDs are split into chunks of `IN_CLAUSE_CHUNK_SIZE` so that very large
+    result sets stay within the database's bound-parameter limits, which keeps
+    the number of queries constant per chunk instead of one per order.
+
+    Args:
+    - order_ids (list): IDs of the orders whose items should be loaded.
+    - fields (tuple): Item fields to serialize.
+
+    Returns:
+    - dict: Mapping of order ID to a list of serialized items.
+    """
+    items_by_order = {order_id: [] for order_id in order_ids}
+    columns = item_columns(fields, 'order_id')
+    chunk_size = current_app.config.get('IN_CLAUSE_CHUNK_SIZE', 500)
+    for chunk in _chunked(order_ids, chunk_size):
+        rows = db.session.execute(
+            select(*columns).where(OrderItem.order_id.in_(chunk)).order_by(OrderItem.id)
+        ).all()
+        for row, item in zip(rows, serialize_rows(rows, fields)):
+            items_by_order[row.order_id].append(item)
+    return items_by_order
 
 class OrderService:
     """
     A class handling various operations related to orders.
     """
 
-    def create_new_order(self, order_data):
+    def create_new_order(self, order_data, idempotency=None):
         """
         Creates a new order.
-        
+
+        The order and its items are written like a bulk chunk of one, with
+        one INSERT for the order and one for all of its items, so the number
+        of statements does not depend on how many items it has. With group
+        commit enabled, the order is written by the app's writer thread in a
+        transaction shared with concurrent creations instead.
+
         Args:
         - order_data (dict): Data for the new order.
+        - idempotency (tuple or None): `(key, request_hash)` of the request's
+          idempotency key, stored in the order's transaction.
 
         Returns:
         - int: The ID of the created order.
@@ -25,80 +313,329 @@ class OrderService:
         Raises:
         - Exception: If an error occurs during order creation.
         """
+        writer = get_group_commit_writer()
+        if writer is not None:
+            future = writer.submit(order_data, idempotency)
+            try:
+                return future.result(timeout=current_app.config['GROUP_COMMIT_TIMEOUT'])
+            except futures.TimeoutError:
+                # An order still queued is withdrawn, so the error is true;
+                # one the writer already took may be committed, so await it
+                if future.cancel():
+                    raise
+                return future.result()
         try:
-            user_id = order_data.get('user_id')
-            status = order_data.get('status')
+            order_id = self._insert_orders([order_data], [idempotency])[0]
+            db.session.commit()
+            # IDs of deleted orders can be reused, e.g. by SQLite
+            get_order_cache().delete(order_id)
+            return order_id
+        except Exception as exception:
+            db.session.rollback()
+            raise exception
 
-            items_data = order_data.get('items', [])
+    def create_orders_bulk(self, orders_data, chunk_size=None):
+        """
+        Creates many orders using multi-row INSERT statements.
 
-            # Create the Order object
-            new_order = Order(
-                user_id=user_id,
-                status=status.upper(),
-            )
+        Orders are written in chunks of `chunk_size`, each chunk in its own
+        transaction with one INSERT for the orders and one for their items.
+        A chunk that fails is rolled back and reported without affecting the
+        other chunks.
 
-            total_price = 0
+        Args:
+        - orders_data (list): Validated order payloads, as for `create_new_order`.
+        - chunk_size (int or None): Orders per transaction; defaults to the
+          `BULK_INSERT_CHUNK_SIZE` setting.
 
-            # Add OrderItems to the new order and calculate total price
-            for item_data in items_data:
-                price = item_data.get('price')
-                quantity = item_data.get('quantity')
-                total_price += price * quantity
+        Returns:
+        - list: One `(order_id, error)` tuple per order, in input order, where
+          exactly one of the two values is None.
+        """
+        chunk_size = chunk_size or current_app.config['BULK_INSERT_CHUNK_SIZE']
+        results = []
+        for chunk in _chunked(orders_data, chunk_size):
+            try:
+                order_ids = self._insert_orders(chunk)
+                db.session.commit()
+                for order_id in order_ids:
+                    get_order_cache().delete(order_id)
+                results.extend((order_id, None) for order_id in order_ids)
+            except Exception as exception:
+                db.session.rollback()
+                logging.error(f"Error storing bulk order chunk: {str(exception)}")
+                results.extend((None, "Failed to store order") for _ in chunk)
+        return results
 
-                new_order.items.append(OrderItem(
-                    product_id=item_data.get('product_id'),
-                    quantity=quantity,
-                    price=price
-                ))
+    def _insert_orders(self, orders_data, idempotency_keys=None):
+        """
+        Inserts orders and their items without committing.
 
-            new_order.total_price = total_price
+        Args:
+        - orders_data (list): Validated order payloads.
+        - idempotency_keys (list or None): `(key, request_hash)` or None per
+          order, the idempotency key to store with it.
 
-            db.session.add(new_order)
-            db.session.commit()
-            return new_order.id
-        except Exception as exception:
-            db.session.rollback()
-            raise exception
+        Returns:
+        - list: IDs of the inserted orders, in input order.
+        """
+        now = datetime.utcnow()
+        order_rows = []
+        for order_data in orders_data:
+            items_data = order_data.get('items', [])
+            order_rows.append({
+                'user_id': order_data.get('user_id'),
+                'status': StatusEnum[order_data.get('status').upper()],
+                'total_price': sum(
+                    item_data.get('price') * item_data.get('quantity')
+                    for item_data in items_data
+                ),
+                'created_at': now,
+                'updated_at': now
+            })
 
-    def get_all_orders(self):
+        # Backends with an implicit insert sentinel (e.g. PostgreSQL) batch
+        # this into multi-row statements; SQLite falls back to one row per
+        # statement, still within the chunk's single transaction
+        order_ids = db.session.execute(
+            insert(Order).returning(Order.id, sort_by_parameter_order=True),
+            order_rows
+        ).scalars().all()
+
+        item_rows = [
+            {
+                'order_id': order_id,
+                'product_id': item_data.get('product_id'),
+                'quantity': item_data.get('quantity'),
+                'price': item_data.get('price'),
+                'created_at': now
+            }
+            for order_id, order_data in zip(order_ids, orders_data)
+            for item_data in order_data.get('items', [])
+        ]
+        if item_rows:
+            db.session.execute(insert(OrderItem), item_rows)
+        deltas = {}
+        for order_row in order_rows:
+            _count_new_order(
+                _summary_delta(deltas, order_row['user_id']),
+                order_row['status'], order_row['total_price'], now
+            )
+        _apply_summary_deltas(deltas)
+        record_events(ORDER_CREATED, [
+            (order_id, _created_payload(order_data, order_row['total_price']))
+            for order_id, order_data, order_row in zip(order_ids, orders_data, order_rows)
+        ])
+        keys = [
+            (*idempotency, order_id)
+            for idempotency, order_id in zip(idempotency_keys or [], order_ids)
+            if idempotency is not None
+        ]
+        if keys:
+            record_keys(keys)
+        return order_ids
+
+    def get_all_orders(self, fields=ORDER_FIELDS, include_items=True):
         """
         Fetches all orders from the database and formats them into a list of dictionaries.
 
+        Items are loaded for all orders at once in batched queries rather than
+        through each order's dynamic `items` relationship.
+
+        Args:
+        - fields (tuple): Order fields to serialize.
+        - include_items (bool): Whether to attach each order's items.
+
         Returns:
         list: A list containing dictionaries, each representing an order with the following keys:
         """
-        orders = Order.query.all()
-        formated_orders = []
-        for order in orders:
-            items = []
-            for item in order.items:
-                item_info = {
-                    'id': item.id,
-                    'product_id': item.product_id,
-                    'quantity': item.quantity,
-                    'price': item.price,
-                    'created_at': item.created_at
-                }
-                items.append(item_info)
-
-            formatted_order = {
-                'id': order.id,
-                'user_id': order.user_id,
-                'total_price': order.total_price,
-                'status': order.status.value,
-                'created_at': order.created_at,
-                'updated_at': order.updated_at,
-                'items': items
-            }
-            formated_orders.append(formatted_order)
-        return formated_orders
+        rows = db.session.execute(select(*order_columns(fields, 'id'))).all()
+        return self._serialize_orders(rows, fields, include_items)
+
+    def iter_all_orders(self, batch_size=None, fields=ORDER_FIELDS, include_items=True):
+        """
+        Yields every order without materializing the whole table.
+
+        Orders are fetched in `id` order through a streaming result with
+        `yield_per`, which uses a server-side cursor where the driver supports
+        one, and the items of each fetched partition are loaded in one batched
+        query. At most `batch_size` orders are held in memory at a time.
+
+        Args:
+        - batch_size (int or None): Orders fetched per partition; defaults to
+          the `ORDERS_STREAM_BATCH_SIZE` setting.
+        - fields (tuple): Order fields to serialize.
+        - include_items (bool): Whether to attach each order's items.
+
+        Returns:
+        - generator: Serialized orders in the format of `get_all_orders`.
+        """
+        batch_size = batch_size or current_app.config['ORDERS_STREAM_BATCH_SIZE']
+        result = db.session.execute(
+            select(*order_columns(fields, 'id')).order_by(Order.id)
+            .execution_options(yield_per=batch_size)
+        )
+        for rows in result.partitions():
+            yield from self._serialize_orders(rows, fields, include_items)
+
+    def get_orders_by_ids(self, order_ids, fields=ORDER_FIELDS, include_items=True):
+        """
+        Retrieves many orders by ID.
+
+        Orders and their items are each fetched with one IN query per chunk of
+        `IN_CLAUSE_CHUNK_SIZE` IDs, so up to that many orders cost two queries.
+
+        Args:
+        - order_ids (list): IDs of the orders to retrieve.
+        - fields (tuple): Order fields to serialize.
+        - include_items (bool): Whether to attach each order's items.
+
+        Returns:
+        - tuple: The serialized orders found, in the order their IDs were
+          given, and the list of IDs that do not exist.
+        """
+        order_ids = list(dict.fromkeys(order_ids))
+        columns = order_columns(fields, 'id')
+        rows_by_id = {}
+        chunk_size = current_app.config.get('IN_CLAUSE_CHUNK_SIZE', 500)
+        for chunk in _chunked(order_ids, chunk_size):
+            rows = db.session.execute(select(*columns).where(Order.id.in_(chunk))).all()
+            rows_by_id.update((row.id, row) for row in rows)
+
+        rows = [rows_by_id[order_id] for order_id in order_ids if order_id in rows_by_id]
+        missing = [order_id for order_id in order_ids if order_id not in rows_by_id]
+        return self._serialize_orders(rows, fields, include_items), missing
+
+    def get_orders_page(self, limit, cursor=None, user_id=None, status=None,
+                        fields=ORDER_FIELDS, include_items=True):
+        """
+        Retrieves one page of orders using keyset pagination.
+
+        Args:
+        - limit (int): Maximum number of orders on the page.
+        - cursor (str or None): Cursor returned with the previous page.
+        - user_id (int or None): Only return orders of this user.
+        - status (str or None): Only return orders with this status.
+        - fields (tuple): Order fields to serialize.
+        - include_items (bool): Whether to attach each order's items.
+
+        Returns:
+        - tuple: Serialized orders of the page and the cursor of the next
+          page, or None if there are no more orders.
 
-    def get_order_by_id(self, order_id):
+        Raises:
+        - InvalidCursorError: If the cursor is malformed.
+        """
+        statement = select(*order_columns(fields, 'id', 'created_at'))
+        if user_id is not None:
+            statement = statement.where(Order.user_id == user_id)
+        if status is not None:
+            statement = statement.where(Order.status == status.upper())
+
+        rows, next_cursor = paginate(statement, limit, cursor)
+        return self._serialize_orders(rows, fields, include_items), next_cursor
+
+    def get_changes(self, limit, since=None, fields=ORDER_FIELDS, include_items=True):
+        """
+        Retrieves the orders created, updated or canceled after a cursor.
+
+        Live orders are read in `(updated_at, id)` order and cancellations from
+        their tombstones in `(deleted_at, order_id)` order, each with one index
+        seek past the cursor; the two are merged into a single stable sequence.
+        Changes younger than `CHANGES_FEED_LAG_SECONDS` are held back so that
+        transactions still committing with an earlier timestamp are not
+        skipped.
+
+        Args:
+        - limit (int): Maximum number of changes to return.
+        - since (str or None): Cursor returned by a previous call; None
+          starts from the beginning.
+        - fields (tuple): Order fields to serialize.
+        - include_items (bool): Whether to attach each order's items.
+
+        Returns:
+        - tuple: The list of changes, the cursor to resume from (equal to
+          `since` when there are none) and whether more changes are ready.
+
+        Raises:
+        - InvalidCursorError: If the cursor is malformed.
+        """
+        position = decode_cursor(since) if since else None
+        horizon = datetime.utcnow() - timedelta(
+            seconds=current_app.config['CHANGES_FEED_LAG_SECONDS'])
+
+        order_statement = select(*order_columns(fields, 'id', 'updated_at', 'version')).where(
+            Order.updated_at <= horizon
+        ).order_by(Order.updated_at, Order.id).limit(limit + 1)
+        tombstone_statement = select(OrderTombstone.order_id, OrderTombstone.deleted_at).where(
+            OrderTombstone.deleted_at <= horizon
+        ).order_by(OrderTombstone.deleted_at, OrderTombstone.order_id).limit(limit + 1)
+        if position:
+            order_statement = order_statement.where(
+                tuple_(Order.updated_at, Order.id) > tuple_(*position))
+            tombstone_statement = tombstone_statement.where(
+                tuple_(OrderTombstone.deleted_at, OrderTombstone.order_id) > tuple_(*position))
+
+        order_rows = db.session.execute(order_statement).all()
+        entries = [(row.updated_at, row.id, 0, row) for row in order_rows]
+        entries.extend(
+            (row.deleted_at, row.order_id, 1, row)
+            for row in db.session.execute(tombstone_statement).all()
+        )
+        entries.sort(key=lambda entry: entry[:3])
+        has_more = len(entries) > limit
+        entries = entries[:limit]
+
+        page_rows = [row for _, _, is_tombstone, row in entries if not is_tombstone]
+        orders = iter(self._serialize_orders(page_rows, fields, include_items))
+        changes = []
+        for timestamp, order_id, is_tombstone, row in entries:
+            if is_tombstone:
+                changes.append({'type': 'canceled', 'order_id': order_id, 'at': timestamp})
+            else:
+                changes.append({
+                    'type': 'created' if row.version == 1 else 'updated',
+                    'order_id': order_id,
+                    'at': timestamp,
+                    'order': next(orders)
+                })
+
+        next_cursor = encode_cursor(entries[-1][0], entries[-1][1]) if entries else since
+        return changes, next_cursor, has_more
+
+    def _serialize_orders(self, rows, fields, include_items):
+        """
+        Serializes order rows, optionally together with their items.
+
+        Args:
+        - rows (list): Rows selected with `order_columns(fields, 'id')`.
+        - fields (tuple): Order fields to serialize.
+        - include_items (bool): Whether to attach each order's items.
+
+        Returns:
+        - list: Serialized orders, in the same order as `rows`.
+        """
+        orders = serialize_rows(rows, fields)
+        if include_items:
+            items_by_order = _load_items_by_order([row.id for row in rows])
+            for row, order in zip(rows, orders):
+                order['items'] = items_by_order[row.id]
+        return orders
+
+    def get_order_by_id(self, order_id, version=None):
         """
         Retrieves an order by its ID.
 
+        Serialized orders are kept in the order cache, which the methods
+        modifying an order invalidate, so repeated lookups skip the database.
+        Other processes cannot invalidate it, so a caller that has read the
+        order's current version passes it to have a stale entry reloaded.
+        Only orders read from the primary are cached, since a replica may
+        lag, and clients reading their own writes bypass the cache.
+
         Args:
         - order_id (int): ID of the order to retrieve.
+        - version (int or None): Current version of the order, if known.
 
         Returns:
         - dict or None: Serialized order data if found, else None.
@@ -107,69 +644,203 @@ class OrderService:
         - Exception: If an error occurs during order retrieval.
         """
         try:
-            order = db.session.get(Order, order_id)
-            if order:
-                items = []
-                for item in order.items:
-                    item_info = {
-                        'id': item.id,
-                        'product_id': item.product_id,
-                        'quantity': item.quantity,
-                        'price': item.price,
-                        'created_at': item.created_at
-                    }
-                    items.append(item_info)
-
-                order_serialized = {
-                    'id': order.id,
-                    'user_id': order.user_id,
-                    'total_price': order.total_price,
-                    'status': order.status.value,
-                    'created_at': order.created_at,
-                    'updated_at': order.updated_at,
-                    'items': items
-                }
+            cache = get_order_cache()
+            cached_order = None if reads_own_writes() else cache.get(order_id)
+            if cached_order is not None and version in (None, cached_order['version']):
+                return cached_order
+
+            row = db.session.execute(
+                select(*order_columns(ORDER_FIELDS)).where(Order.id == order_id)
+            ).first()
+            if row:
+                order_serialized = serialize_rows([row], ORDER_FIELDS)[0]
+                order_serialized['items'] = _load_items_by_order([order_id])[order_id]
+                if not reads_from_replica():
+                    cache.set(order_id, order_serialized)
                 return order_serialized
             return None
         except Exception as exception:
             raise exception
 
+    def get_order_validators(self, order_id):
+        """
+        Retrieves the values that identify the current state of an order.
+
+        They are always read from the database, with a query on two columns
+        that does not load the order or its items, so a 304 answered from
+        them is authoritative even when another process changed the order
+        and this process's order cache is stale.
+
+        Args:
+        - order_id (int): ID of the order.
+
+        Returns:
+        - tuple or None: `(version, updated_at)` of the order, or None if the
+          order does not exist.
+        """
+        row = db.session.execute(
+            select(Order.version, Order.updated_at).where(Order.id == order_id)
+        ).first()
+        return tuple(row) if row else None
+
     def update_order_status(self, order_id, status_data):
         """
         Update the status of an order by order ID.
 
+        The change is made by one conditional UPDATE that only matches the
+        order if it still has a status allowed to change to the new one and
+        the optional preconditions hold, so concurrent updates cannot
+        overwrite each other. It also yields the previous status, which tells
+        the user's order summary which counter to move. The order is only
+        read again when the UPDATE matched nothing, to report why, or to
+        retry when a concurrent change to another allowed status got in
+        between. A successful change records an outbox event in the same
+        transaction.
+
         Args:
         - order_id (int): ID of the order to update.
-        - status_data (dict): Dictionary containing the new status data.
+        - status_data (dict): Dictionary containing the new `status` and,
+          optionally, the `expected_status` and `expected_version` the order
+          must still have.
 
         Returns:
-        - bool: True if the order status is updated successfully, else False.
+        - bool: True if the order status is updated successfully, False if
+          the order does not exist.
+
+        Raises:
+        - OrderConflictError: If the transition is not allowed or a
+          precondition failed.
         """
         try:
-            order = db.session.get(Order, order_id)
+            new_status = StatusEnum[status_data.get('status').upper()]
+            sources = source_statuses(new_status)
+            conditions = []
+            expected_status = status_data.get('expected_status')
+            if expected_status is not None:
+                sources = [source for source in sources
+                           if source == StatusEnum[expected_status.upper()]]
+            expected_version = status_data.get('expected_version')
+            if expected_version is not None:
+                conditions.append(Order.version == expected_version)
 
-            if not order:
-                return False
+            while True:
+                updated = _update_order_status(order_id, conditions, sources, new_status)
+                if updated is not None:
+                    break
 
-            new_status = status_data.get('status')
-            updated_at = datetime.utcnow()
+                db.session.rollback()
+                current = db.session.execute(
+                    select(Order.status, Order.version).where(Order.id == order_id)
+                ).first()
+                if current is None:
+                    return False
+                if (expected_status is not None
+                        and current.status.value != expected_status.lower()):
+                    raise OrderConflictError(f"Order status is '{current.status.value}'")
+                if expected_version is not None and current.version != expected_version:
+                    raise OrderConflictError(f"Order version is {current.version}")
+                if current.status not in sources:
+                    raise OrderConflictError(
+                        f"Cannot change status from '{current.status.value}' "
+                        f"to '{new_status.value}'"
+                    )
 
-            # Update the order status and updated_at timestamp
-            order.status = new_status.upper()
-            order.updated_at = updated_at
+            delta = _summary_delta({}, updated.user_id)
+            delta[f'{updated.old_status.value}_count'] -= 1
+            delta[f'{new_status.value}_count'] += 1
+            _apply_summary_deltas({updated.user_id: delta})
+            record_events(ORDER_STATUS_CHANGED, [(order_id, {'status': new_status.value})])
             db.session.commit()
+            get_order_cache().delete(order_id)
             return True
 
         except Exception as exception:
             db.session.rollback()
             raise exception
 
-    def get_orders_by_user(self, user_id):
+    def update_orders_status(self, status, order_ids=None, filters=None):
+        """
+        Changes the status of many orders with set-based UPDATE statements.
+
+        The orders are given either by ID or by a filter, which is resolved to
+        IDs first. They are then updated `IN_CLAUSE_CHUNK_SIZE` at a time, one
+        transaction per chunk, by one UPDATE per status allowed to move to
+        `status`, which also bumps their `updated_at` and `version`. The users'
+        order summaries are adjusted and an outbox event is recorded for every
+        order actually updated.
+
+        Args:
+        - status (str): The new status.
+        - order_ids (list or None): IDs of the orders to update.
+        - filters (dict or None): Select the orders to update by `status`
+          and/or `user_id` instead of by ID.
+
+        Returns:
+        - dict: Number of orders `updated`, `not_found`, and `rejected`
+          because their current status cannot change to `status`.
+        """
+        new_status = StatusEnum[status.upper()]
+        if filters is not None:
+            query = select(Order.id).order_by(Order.id)
+            if 'status' in filters:
+                query = query.where(Order.status == StatusEnum[filters['status'].upper()])
+            if 'user_id' in filters:
+                query = query.where(Order.user_id == filters['user_id'])
+            order_ids = db.session.execute(query).scalars().all()
+        order_ids = list(dict.fromkeys(order_ids))
+
+        counts = {'updated': 0, 'not_found': 0, 'rejected': 0}
+        chunk_size = current_app.config.get('IN_CLAUSE_CHUNK_SIZE', 500)
+        for chunk in _chunked(order_ids, chunk_size):
+            try:
+                now = datetime.utcnow()
+                updated_ids = []
+                deltas = {}
+                for source in source_statuses(new_status):
+                    rows = db.session.execute(
+                        update(Order).where(
+                            Order.id.in_(chunk),
+                            Order.status == source
+                        ).values(
+                            status=new_status,
+                            updated_at=now,
+                            version=Order.version + 1
+                        ).returning(Order.id, Order.user_id)
+                        .execution_options(synchronize_session=False)
+                    ).all()
+                    for row in rows:
+                        delta = _summary_delta(deltas, row.user_id)
+                        delta[f'{source.value}_count'] -= 1
+                        delta[f'{new_status.value}_count'] += 1
+                        updated_ids.append(row.id)
+                found = db.session.execute(
+                    select(func.count(Order.id)).where(Order.id.in_(chunk))
+                ).scalar()
+                _apply_summary_deltas(deltas)
+                if updated_ids:
+                    record_events(ORDER_STATUS_CHANGED, [
+                        (order_id, {'status': new_status.value}) for order_id in updated_ids
+                    ])
+                db.session.commit()
+            except Exception as exception:
+                db.session.rollback()
+                raise exception
+
+            for order_id in chunk:
+                get_order_cache().delete(order_id)
+            counts['updated'] += len(updated_ids)
+            counts['rejected'] += found - len(updated_ids)
+            counts['not_found'] += len(chunk) - found
+        return counts
+
+    def get_orders_by_user(self, user_id, fields=USER_ORDER_FIELDS, include_items=False):
         """
         Retrieves orders associated with a user.
 
         Args:
         - user_id (int): ID of the user.
+        - fields (tuple): Order fields to serialize.
+        - include_items (bool): Whether to attach each order's items.
 
         Returns:
         - list: Serialized data of orders associated with the user.
@@ -178,18 +849,10 @@ class OrderService:
         - Exception: If an error occurs during retrieval of user's orders.
         """
         try:
-            orders = Order.query.filter_by(user_id=user_id).all()
-            formated_orders = []
-            for order in orders:
-                formated_order = {
-                    'id': order.id,
-                    'user_id': order.user_id,
-                    'total_price': order.total_price,
-                    'status': order.status.value
-                    }
-                formated_orders.append(formated_order)
-
-            return formated_orders
+            rows = db.session.execute(
+                select(*order_columns(fields, 'id')).where(Order.user_id == user_id)
+            ).all()
+            return self._serialize_orders(rows, fields, include_items)
         except Exception as exception:
             raise exception
 
@@ -197,6 +860,10 @@ class OrderService:
         """
         Cancels an order.
 
+        The order and its items are removed with one DELETE statement each,
+        without loading them into the session, and a tombstone is recorded
+        for the change feed.
+
         Args:
         - order_id (int): ID of the order to cancel.
 
@@ -206,23 +873,79 @@ class OrderService:
         Raises:
         - Exception: If an error occurs during order cancellation.
         """
-        try:
-            order = db.session.get(Order, order_id)
-            if order:
-                db.session.delete(order)
+        return self.cancel_orders([order_id])['canceled'] == 1
+
+    def cancel_orders(self, order_ids):
+        """
+        Cancels many orders with set-based DELETE statements.
+
+        Orders are processed `IN_CLAUSE_CHUNK_SIZE` at a time, one transaction
+        per chunk holding INSERT ... SELECT statements recording their
+        tombstones and outbox events, one DELETE for their items, one for the
+        orders and one statement subtracting them from the users' order
+        summaries, so the number of statements does not depend on how many
+        items the orders have.
+
+        Args:
+        - order_ids (list): IDs of the orders to cancel.
+
+        Returns:
+        - dict: Number of orders `canceled` and `not_found`.
+
+        Raises:
+        - Exception: If an error occurs during order cancellation.
+        """
+        order_ids = list(dict.fromkeys(order_ids))
+        counts = {'canceled': 0, 'not_found': 0}
+        chunk_size = current_app.config.get('IN_CLAUSE_CHUNK_SIZE', 500)
+        for chunk in _chunked(order_ids, chunk_size):
+            try:
+                db.session.execute(
+                    insert(OrderTombstone).from_select(
+                        ['order_id', 'deleted_at'],
+                        select(Order.id, literal(datetime.utcnow(), OrderTombstone.deleted_at.type))
+                        .where(Order.id.in_(chunk))
+                    )
+                )
+                record_events_for(ORDER_CANCELED, {}, select(Order.id).where(Order.id.in_(chunk)))
+                # Items first, so the foreign key never points to a removed
+                # order; items of IDs without an order are left alone
+                db.session.execute(
+                    delete(OrderItem).where(OrderItem.order_id.in_(
+                        select(Order.id).where(Order.id.in_(chunk))
+                    )).execution_options(synchronize_session=False)
+                )
+                deleted = db.session.execute(
+                    delete(Order).where(Order.id.in_(chunk))
+                    .returning(Order.user_id, Order.status, Order.total_price)
+                    .execution_options(synchronize_session=False)
+                ).all()
+                deltas = {}
+                for row in deleted:
+                    delta = _summary_delta(deltas, row.user_id)
+                    delta['order_count'] -= 1
+                    delta['total_spend'] -= row.total_price or 0
+                    delta[f'{row.status.value}_count'] -= 1
+                _apply_summary_deltas(deltas, refresh_last_order=True)
                 db.session.commit()
-                return True
-            return False
-        except Exception as exception:
-            db.session.rollback()
-            raise exception
+            except Exception as exception:
+                db.session.rollback()
+                raise exception
 
-    def get_orders_by_status(self, status):
+            for order_id in chunk:
+                get_order_cache().delete(order_id)
+            counts['canceled'] += len(deleted)
+            counts['not_found'] += len(chunk) - len(deleted)
+        return counts
+
+    def get_orders_by_status(self, status, fields=ORDER_FIELDS, include_items=True):
         """
         Retrieves orders by their status.
 
         Args:
         - status (str): Status of the orders to retrieve.
+        - fields (tuple): Order fields to serialize.
+        - include_items (bool): Whether to attach each order's items.
 
         Returns:
         - list: Serialized data of orders with the specified status.
@@ -231,30 +954,10 @@ class OrderService:
         - Exception: If an error occurs during retrieval of orders by status.
         """
         try:
-            orders = Order.query.filter_by(status=status.upper()).all()
-            formated_orders = []
-            for order in orders:
-                items = []
-                for item in order.items:
-                    item_info = {
-                        'id': item.id,
-                        'product_id': item.product_id,
-                        'quantity': item.quantity,
-                        'price': item.price,
-                        'created_at': item.created_at
-                    }
-                    items.append(item_info)
-                formated_order = {
-                    'id': order.id,
-                    'user_id': order.user_id,
-                    'total_price': order.total_price,
-                    'items': items,
-                    'created_at':order.created_at,
-                    'updated_at':order.updated_at,
-                    'status': order.status.value
-                    }
-                formated_orders.append(formated_order)
-            return formated_orders
+            rows = db.session.execute(
+                select(*order_columns(fields, 'id')).where(Order.status == status.upper())
+            ).all()
+            return self._serialize_orders(rows, fields, include_items)
         except Exception as exception:
             raise exception
 
@@ -263,12 +966,13 @@ class OrderItemService:
     A class handling various operations related to order items.
     """
 
-    def get_order_items(self, order_id):
+    def get_order_items(self, order_id, fields=ORDER_ITEM_FIELDS):
         """
         Retrieves all order items for a given order.
 
         Args:
         - order_id (int): ID of the order to retrieve items for.
+        - fields (tuple): Item fields to serialize.
 
         Returns:
         - list: Serialized data of order items for the specified order.
@@ -277,18 +981,153 @@ class OrderItemService:
         - Exception: If an error occurs during retrieval of order items.
         """
         try:
-            items = OrderItem.query.filter_by(order_id=order_id).all()
-            formatted_items = []
-            for item in items:
-                formatted_item = {
-                    'id': item.id,
-                    'order_id': item.order_id,
-                    'product_id': item.product_id,
-                    'quantity': item.quantity,
-                    'price': item.price,
-                    'created_at': item.created_at,
-                }
-                formatted_items.append(formatted_item)
-            return formatted_items
+            rows = db.session.execute(
+                select(*item_columns(fields)).where(OrderItem.order_id == order_id)
+                .order_by(OrderItem.id)
+            ).all()
+            return serialize_rows(rows, fields)
         except Exception as exception:
             raise exception
+
+class UserOrderSummaryService:
+    """
+    A class handling the precomputed order summaries of users.
+    """
+
+    def get_summary(self, user_id):
+        """
+        Retrieves the order summary of a user with a single-row lookup.
+
+        Args:
+        - user_id (int): ID of the user.
+
+        Returns:
+        - dict: The user's `order_count`, `total_spend`, `status_counts` and
+          `last_order_at`; all zero for a user without orders.
+
+        Raises:
+        - Exception: If an error occurs during retrieval of the summary.
+        """
+        try:
+            summary = db.session.get(UserOrderSummary, user_id)
+            return {
+                'user_id': user_id,
+                'order_count': summary.order_count if summary else 0,
+                'total_spend': summary.total_spend if summary else 0.0,
+                'status_counts': {
+                    status.value: getattr(summary, f'{status.value}_count') if summary else 0
+                    for status in StatusEnum
+                },
+                'last_order_at': summary.last_order_at if summary else None
+            }
+        except Exception as exception:
+            raise exception
+
+
+STATS_BUCKETS = ('day', 'week', 'month')
+
+
+def _time_bucket(column, bucket):
+    """
+    Builds an expression labelling a timestamp with the start of its bucket.
+
+    Args:
+    - column (Column): The timestamp column.
+    - bucket (str): One of `STATS_BUCKETS`; weeks start on Monday.
+
+    Returns:
+    - ColumnElement: The bucket's first day as a 'YYYY-MM-DD' string.
+    """
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return func.to_char(func.date_trunc(bucket, column), 'YYYY-MM-DD')
+    modifiers = {
+        'day': (),
+        'week': ('weekday 0', '-6 days'),
+        'month': ('start of month',)
+    }[bucket]
+    return func.date(column, *modifiers)
+
+
+class OrderStatsService:
+    """
+    A class computing aggregate order statistics in the database.
+    """
+
+    def get_stats(self, start=None, end=None, bucket='day', top=10):
+        """
+        Aggregates orders created in a time range with GROUP BY queries.
+
+        Results are cached for `ORDER_STATS_CACHE_TTL` seconds per set of
+        arguments, so they may lag behind recent changes by that much.
+
+        Args:
+        - start (datetime or None): Earliest creation time included.
+        - end (datetime or None): Creation time from which orders are excluded.
+        - bucket (str): Size of the revenue time buckets, one of `STATS_BUCKETS`.
+        - top (int): Number of best-selling products to return.
+
+        Returns:
+        - dict: `order_count`, `revenue`, `status_counts`, `revenue_by_bucket`
+          and `top_products` ranked by quantity sold.
+
+        Raises:
+        - ValueError: If `bucket` is unknown.
+        - Exception: If an error occurs during aggregation.
+        """
+        if bucket not in STATS_BUCKETS:
+            raise ValueError(f"bucket must be one of: {', '.join(STATS_BUCKETS)}")
+        key = (start, end, bucket, top)
+        stats = get_order_stats_cache().get(key)
+        if stats is not None:
+            return stats
+
+        try:
+            conditions = []
+            if start is not None:
+                conditions.append(Order.created_at >= start)
+            if end is not None:
+                conditions.append(Order.created_at < end)
+
+            status_rows = db.session.execute(
+                select(Order.status, func.count(Order.id), func.sum(Order.total_price))
+                .where(*conditions).group_by(Order.status)
+            ).all()
+
+            period = _time_bucket(Order.created_at, bucket).label('bucket')
+            bucket_rows = db.session.execute(
+                select(period, func.count(Order.id), func.sum(Order.total_price))
+                .where(*conditions).group_by(period).order_by(period)
+            ).all()
+
+            quantity = func.sum(OrderItem.quantity).label('quantity')
+            product_query = select(
+                OrderItem.product_id, quantity, func.sum(OrderItem.quantity * OrderItem.price)
+            )
+            if conditions:
+                product_query = product_query.join(Order, Order.id == OrderItem.order_id)
+            product_rows = db.session.execute(
+                product_query.where(*conditions).group_by(OrderItem.product_id)
+                .order_by(quantity.desc(), OrderItem.product_id).limit(top)
+            ).all()
+        except Exception as exception:
+            raise exception
+
+        status_counts = dict.fromkeys((status.value for status in StatusEnum), 0)
+        for status, count, _ in status_rows:
+            if status is not None:
+                status_counts[status.value] = count
+        stats = {
+            'order_count': sum(count for _, count, _ in status_rows),
+            'revenue': sum(revenue or 0 for _, _, revenue in status_rows),
+            'status_counts': status_counts,
+            'revenue_by_bucket': [
+                {'bucket': period, 'order_count': count, 'revenue': revenue or 0}
+                for period, count, revenue in bucket_rows
+            ],
+            'top_products': [
+                {'product_id': product_id, 'quantity': sold, 'revenue': revenue or 0}
+                for product_id, sold, revenue in product_rows
+            ]
+        }
+        get_order_stats_cache().set(key, stats)
+        return stats
@@ -0,0 +1,6 @@
+"""
+Benchmarks for the order service.
+
+Each module is a standalone script, run from the repository root with
+`python -m benchmarks.<module> --help`.
+"""
@@ -0,0 +1,170 @@
+"""
+Benchmark of the order lookup queries with and without secondary indexes.
+
+Loads a SQLite database with synthetic orders and items, then times the
+filters used by `OrderService` and `OrderItemService` before and after the
+indexes declared on the models are created, printing the query plan of each
+so the switch from a full table SCAN to an index SEARCH is visible.
+
+Usage:
+    python -m benchmarks.bench_indexes --orders 1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault('FLASK_ENV', 'testing')
+
+# pylint: disable=wrong-import-position
+from sqlalchemy import create_engine, insert, select, text
+from app import db
+from app.models import Order, OrderItem, StatusEnum
+
+LOAD_BATCH_SIZE = 50000
+
+
+def load_data(engine, orders, users, items_per_order, seed):
+    """
+    Fills the orders and order_items tables with deterministic synthetic rows.
+
+    Args:
+    - engine (Engine): Engine of the benchmark database.
+    - orders (int): Number of orders to insert.
+    - users (int): Number of distinct user IDs.
+    - items_per_order (int): Items inserted for every order.
+    - seed (int): Seed of the random generator.
+    """
+    rng = random.Random(seed)
+    statuses = list(StatusEnum)
+    start = datetime(2023, 1, 1)
+    with engine.begin() as conn:
+        for first_id in range(1, orders + 1, LOAD_BATCH_SIZE):
+            order_rows = []
+            item_rows = []
+            for order_id in range(first_id, min(first_id + LOAD_BATCH_SIZE, orders + 1)):
+                created_at = start + timedelta(seconds=order_id * 30)
+                order_rows.append({
+                    'id': order_id,
+                    'user_id': rng.randrange(users),
+                    'total_price': 10.0 * items_per_order,
+                    'status': rng.choice(statuses),
+                    'created_at': created_at,
+                    'updated_at': created_at
+                })
+                for _ in range(items_per_order):
+                    item_rows.append({
+                        'order_id': order_id,
+                        'product_id': rng.randrange(1000),
+                        'quantity': 1,
+                        'price': 10.0,
+                        'created_at': created_at
+                    })
+            conn.execute(insert(Order.__table__), order_rows)
+            conn.execute(insert(OrderItem.__table__), item_rows)
+
+
+def lookup_queries(orders, users):
+    """
+    Builds the benchmarked queries.
+
+    Args:
+    - orders (int): Number of orders in the database.
+    - users (int): Number of distinct user IDs.
+
+    Returns:
+    - dict: Mapping of query name to a function that builds the statement
+      from a random generator.
+    """
+    orders_table = Order.__table__
+    items_table = OrderItem.__table__
+    return {
+        'orders by user_id': lambda rng: select(orders_table).where(
+            orders_table.c.user_id == rng.randrange(users)),
+        'orders by user_id, first page': lambda rng: select(orders_table).where(
+            orders_table.c.user_id == rng.randrange(users)
+        ).order_by(orders_table.c.created_at, orders_table.c.id).limit(100),
+        'orders by status, first page': lambda rng: select(orders_table).where(
+            orders_table.c.status == rng.choice(list(StatusEnum)).name
+        ).order_by(orders_table.c.created_at, orders_table.c.id).limit(100),
+        'items by order_id': lambda rng: select(items_table).where(
+            items_table.c.order_id == rng.randrange(1, orders + 1)),
+    }
+
+
+def run_queries(engine, queries, repeat, seed):
+    """
+    Times every query and captures its plan.
+
+    Args:
+    - engine (Engine): Engine of the benchmark database.
+    - queries (dict): Queries returned by `lookup_queries`.
+    - repeat (int): Executions per query, each with a random parameter.
+    - seed (int): Seed of the random generator.
+
+    Returns:
+    - dict: Mapping of query name to `(median milliseconds, plan)`.
+    """
+    results = {}
+    with engine.connect() as conn:
+        for name, build in queries.items():
+            rng = random.Random(seed)
+            statement = build(rng)
+            compiled = statement.compile(engine, compile_kwargs={'literal_binds': True})
+            plan = '; '.join(
+                row[-1] for row in conn.execute(text(f'EXPLAIN QUERY PLAN {compiled}'))
+            )
+            timings = []
+            for _ in range(repeat):
+                statement = build(rng)
+                started = time.perf_counter()
+                conn.execute(statement).fetchall()
+                timings.append((time.perf_counter() - started) * 1000)
+            results[name] = (statistics.median(timings), plan)
+    return results
+
+
+def main():
+    """Run the benchmark and print a before/after comparison."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--orders', type=int, default=1000000)
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--items-per-order', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        db.metadata.create_all(engine, tables=[Order.__table__, OrderItem.__table__])
+        indexes = [index for table in (Order.__table__, OrderItem.__table__)
+                   for index in table.indexes]
+        for index in indexes:
+            index.drop(engine)
+
+        started = time.perf_counter()
+        load_data(engine, args.orders, args.users, args.items_per_order, args.seed)
+        print(f"Loaded {args.orders} orders in {time.perf_counter() - started:.1f}s")
+
+        queries = lookup_queries(args.orders, args.users)
+        before = run_queries(engine, queries, args.repeat, args.seed)
+        for index in indexes:
+            index.create(engine)
+        with engine.connect() as conn:
+            conn.execute(text('ANALYZE'))
+        after = run_queries(engine, queries, args.repeat, args.seed)
+        engine.dispose()
+
+    for name, (before_ms, before_plan) in before.items():
+        after_ms, after_plan = after[name]
+        print(f"\n{name}")
+        print(f"  without indexes: {before_ms:10.3f} ms  {before_plan}")
+        print(f"  with indexes:    {after_ms:10.3f} ms  {after_plan}")
+        print(f"  speedup:         {before_ms / after_ms:10.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,242 @@
+"""
+HTTP load test of the order API with read, write, mixed and order creation traffic.
+
+Seeds a SQLite database file with `benchmarks.datagen`, starts gunicorn on
+it, and runs each scenario in turn for a fixed duration with concurrent
+keep-alive clients. Every client draws its requests from the scenario's
+weighted mix with its own seeded random generator. Reports throughput and
+p50/p95/p99 latency per scenario and per endpoint, and saves them as JSON
+for `benchmarks.compare`. With `--url`, an already running server holding
+the described dataset is tested instead.
+
+Responses with a 5xx status and failed connections count as errors and are
+left out of the latencies; expected outcomes such as a 409 for an order
+that already shipped are tallied per status.
+
+Usage:
+    python -m benchmarks.bench_load --users 1000 --orders-per-user 100 --duration 30
+    python -m benchmarks.bench_load --scenarios read --url http://127.0.0.1:8000
+    GROUP_COMMIT_ENABLED=true python -m benchmarks.bench_load --scenarios create
+"""
+import argparse
+import collections
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+from sqlalchemy import create_engine
+from app import db
+from benchmarks.bench_serving import ROOT, free_port, wait_until_ready
+from benchmarks.bench_services import STATUSES, random_order_data
+from benchmarks.datagen import add_dataset_arguments, dataset_options, load_dataset
+from benchmarks.reporting import latency_stats, print_table, save_results
+
+
+def scenarios(users, orders):
+    """
+    Builds the request mixes.
+
+    Args:
+    - users (int): Number of users in the dataset.
+    - orders (int): Number of orders in the dataset.
+
+    Returns:
+    - dict: Mapping of scenario name to a list of `(weight, endpoint, build)`,
+      where `build(rng)` returns the method, path and JSON body of a request.
+    """
+    def order_id(rng):
+        return rng.randrange(1, orders + 1)
+
+    def user_id(rng):
+        return rng.randrange(1, users + 1)
+
+    reads = [
+        (40, 'GET /orders/<id>', lambda rng: ('GET', f'/orders/{order_id(rng)}', None)),
+        (20, 'GET /orders/user/<id>',
+         lambda rng: ('GET', f'/orders/user/{user_id(rng)}?limit=20', None)),
+        (15, 'GET /orders/status/<status>',
+         lambda rng: ('GET', f'/orders/status/{rng.choice(STATUSES)}?limit=50', None)),
+        (10, 'GET /orders/<id>/items',
+         lambda rng: ('GET', f'/orders/{order_id(rng)}/items', None)),
+        (10, 'GET /users/<id>/order-summary',
+         lambda rng: ('GET', f'/users/{user_id(rng)}/order-summary', None)),
+        (5, 'GET /orders?limit=100', lambda rng: ('GET', '/orders?limit=100', None)),
+    ]
+    writes = [
+        (50, 'POST /orders', lambda rng: ('POST', '/orders', random_order_data(rng, users))),
+        (30, 'PATCH /orders/<id>',
+         lambda rng: ('PATCH', f'/orders/{order_id(rng)}', {'status': 'shipped'})),
+        (20, 'DELETE /orders/<id>', lambda rng: ('DELETE', f'/orders/{order_id(rng)}', None)),
+    ]
+    return {
+        'read': reads,
+        'write': writes,
+        'mixed': [(weight * 9, *rest) for weight, *rest in reads] + writes,
+        'create': writes[:1],
+    }
+
+
+def run_scenario(host, port, mix, concurrency, duration, seed):
+    """
+    Sends requests drawn from `mix` from `concurrency` keep-alive clients.
+
+    Args:
+    - host (str): Host of the server.
+    - port (int): Port of the server.
+    - mix (list): Weighted requests returned by `scenarios`.
+    - concurrency (int): Number of concurrent clients.
+    - duration (float): Seconds to keep sending requests.
+    - seed (int): Seed of the clients' random generators.
+
+    Returns:
+    - dict: Latency statistics of the whole scenario under 'all' and of each
+      endpoint, each with its `errors` and the count of each response status.
+    """
+    weights = [weight for weight, _, _ in mix]
+    durations = collections.defaultdict(list)
+    statuses = collections.defaultdict(collections.Counter)
+    errors = collections.Counter()
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client(index):
+        rng = random.Random(f'{seed}-{index}')
+        connection = http.client.HTTPConnection(host, port, timeout=30)
+        own_durations = collections.defaultdict(list)
+        own_statuses = collections.defaultdict(collections.Counter)
+        own_errors = collections.Counter()
+        while time.monotonic() < deadline:
+            _, endpoint, build = rng.choices(mix, weights)[0]
+            method, path, body = build(rng)
+            started = time.perf_counter()
+            try:
+                if body is None:
+                    connection.request(method, path)
+                else:
+                    connection.request(method, path, json.dumps(body),
+                                       {'Content-Type': 'application/json'})
+                response = connection.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException):
+                own_errors[endpoint] += 1
+                connection.close()
+                continue
+            elapsed = time.perf_counter() - started
+            own_statuses[endpoint][str(response.status)] += 1
+            if response.status >= 500:
+                own_errors[endpoint] += 1
+            else:
+                own_durations[endpoint].append(elapsed)
+            if response.getheader('Connection', '').lower() == 'close':
+                connection.close()
+        with lock:
+            for endpoint, values in own_durations.items():
+                durations[endpoint].extend(values)
+            for endpoint, counter in own_statuses.items():
+                statuses[endpoint].update(counter)
+            errors.update(own_errors)
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=client, args=(index,)) for index in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    results = {'all': dict(
+        latency_stats([value for values in durations.values() for value in values], elapsed),
+        errors=sum(errors.values())
+    )}
+    for _, endpoint, _ in mix:
+        results[endpoint] = dict(latency_stats(durations[endpoint], elapsed),
+                                 errors=errors[endpoint], statuses=dict(statuses[endpoint]))
+    return results
+
+
+def start_server(directory, args):
+    """
+    Seeds a database in `directory` and starts gunicorn on it.
+
+    Returns:
+    - tuple: The server process and its port.
+    """
+    uri = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+    engine = create_engine(uri)
+    db.metadata.create_all(engine)
+    counts = load_dataset(engine, **dataset_options(args))
+    engine.dispose()
+    print(f"{counts['orders']} orders with {counts['items']} items for {counts['users']} users")
+
+    port = free_port()
+    env = dict(os.environ, SQLALCHEMY_DATABASE_URI=uri, GUNICORN_WORKERS=str(args.workers),
+               GUNICORN_THREADS=str(args.threads), GUNICORN_ACCESS_LOG='',
+               GUNICORN_LOG_LEVEL='warning')
+    env.pop('FLASK_ENV', None)
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+         '--bind', f'127.0.0.1:{port}', 'wsgi:app'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_until_ready(port)
+    except RuntimeError:
+        server.terminate()
+        raise
+    return server, port
+
+
+def main():
+    """Runs the selected scenarios and saves their statistics."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    add_dataset_arguments(parser)
+    parser.add_argument('--scenarios', default='read,write,mixed')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=15)
+    parser.add_argument('--workers', type=int, default=(os.cpu_count() or 1) * 2 + 1)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--url', help='base URL of a running server to test instead')
+    parser.add_argument('--output', help='result file; bench-results/load-<commit>.json '
+                                         'by default')
+    args = parser.parse_args()
+
+    options = dict(dataset_options(args), scenarios=args.scenarios,
+                   concurrency=args.concurrency, duration=args.duration,
+                   workers=args.workers, threads=args.threads, url=args.url)
+    mixes = scenarios(args.users, args.users * args.orders_per_user)
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        server = None
+        if args.url:
+            url = urlsplit(args.url)
+            host, port = url.hostname, url.port or 80
+        else:
+            server, port = start_server(directory, args)
+            host = '127.0.0.1'
+        try:
+            for name in args.scenarios.split(','):
+                print(f"Running '{name}' with {args.concurrency} clients for "
+                      f"{args.duration:.0f} s")
+                scenario = run_scenario(host, port, mixes[name], args.concurrency,
+                                        args.duration, args.seed)
+                for endpoint, stats in scenario.items():
+                    results[f'{name} {endpoint}' if endpoint != 'all' else name] = stats
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+
+    print_table(results)
+    path = save_results(args.output, 'load', options, results)
+    print(f"Results saved to {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+Microbenchmark of order list serialization.
+
+Compares the former read path of `get_all_orders` (ORM objects, per-attribute
+dict building and Flask's default json encoder) with the Core-row serializer
+and the installed JSON provider, with and without a field projection.
+
+Usage:
+    python -m benchmarks.bench_serialization --orders 20000
+"""
+import argparse
+import os
+import statistics
+import time
+from datetime import datetime
+
+os.environ.setdefault('FLASK_ENV', 'testing')
+
+# pylint: disable=wrong-import-position
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import insert
+from app import create_app, db
+from app.models import Order, OrderItem, StatusEnum
+from app.services import OrderService, _load_items_by_order
+
+
+def load_data(orders, items_per_order):
+    """Insert `orders` orders with `items_per_order` items each."""
+    now = datetime.utcnow()
+    db.session.execute(insert(Order.__table__), [
+        {'id': order_id, 'user_id': order_id % 100, 'total_price': 10.0,
+         'status': StatusEnum.PENDING, 'created_at': now, 'updated_at': now}
+        for order_id in range(1, orders + 1)
+    ])
+    db.session.execute(insert(OrderItem.__table__), [
+        {'order_id': order_id, 'product_id': product_id, 'quantity': 1,
+         'price': 10.0, 'created_at': now}
+        for order_id in range(1, orders + 1)
+        for product_id in range(items_per_order)
+    ])
+    db.session.commit()
+
+
+def orm_path(encoder):
+    """The serialization path used before Core rows: ORM objects to dicts."""
+    orders = Order.query.all()
+    items_by_order = {order.id: [] for order in orders}
+    for item in OrderItem.query.filter(OrderItem.order_id.in_(list(items_by_order))).all():
+        items_by_order[item.order_id].append({
+            'id': item.id,
+            'product_id': item.product_id,
+            'quantity': item.quantity,
+            'price': item.price,
+            'created_at': item.created_at
+        })
+    formatted = [{
+        'id': order.id,
+        'user_id': order.user_id,
+        'total_price': order.total_price,
+        'status': order.status.value,
+        'version': order.version,
+        'created_at': order.created_at,
+        'updated_at': order.updated_at,
+        'items': items_by_order[order.id]
+    } for order in orders]
+    return encoder.dumps(formatted, separators=(',', ':'))
+
+
+def time_path(function, repeat):
+    """
+    Runs `function` `repeat` times with a fresh session each time.
+
+    Returns:
+    - float: Median duration in milliseconds.
+    """
+    timings = []
+    for _ in range(repeat):
+        db.session.remove()
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    """Run the benchmark and print the median time of each path."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--orders', type=int, default=20000)
+    parser.add_argument('--items-per-order', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_app()
+    service = OrderService()
+    default_encoder = DefaultJSONProvider(app)
+    with app.app_context():
+        app.config['IN_CLAUSE_CHUNK_SIZE'] = args.orders
+        db.create_all()
+        load_data(args.orders, args.items_per_order)
+
+        paths = {
+            'ORM objects + default json': lambda: orm_path(default_encoder),
+            'Core rows + default json': lambda: default_encoder.dumps(
+                service.get_all_orders(), separators=(',', ':')),
+            f'Core rows + {type(app.json).__name__}': lambda: app.json.dumps(
+                service.get_all_orders()),
+            'Core rows, ?fields=id,status': lambda: app.json.dumps(
+                service.get_all_orders(('id', 'status'), False)),
+        }
+        # Warm up the statement caches
+        _load_items_by_order([1])
+        baseline = None
+        print(f"{args.orders} orders x {args.items_per_order} items, median of {args.repeat}")
+        for name, function in paths.items():
+            elapsed = time_path(function, args.repeat)
+            baseline = baseline or elapsed
+            print(f"  {name:40s} {elapsed:9.1f} ms  {baseline / elapsed:5.2f}x")
+        db.drop_all()
+
+
+if __name__ == '__main__':
+    main()
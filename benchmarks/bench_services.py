@@ -0,0 +1,168 @@
+"""
+Microbenchmarks of the `OrderService` methods on a generated dataset.
+
+Loads a SQLite database file, or the empty database given with `--uri`, with
+`benchmarks.datagen`, then calls each method `--repeat` times with arguments
+drawn from a seeded random generator and a fresh session for every call, and
+reports throughput and latency percentiles per method. Reads run before the
+writes, which each consume orders no other call touches. Methods returning
+every matching order are only repeated `--scan-repeat` times. The order
+cache is disabled so lookups reach the database. Results are saved as JSON
+for `benchmarks.compare`.
+
+Usage:
+    python -m benchmarks.bench_services --users 1000 --orders-per-user 100
+    python -m benchmarks.bench_services --cases get_order_by_id,create_new_order
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import select
+from app import create_app, db
+from app.models import Order, StatusEnum
+from app.services import OrderService
+from benchmarks.datagen import add_dataset_arguments, dataset_options, load_dataset
+from benchmarks.reporting import latency_stats, print_table, save_results
+
+STATUSES = [status.value for status in StatusEnum]
+
+
+def random_order_data(rng, users):
+    """Builds a pending order payload with three random items."""
+    return {
+        'user_id': rng.randrange(1, users + 1),
+        'status': 'pending',
+        'items': [{
+            'product_id': rng.randrange(1, 1001),
+            'quantity': rng.randint(1, 3),
+            'price': rng.randrange(100, 10000) / 100
+        } for _ in range(3)]
+    }
+
+
+def build_cases(service, options, rng, open_order_ids):
+    """
+    Builds the benchmarked calls.
+
+    Args:
+    - service (OrderService): The service under test.
+    - options (dict): Dataset options and the `batch` size.
+    - rng (random.Random): Generator of the call arguments.
+    - open_order_ids (list): Shuffled IDs of orders that are not shipped yet,
+      consumed by the writes so that each changes a different order.
+
+    Returns:
+    - dict: Mapping of case name to `(call, scans_all_orders)`, reads first.
+    """
+    users = options['users']
+    orders = users * options['orders_per_user']
+    batch = options['batch']
+
+    def any_order():
+        return rng.randrange(1, orders + 1)
+
+    def take(count):
+        if len(open_order_ids) < count:
+            raise RuntimeError("Not enough orders left for the writes; "
+                               "generate more orders or lower --repeat")
+        taken = open_order_ids[-count:]
+        del open_order_ids[-count:]
+        return taken
+
+    return {
+        'get_order_by_id': (lambda: service.get_order_by_id(any_order()), False),
+        'get_order_validators': (lambda: service.get_order_validators(any_order()), False),
+        'get_orders_by_ids': (
+            lambda: service.get_orders_by_ids([any_order() for _ in range(batch)]), False),
+        'get_orders_by_user': (
+            lambda: service.get_orders_by_user(rng.randrange(1, users + 1)), False),
+        'get_orders_page': (
+            lambda: service.get_orders_page(batch, status=rng.choice(STATUSES)), False),
+        'get_changes': (lambda: service.get_changes(batch), False),
+        'get_orders_by_status': (
+            lambda: service.get_orders_by_status(rng.choice(STATUSES)), True),
+        'get_all_orders': (service.get_all_orders, True),
+        'iter_all_orders': (lambda: sum(1 for _ in service.iter_all_orders()), True),
+        'create_new_order': (
+            lambda: service.create_new_order(random_order_data(rng, users)), False),
+        'create_orders_bulk': (
+            lambda: service.create_orders_bulk(
+                [random_order_data(rng, users) for _ in range(batch)]), False),
+        'update_order_status': (
+            lambda: service.update_order_status(take(1)[0], {'status': 'shipped'}), False),
+        'update_orders_status': (
+            lambda: service.update_orders_status('shipped', order_ids=take(batch)), False),
+        'cancel_order': (lambda: service.cancel_order(take(1)[0]), False),
+        'cancel_orders': (lambda: service.cancel_orders(take(batch)), False),
+    }
+
+
+def time_case(call, repeat, warmup):
+    """
+    Times `repeat` calls after `warmup` untimed ones, each in a fresh session.
+
+    Returns:
+    - dict: Latency statistics from `latency_stats`.
+    """
+    durations = []
+    for index in range(warmup + repeat):
+        started = time.perf_counter()
+        call()
+        duration = time.perf_counter() - started
+        db.session.remove()
+        if index >= warmup:
+            durations.append(duration)
+    return latency_stats(durations)
+
+
+def main():
+    """Runs the selected cases and saves their statistics."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    add_dataset_arguments(parser, users=1000, orders_per_user=10)
+    parser.add_argument('--uri', help='SQLAlchemy URI of an empty database to use')
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--scan-repeat', type=int, default=3)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--batch', type=int, default=100,
+                        help='orders per bulk call and page')
+    parser.add_argument('--cases', help='comma-separated case names; all by default')
+    parser.add_argument('--output', help='result file; bench-results/services-<commit>.json '
+                                         'by default')
+    args = parser.parse_args()
+
+    options = dict(dataset_options(args), batch=args.batch, repeat=args.repeat,
+                   scan_repeat=args.scan_repeat, warmup=args.warmup)
+    rng = random.Random(args.seed)
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        uri = args.uri or f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        app = create_app({'SQLALCHEMY_DATABASE_URI': uri, 'ORDER_CACHE_BACKEND': 'none'})
+        with app.app_context():
+            db.create_all()
+            counts = load_dataset(db.engine, **dataset_options(args))
+            print(f"{counts['orders']} orders with {counts['items']} items "
+                  f"for {counts['users']} users")
+            open_order_ids = list(db.session.scalars(
+                select(Order.id).where(Order.status != StatusEnum.SHIPPED).order_by(Order.id)
+            ))
+            rng.shuffle(open_order_ids)
+            db.session.remove()
+
+            cases = build_cases(OrderService(), options, rng, open_order_ids)
+            selected = args.cases.split(',') if args.cases else list(cases)
+            for name in selected:
+                call, scans_all_orders = cases[name]
+                repeat = min(args.repeat, args.scan_repeat) if scans_all_orders else args.repeat
+                results[name] = time_case(call, repeat, args.warmup)
+            db.engine.dispose()
+
+    print_table(results)
+    path = save_results(args.output, 'services', options, results)
+    print(f"Results saved to {path}")
+
+
+if __name__ == '__main__':
+    main()
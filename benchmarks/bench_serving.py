@@ -0,0 +1,189 @@
+"""
+Benchmark of HTTP throughput under the development server and gunicorn.
+
+Seeds a SQLite database file, starts each server in turn as a subprocess on
+a local port, and drives it with concurrent keep-alive clients requesting a
+mix of single-order lookups and order pages for a fixed duration. Prints
+requests per second and latency percentiles for each server.
+
+Usage:
+    python -m benchmarks.bench_serving --concurrency 32 --duration 20
+"""
+import argparse
+import http.client
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+# pylint: disable=wrong-import-position
+from sqlalchemy import insert
+from app import create_app, db
+from app.models import Order, OrderItem, StatusEnum
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def seed_database(uri, orders, items_per_order):
+    """Creates the tables in `uri` and inserts `orders` orders with their items."""
+    app = create_app({'SQLALCHEMY_DATABASE_URI': uri})
+    now = datetime.utcnow()
+    with app.app_context():
+        db.create_all()
+        db.session.execute(insert(Order.__table__), [
+            {'id': order_id, 'user_id': order_id % 100, 'total_price': 30.0,
+             'status': StatusEnum.PENDING.name, 'created_at': now, 'updated_at': now,
+             'version': 1}
+            for order_id in range(1, orders + 1)
+        ])
+        db.session.execute(insert(OrderItem.__table__), [
+            {'order_id': order_id, 'product_id': product_id, 'quantity': 1,
+             'price': 10.0, 'created_at': now}
+            for order_id in range(1, orders + 1)
+            for product_id in range(items_per_order)
+        ])
+        db.session.commit()
+
+
+def free_port():
+    """Returns a TCP port that is currently free on localhost."""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ready(port, timeout=30):
+    """Polls GET /health until the server answers or `timeout` seconds pass."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/health')
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server on port {port} did not start")
+
+
+def run_load(port, paths, concurrency, duration):
+    """
+    Requests `paths` in random order from `concurrency` keep-alive clients.
+
+    Args:
+    - port (int): Port of the server on localhost.
+    - paths (list): Request paths to pick from.
+    - concurrency (int): Number of concurrent clients.
+    - duration (float): Seconds to keep sending requests.
+
+    Returns:
+    - dict: `requests`, `errors`, `rps` and latency percentiles in ms.
+    """
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client(seed):
+        rng = random.Random(seed)
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        own = []
+        failed = 0
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                connection.request('GET', rng.choice(paths))
+                response = connection.getresponse()
+                response.read()
+                if response.status != 200:
+                    failed += 1
+                    continue
+                own.append(time.perf_counter() - start)
+                if response.getheader('Connection', '').lower() == 'close':
+                    connection.close()
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                connection.close()
+        with lock:
+            latencies.extend(own)
+            errors[0] += failed
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=client, args=(seed,)) for seed in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    cuts = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [0] * 99
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'rps': len(latencies) / elapsed,
+        'p50': cuts[49] * 1000,
+        'p95': cuts[94] * 1000,
+        'p99': cuts[98] * 1000,
+    }
+
+
+def server_commands(port, workers, threads):
+    """Returns the name, command and extra environment starting each server."""
+    return [
+        ('flask dev server (run.py)',
+         [sys.executable, '-m', 'flask', '--app', 'app', 'run',
+          '--port', str(port), '--debug', '--no-reload'],
+         {}),
+        (f'gunicorn {workers}w x {threads}t',
+         [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+          '--bind', f'127.0.0.1:{port}', 'wsgi:app'],
+         {'GUNICORN_WORKERS': str(workers), 'GUNICORN_THREADS': str(threads),
+          'GUNICORN_ACCESS_LOG': '', 'GUNICORN_LOG_LEVEL': 'warning'}),
+    ]
+
+
+def main():
+    """Runs the benchmark for each server and prints a comparison."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--orders', type=int, default=10000)
+    parser.add_argument('--items-per-order', type=int, default=3)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--workers', type=int, default=(os.cpu_count() or 1) * 2 + 1)
+    parser.add_argument('--threads', type=int, default=4)
+    args = parser.parse_args()
+
+    paths = [f'/orders/{order_id}' for order_id in range(1, args.orders + 1, 7)]
+    paths += [f'/orders/user/{user_id}?limit=20' for user_id in range(100)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        uri = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        seed_database(uri, args.orders, args.items_per_order)
+        env = dict(os.environ, SQLALCHEMY_DATABASE_URI=uri)
+        env.pop('FLASK_ENV', None)
+
+        print(f"{args.concurrency} clients for {args.duration:.0f} s, "
+              f"{os.cpu_count()} CPUs")
+        print(f"  {'server':<28}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}")
+        port = free_port()
+        for name, command, extra_env in server_commands(port, args.workers, args.threads):
+            server = subprocess.Popen(command, cwd=ROOT, env=dict(env, **extra_env),
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                wait_until_ready(port)
+                result = run_load(port, paths, args.concurrency, args.duration)
+            finally:
+                server.terminate()
+                server.wait()
+            print(f"  {name:<28}{result['rps']:>9.0f}{result['p50']:>9.1f}"
+                  f"{result['p95']:>9.1f}{result['p99']:>9.1f}{result['errors']:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Comparison of two benchmark result files, e.g. from two commits.
+
+Prints the change of throughput and latency percentiles of every case both
+runs measured, and marks regressions: a throughput drop or a p50/p95/p99
+increase larger than `--threshold` percent. Exits with status 1 when there
+is a regression, so it can gate a CI job. Runs with different options or on
+different machines are reported but not refused; compare like with like.
+
+Usage:
+    python -m benchmarks.compare bench-results/services-1a2b3c4.json \\
+        bench-results/services-5d6e7f8.json --threshold 10
+"""
+import argparse
+import json
+import sys
+
+# Statistics compared, and whether a higher value is better
+COMPARED_STATS = (('ops_per_second', True), ('p50', False), ('p95', False), ('p99', False))
+
+
+def load(path):
+    """Reads a result file written by `benchmarks.reporting.save_results`."""
+    with open(path, encoding='utf-8') as result_file:
+        return json.load(result_file)
+
+
+def compare_results(baseline, candidate, threshold):
+    """
+    Compares the cases of two runs.
+
+    Args:
+    - baseline (dict): Results of the reference run, by case.
+    - candidate (dict): Results of the run being checked, by case.
+    - threshold (float): Change in percent beyond which a case regressed.
+
+    Returns:
+    - list: `(case, stat, baseline value, candidate value, change in
+      percent, regressed)` for each statistic of the cases in both runs.
+    """
+    rows = []
+    for case, before in baseline.items():
+        after = candidate.get(case)
+        if not after or not before.get('count') or not after.get('count'):
+            continue
+        for stat, higher_is_better in COMPARED_STATS:
+            if not before[stat]:
+                continue
+            change = (after[stat] - before[stat]) / before[stat] * 100
+            worse = -change if higher_is_better else change
+            rows.append((case, stat, before[stat], after[stat], change, worse > threshold))
+    return rows
+
+
+def main():
+    """Prints the comparison of two result files."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=10,
+                        help='percent change counted as a regression')
+    args = parser.parse_args()
+
+    baseline, candidate = load(args.baseline), load(args.candidate)
+    if baseline['benchmark'] != candidate['benchmark']:
+        sys.exit(f"Cannot compare '{baseline['benchmark']}' with '{candidate['benchmark']}'")
+    for key in ('options', 'environment'):
+        differing = sorted(name for name in set(baseline[key]) | set(candidate[key])
+                           if name != 'commit' and name != 'dirty'
+                           and baseline[key].get(name) != candidate[key].get(name))
+        if differing:
+            print(f"Warning: {key} differ: {', '.join(differing)}")
+
+    print(f"{baseline['environment'].get('commit')} -> {candidate['environment'].get('commit')}")
+    rows = compare_results(baseline['results'], candidate['results'], args.threshold)
+    for case, stat, before, after, change, regressed in rows:
+        marker = '  REGRESSION' if regressed else ''
+        print(f"  {case:<40}{stat:>16}{before:>12.2f}{after:>12.2f}{change:>+9.1f}%{marker}")
+    regressions = sum(1 for row in rows if row[-1])
+    print(f"{regressions} regression(s) beyond {args.threshold:g}%")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
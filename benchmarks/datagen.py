@@ -0,0 +1,183 @@
+"""
+Deterministic generator of order data for benchmarks.
+
+The same arguments always produce the same rows: orders are spread evenly
+over the users, created 30 s apart from a fixed date, and their statuses,
+products, quantities and prices are drawn from a seeded random generator
+following the requested status mix. The users' order summaries are filled
+to match, so every endpoint sees consistent data.
+
+Usage, to seed a database for manual testing:
+    python -m benchmarks.datagen --uri sqlite:///orders.db --users 1000 --orders-per-user 100
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, insert
+from app import db
+from app.models import Order, OrderItem, StatusEnum, UserOrderSummary
+
+LOAD_BATCH_SIZE = 50000
+START = datetime(2023, 1, 1)
+ORDER_INTERVAL = timedelta(seconds=30)
+DEFAULT_STATUS_MIX = 'pending=50,processing=30,shipped=20'
+
+
+def parse_status_mix(text):
+    """
+    Parses a status mix such as 'pending=50,processing=30,shipped=20'.
+
+    Args:
+    - text (str): Comma-separated `status=weight` pairs.
+
+    Returns:
+    - dict: Relative weight of each status in `StatusEnum`.
+
+    Raises:
+    - ValueError: If a status is unknown, a weight is negative or all are zero.
+    """
+    mix = {}
+    for pair in text.split(','):
+        name, _, weight = pair.partition('=')
+        status = StatusEnum(name.strip().lower())
+        mix[status] = float(weight)
+        if mix[status] < 0:
+            raise ValueError(f"Negative weight for {status.value}")
+    if not any(mix.values()):
+        raise ValueError("The status mix needs a positive weight")
+    return mix
+
+
+def generate_orders(users, orders_per_user, items_per_order, status_mix, seed=0):
+    """
+    Generates orders with their items.
+
+    Args:
+    - users (int): Number of users, with IDs 1 to `users`.
+    - orders_per_user (int): Orders generated for each user.
+    - items_per_order (int): Items generated for each order.
+    - status_mix (dict): Relative weight of each `StatusEnum`.
+    - seed (int): Seed of the random generator.
+
+    Yields:
+    - tuple: An `orders` row and the list of its `order_items` rows.
+    """
+    rng = random.Random(seed)
+    statuses = list(status_mix)
+    weights = [status_mix[status] for status in statuses]
+    for index in range(users * orders_per_user):
+        order_id = index + 1
+        created_at = START + ORDER_INTERVAL * index
+        items = [{
+            'order_id': order_id,
+            'product_id': rng.randrange(1, 1001),
+            'quantity': rng.randint(1, 3),
+            'price': rng.randrange(100, 10000) / 100,
+            'created_at': created_at
+        } for _ in range(items_per_order)]
+        yield {
+            'id': order_id,
+            'user_id': index % users + 1,
+            'total_price': sum(item['price'] * item['quantity'] for item in items),
+            'status': rng.choices(statuses, weights)[0],
+            'created_at': created_at,
+            'updated_at': created_at,
+            'version': 1
+        }, items
+
+
+def load_dataset(engine, users, orders_per_user, items_per_order,
+                 status_mix=DEFAULT_STATUS_MIX, seed=0):
+    """
+    Inserts a generated dataset, with the matching user order summaries.
+
+    The tables must exist and be empty.
+
+    Args:
+    - engine (Engine): Engine of the benchmark database.
+    - users (int): Number of users.
+    - orders_per_user (int): Orders of each user.
+    - items_per_order (int): Items of each order.
+    - status_mix (str): Status mix accepted by `parse_status_mix`.
+    - seed (int): Seed of the random generator.
+
+    Returns:
+    - dict: Number of `users`, `orders` and `items` inserted.
+    """
+    summaries = {}
+    order_rows = []
+    item_rows = []
+    counts = {'users': users, 'orders': 0, 'items': 0}
+    with engine.begin() as conn:
+        generated = generate_orders(
+            users, orders_per_user, items_per_order, parse_status_mix(status_mix), seed
+        )
+        for order, items in generated:
+            order_rows.append(order)
+            item_rows += items
+            summary = summaries.setdefault(order['user_id'], {
+                'user_id': order['user_id'], 'order_count': 0, 'total_spend': 0.0,
+                'pending_count': 0, 'processing_count': 0, 'shipped_count': 0,
+                'last_order_at': None
+            })
+            summary['order_count'] += 1
+            summary['total_spend'] += order['total_price']
+            summary[f"{order['status'].value}_count"] += 1
+            summary['last_order_at'] = order['created_at']
+            if len(order_rows) >= LOAD_BATCH_SIZE:
+                _insert_batch(conn, order_rows, item_rows, counts)
+        _insert_batch(conn, order_rows, item_rows, counts)
+        if summaries:
+            conn.execute(insert(UserOrderSummary.__table__), list(summaries.values()))
+    return counts
+
+
+def _insert_batch(conn, order_rows, item_rows, counts):
+    if order_rows:
+        conn.execute(insert(Order.__table__), order_rows)
+        counts['orders'] += len(order_rows)
+    if item_rows:
+        conn.execute(insert(OrderItem.__table__), item_rows)
+        counts['items'] += len(item_rows)
+    order_rows.clear()
+    item_rows.clear()
+
+
+def add_dataset_arguments(parser, users=100, orders_per_user=100, items_per_order=3):
+    """Adds the options describing a generated dataset to `parser`."""
+    parser.add_argument('--users', type=int, default=users)
+    parser.add_argument('--orders-per-user', type=int, default=orders_per_user)
+    parser.add_argument('--items-per-order', type=int, default=items_per_order)
+    parser.add_argument('--status-mix', default=DEFAULT_STATUS_MIX,
+                        help="relative weights, e.g. '%(default)s'")
+    parser.add_argument('--seed', type=int, default=42)
+
+
+def dataset_options(args):
+    """Returns the dataset options parsed by `add_dataset_arguments`."""
+    return {
+        'users': args.users,
+        'orders_per_user': args.orders_per_user,
+        'items_per_order': args.items_per_order,
+        'status_mix': args.status_mix,
+        'seed': args.seed,
+    }
+
+
+def main():
+    """Creates the tables of a database and loads a generated dataset into it."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--uri', required=True, help='SQLAlchemy URI of an empty database')
+    add_dataset_arguments(parser)
+    args = parser.parse_args()
+
+    engine = create_engine(args.uri)
+    db.metadata.create_all(engine)
+    counts = load_dataset(engine, **dataset_options(args))
+    print(f"Loaded {counts['orders']} orders with {counts['items']} items "
+          f"for {counts['users']} users")
+
+
+if __name__ == '__main__':
+    main()
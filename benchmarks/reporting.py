@@ -0,0 +1,111 @@
+"""
+Latency statistics and JSON result files shared by the benchmarks.
+
+A result file records the benchmark name, its options, the commit and
+environment it ran in, and one entry of statistics per measured case, so
+runs on different commits can be compared with `benchmarks.compare`.
+"""
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Default directory of result files, relative to the working directory
+RESULTS_DIR = 'bench-results'
+
+
+def latency_stats(durations, elapsed=None):
+    """
+    Summarizes the durations of repeated operations.
+
+    Args:
+    - durations (list): Duration of each operation in seconds.
+    - elapsed (float or None): Wall time of the whole run in seconds, when
+      operations overlapped; defaults to the sum of the durations.
+
+    Returns:
+    - dict: Number of operations `count`, throughput `ops_per_second` and
+      `mean`, `p50`, `p95`, `p99` and `max` latencies in milliseconds.
+    """
+    if not durations:
+        return {'count': 0, 'ops_per_second': 0.0}
+    elapsed = elapsed if elapsed is not None else sum(durations)
+    cuts = statistics.quantiles(durations, n=100) if len(durations) > 1 else durations * 99
+    return {
+        'count': len(durations),
+        'ops_per_second': len(durations) / elapsed if elapsed else 0.0,
+        'mean': statistics.fmean(durations) * 1000,
+        'p50': cuts[49] * 1000,
+        'p95': cuts[94] * 1000,
+        'p99': cuts[98] * 1000,
+        'max': max(durations) * 1000,
+    }
+
+
+def environment():
+    """Describes the commit and machine a benchmark runs on."""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+            text=True, check=True
+        ).stdout.strip()
+        dirty = bool(subprocess.run(
+            ['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+            capture_output=True, text=True, check=True
+        ).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        commit, dirty = None, None
+    return {
+        'commit': commit,
+        'dirty': dirty,
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def save_results(path, benchmark, options, results):
+    """
+    Writes a benchmark run to a JSON file.
+
+    Args:
+    - path (str or None): File to write; defaults to
+      '<RESULTS_DIR>/<benchmark>-<commit>.json'.
+    - benchmark (str): Name of the benchmark.
+    - options (dict): Options the benchmark ran with.
+    - results (dict): Statistics of each measured case, by name.
+
+    Returns:
+    - str: Path of the file written.
+    """
+    env = environment()
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{benchmark}-{env['commit'] or 'unknown'}.json")
+    document = {
+        'benchmark': benchmark,
+        'recorded_at': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+        'environment': env,
+        'options': options,
+        'results': results,
+    }
+    with open(path, 'w', encoding='utf-8') as output:
+        json.dump(document, output, indent=2, sort_keys=True)
+        output.write('\n')
+    return path
+
+
+def print_table(results):
+    """Prints the latency statistics of each case as a table."""
+    print(f"  {'case':<40}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, stats in results.items():
+        if stats['count']:
+            print(f"  {name:<40}{stats['ops_per_second']:>10.1f}{stats['p50']:>10.2f}"
+                  f"{stats['p95']:>10.2f}{stats['p99']:>10.2f}")
+        else:
+            print(f"  {name:<40}{'-':>10}")
@@ -0,0 +1,44 @@
+"""
+Gunicorn settings for serving `wsgi:app`, each overridable from the environment.
+
+Gunicorn pre-forks `GUNICORN_WORKERS` processes, each serving up to
+`GUNICORN_THREADS` requests at once. Requests mostly wait on the database, so
+threads add concurrency cheaply; workers add CPU parallelism for
+serialization. The app is loaded after the fork unless `GUNICORN_PRELOAD` is
+set, so every worker opens its own database connections.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+# The order cache is per process and a write only clears it in the worker that
+# handled it, so other workers would serve stale orders until ORDER_CACHE_TTL;
+# it is off by default with several workers unless ORDER_CACHE_BACKEND is set
+if workers > 1:
+    os.environ.setdefault('ORDER_CACHE_BACKEND', 'none')
+worker_class = 'gthread'
+# Seconds an idle client connection is kept open for its next request
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+# Restart workers periodically, jittered so they do not all restart at once
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 10000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 1000))
+preload_app = os.environ.get('GUNICORN_PRELOAD', '').lower() in ('1', 'true', 'yes')
+# Access log path, '-' for stdout; set it empty to disable the access log
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-') or None
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def post_fork(server, worker):  # pylint: disable=unused-argument
+    """Drops connections a preloaded app inherited from the master process."""
+    if not preload_app:
+        return
+    from app import db  # pylint: disable=import-outside-toplevel
+    app = server.app.wsgi()
+    with app.app_context():
+        engines = list(db.engines.values()) + list(app.extensions['replicas'].engines.values())
+        for engine in engines:
+            engine.dispose(close=False)
@@ -0,0 +1,33 @@
+"""
+Module Docstring: TestAppFactory
+
+This module contains unit tests for the app factory.
+"""
+
+import unittest
+from app import create_app
+from app.cache import LRUCache, NullCache
+
+
+class TestAppFactory(unittest.TestCase):
+    """
+    TestAppFactory Class
+
+    This class checks apps built by the factory are configured independently.
+    """
+    def test_config_overrides(self):
+        """ Test settings passed to the factory override config.py """
+        app = create_app({'ORDER_CACHE_BACKEND': 'none'})
+        self.assertIsInstance(app.extensions['order_cache'], NullCache)
+        self.assertIn('orders', app.blueprints)
+
+    def test_apps_do_not_share_state(self):
+        """ Test each app gets its own caches """
+        first, second = create_app(), create_app()
+        self.assertIsInstance(first.extensions['order_cache'], LRUCache)
+        self.assertIsNot(first.extensions['order_cache'], second.extensions['order_cache'])
+        with first.test_client() as client:
+            self.assertEqual(client.get('/health').status_code, 200)
+
+if __name__ == '__main__':
+    unittest.main()
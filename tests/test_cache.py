@@ -0,0 +1,156 @@
+"""
+Module Docstring: TestLRUCache
+
+This module contains unit tests for the in-process order cache.
+"""
+
+import json
+import os
+import runpy
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from app import create_app, db
+from app.cache import LRUCache, NullCache, create_cache
+
+
+class FakeClock:
+    """ Manually advanced clock """
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestLRUCache(unittest.TestCase):
+    """
+    TestLRUCache Class
+
+    This class contains unit tests for the LRU cache backend.
+    """
+    def setUp(self):
+        """ Set up a small cache with a controllable clock """
+        self.clock = FakeClock()
+        self.cache = LRUCache(max_size=2, ttl=10, clock=self.clock)
+
+    def test_hit_and_miss(self):
+        """ Test hits and misses are counted """
+        self.assertIsNone(self.cache.get(1))
+        self.cache.set(1, {'id': 1})
+        self.assertEqual(self.cache.get(1), {'id': 1})
+
+        stats = self.cache.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['size'], 1)
+
+    def test_evicts_least_recently_used(self):
+        """ Test the least recently used entry is evicted when full """
+        self.cache.set(1, 'one')
+        self.cache.set(2, 'two')
+        self.cache.get(1)
+        self.cache.set(3, 'three')
+
+        self.assertIsNone(self.cache.get(2))
+        self.assertEqual(self.cache.get(1), 'one')
+        self.assertEqual(self.cache.get(3), 'three')
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+
+    def test_entries_expire(self):
+        """ Test entries older than the TTL are misses """
+        self.cache.set(1, 'one')
+        self.clock.now = 9.9
+        self.assertEqual(self.cache.get(1), 'one')
+        self.clock.now = 10.0
+        self.assertIsNone(self.cache.get(1))
+
+        stats = self.cache.stats()
+        self.assertEqual(stats['expirations'], 1)
+        self.assertEqual(stats['size'], 0)
+
+    def test_delete_and_clear(self):
+        """ Test entries can be invalidated one by one or all at once """
+        self.cache.set(1, 'one')
+        self.cache.set(2, 'two')
+        self.cache.delete(1)
+        self.cache.delete(3)
+        self.assertIsNone(self.cache.get(1))
+        self.cache.clear()
+        self.assertIsNone(self.cache.get(2))
+
+    def test_create_cache(self):
+        """ Test the backend is selected from the configuration """
+        config = {'ORDER_CACHE_MAX_SIZE': 5, 'ORDER_CACHE_TTL': 1}
+        self.assertIsInstance(create_cache(config), LRUCache)
+        self.assertIsInstance(create_cache({**config, 'ORDER_CACHE_BACKEND': 'none'}), NullCache)
+        with self.assertRaises(ValueError):
+            create_cache({**config, 'ORDER_CACHE_BACKEND': 'memcached'})
+
+    def test_create_cache_with_prefix(self):
+        """ Test a cache can be configured by its own settings """
+        config = {'ORDER_STATS_CACHE_MAX_SIZE': 5, 'ORDER_STATS_CACHE_TTL': 1,
+                  'ORDER_CACHE_BACKEND': 'none'}
+        cache = create_cache(config, 'ORDER_STATS_CACHE')
+        self.assertIsInstance(cache, LRUCache)
+        self.assertEqual(cache.stats()['max_size'], 5)
+
+
+class TestOrderCacheAcrossWorkers(unittest.TestCase):
+    """
+    TestOrderCacheAcrossWorkers Class
+
+    This class checks two app instances sharing one database, like two
+    gunicorn workers, each with its own order cache.
+    """
+    def setUp(self):
+        """ Create two apps on one SQLite file """
+        self.directory = tempfile.mkdtemp()
+        config = {'SQLALCHEMY_DATABASE_URI':
+                  f"sqlite:///{os.path.join(self.directory, 'orders.db')}"}
+        self.first = create_app(config)
+        self.second = create_app(config)
+        with self.first.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        """ Remove the database file """
+        for app in (self.first, self.second):
+            with app.app_context():
+                db.engine.dispose()
+        shutil.rmtree(self.directory)
+
+    def test_conditional_request_sees_other_worker_write(self):
+        """ Test a stale cached order is neither confirmed by a 304 nor served """
+        first, second = self.first.test_client(), self.second.test_client()
+        order_id = json.loads(first.post('/orders', json={
+            'user_id': 1, 'status': 'pending',
+            'items': [{'product_id': 1, 'quantity': 1, 'price': 2.0}]
+        }).data)['order_id']
+        etag = first.get(f'/orders/{order_id}').headers['ETag']
+
+        second.patch(f'/orders/{order_id}', json={'status': 'shipped'})
+        response = first.get(f'/orders/{order_id}', headers={'If-None-Match': etag})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+        self.assertEqual(json.loads(response.data)['status'], 'shipped')
+
+    def test_gunicorn_disables_cache_with_several_workers(self):
+        """ Test the cache is off by default with several workers, unless configured """
+        with mock.patch.dict(os.environ, {'GUNICORN_WORKERS': '3'}):
+            os.environ.pop('ORDER_CACHE_BACKEND', None)
+            runpy.run_path('gunicorn.conf.py')
+            self.assertEqual(os.environ['ORDER_CACHE_BACKEND'], 'none')
+        with mock.patch.dict(os.environ, {'GUNICORN_WORKERS': '3',
+                                          'ORDER_CACHE_BACKEND': 'memory'}):
+            runpy.run_path('gunicorn.conf.py')
+            self.assertEqual(os.environ['ORDER_CACHE_BACKEND'], 'memory')
+        with mock.patch.dict(os.environ, {'GUNICORN_WORKERS': '1'}):
+            os.environ.pop('ORDER_CACHE_BACKEND', None)
+            runpy.run_path('gunicorn.conf.py')
+            self.assertNotIn('ORDER_CACHE_BACKEND', os.environ)
+
+if __name__ == '__main__':
+    unittest.main()
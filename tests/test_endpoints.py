@@ -6,8 +6,15 @@ This module contains unit tests for the endpoints related to orders in the appli
 
 import unittest
 import json
-from app import app, db
-from app.models import Order, OrderItem, StatusEnum
+from datetime import datetime
+from unittest import mock
+from sqlalchemy.dialects import postgresql
+from app import create_app, db
+from app.models import Order, OrderItem, StatusEnum, source_statuses
+from app.services import _update_order_status
+from tests.utils import count_queries
+
+app = create_app()
 
 class TestOrderEndpoints(unittest.TestCase):
     """
@@ -23,6 +30,9 @@ class TestOrderEndpoints(unittest.TestCase):
             app.config['TESTING'] = True
             app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
             db.create_all()
+            app.extensions['order_cache'].clear()
+            app.extensions['order_stats_cache'].clear()
+            app.config['CHANGES_FEED_LAG_SECONDS'] = 0
 
     def tearDown(self):
         """ Remove test environment """
@@ -184,5 +194,798 @@ class TestOrderEndpoints(unittest.TestCase):
             self.assertEqual(response.status_code, 200)
             self.assertIsInstance(data, list)
 
+    def _seed_orders(self, count, items_per_order=3, status=StatusEnum.PENDING):
+        """ Insert `count` orders with `items_per_order` items each """
+        for index in range(count):
+            order = Order(user_id=index % 5, total_price=10.0, status=status)
+            for product_id in range(items_per_order):
+                order.items.append(
+                    OrderItem(product_id=product_id, quantity=1, price=10.0 / items_per_order)
+                )
+            db.session.add(order)
+        db.session.commit()
+
+    def test_get_orders_query_count_is_constant(self):
+        """ Test listing orders does not issue one items query per order """
+        with app.app_context():
+            self._seed_orders(2)
+            with count_queries() as small:
+                response = self.app.get('/orders')
+            self.assertEqual(len(json.loads(response.data)[0]['items']), 3)
+
+            self._seed_orders(20)
+            with count_queries() as large:
+                response = self.app.get('/orders')
+            self.assertEqual(len(json.loads(response.data)), 22)
+            self.assertEqual(len(small), len(large))
+
+    def test_get_orders_by_status_query_count_is_constant(self):
+        """ Test listing orders by status batches the items query """
+        with app.app_context():
+            self._seed_orders(2, status=StatusEnum.SHIPPED)
+            with count_queries() as small:
+                self.app.get('/orders/status/shipped')
+
+            self._seed_orders(20, status=StatusEnum.SHIPPED)
+            with count_queries() as large:
+                response = self.app.get('/orders/status/shipped')
+            data = json.loads(response.data)
+            self.assertEqual(len(data), 22)
+            self.assertTrue(all(len(order['items']) == 3 for order in data))
+            self.assertEqual(len(small), len(large))
+
+    def test_get_orders_items_are_chunked(self):
+        """ Test item loading splits large ID sets into several IN queries """
+        with app.app_context():
+            self._seed_orders(5)
+            chunk_size = app.config['IN_CLAUSE_CHUNK_SIZE']
+            app.config['IN_CLAUSE_CHUNK_SIZE'] = 2
+            try:
+                with count_queries() as statements:
+                    response = self.app.get('/orders')
+            finally:
+                app.config['IN_CLAUSE_CHUNK_SIZE'] = chunk_size
+            data = json.loads(response.data)
+            self.assertTrue(all(len(order['items']) == 3 for order in data))
+            item_queries = [s for s in statements if 'FROM order_items' in s]
+            self.assertEqual(len(item_queries), 3)
+
+    def test_get_orders_paginated(self):
+        """ Test walking all orders page by page with a cursor """
+        with app.app_context():
+            self._seed_orders(5, items_per_order=1)
+
+            seen = []
+            url = '/orders?limit=2'
+            while url:
+                response = self.app.get(url)
+                data = json.loads(response.data.decode('utf-8'))
+                self.assertEqual(response.status_code, 200)
+                self.assertLessEqual(len(data['orders']), 2)
+                seen.extend(order['id'] for order in data['orders'])
+                url = data['next_cursor'] and f"/orders?limit=2&cursor={data['next_cursor']}"
+
+            self.assertEqual(len(seen), 5)
+            self.assertEqual(len(set(seen)), 5)
+
+    def test_get_orders_by_user_paginated(self):
+        """ Test paginating the orders of a single user """
+        with app.app_context():
+            self._seed_orders(10)
+
+            response = self.app.get('/orders/user/1?limit=1')
+            data = json.loads(response.data.decode('utf-8'))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(data['orders']), 1)
+            self.assertEqual(data['orders'][0]['user_id'], 1)
+
+            response = self.app.get(f"/orders/user/1?cursor={data['next_cursor']}")
+            data = json.loads(response.data.decode('utf-8'))
+            self.assertEqual(len(data['orders']), 1)
+            self.assertIsNone(data['next_cursor'])
+
+    def test_get_orders_by_status_paginated(self):
+        """ Test paginating orders filtered by status """
+        with app.app_context():
+            self._seed_orders(3, status=StatusEnum.SHIPPED)
+            self._seed_orders(2, status=StatusEnum.PENDING)
+
+            response = self.app.get('/orders/status/shipped?limit=10')
+            data = json.loads(response.data.decode('utf-8'))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(data['orders']), 3)
+            self.assertTrue(all(order['status'] == 'shipped' for order in data['orders']))
+            self.assertIsNone(data['next_cursor'])
+
+    def test_order_pages_seek_an_index(self):
+        """ Test every page is read through an index, without sorting the table """
+        with app.app_context():
+            self._seed_orders(10)
+            with count_queries() as statements:
+                for url in ('/orders?limit=1', '/orders/user/1?limit=1',
+                            '/orders/status/pending?limit=1'):
+                    data = json.loads(self.app.get(url).data.decode('utf-8'))
+                    self.app.get(f"{url}&cursor={data['next_cursor']}")
+
+            pages = [s for s in statements if 'FROM orders' in s and 'ORDER BY' in s]
+            self.assertEqual(len(pages), 6)
+            for statement in pages:
+                plan = ' '.join(
+                    row[-1] for row in db.session.connection().exec_driver_sql(
+                        f'EXPLAIN QUERY PLAN {statement}', (None,) * statement.count('?'))
+                )
+                self.assertIn('USING', plan, statement)
+                self.assertNotIn('TEMP B-TREE', plan, statement)
+
+    def test_get_orders_invalid_pagination(self):
+        """ Test invalid limits and cursors are rejected """
+        with app.app_context():
+            for query in ('limit=0', 'limit=abc', 'limit=100000', 'cursor=not-a-cursor'):
+                response = self.app.get(f'/orders?{query}')
+                self.assertEqual(response.status_code, 400, query)
+
+    def test_get_orders_stream(self):
+        """ Test streaming all orders as NDJSON """
+        with app.app_context():
+            self._seed_orders(5, items_per_order=2)
+            batch_size = app.config['ORDERS_STREAM_BATCH_SIZE']
+            app.config['ORDERS_STREAM_BATCH_SIZE'] = 2
+            try:
+                response = self.app.get('/orders?stream=1')
+                lines = response.data.decode('utf-8').splitlines()
+            finally:
+                app.config['ORDERS_STREAM_BATCH_SIZE'] = batch_size
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.mimetype, 'application/x-ndjson')
+            orders = [json.loads(line) for line in lines]
+            self.assertEqual([order['id'] for order in orders], [1, 2, 3, 4, 5])
+            self.assertTrue(all(len(order['items']) == 2 for order in orders))
+
+    def test_get_orders_stream_accept_header(self):
+        """ Test the NDJSON stream is selected through the Accept header """
+        with app.app_context():
+            self._seed_orders(2)
+
+            response = self.app.get('/orders', headers={'Accept': 'application/x-ndjson'})
+            self.assertEqual(response.mimetype, 'application/x-ndjson')
+            self.assertEqual(len(response.data.decode('utf-8').splitlines()), 2)
+
+    def test_create_orders_bulk(self):
+        """ Test creating several orders at once, reporting invalid ones """
+        with app.app_context():
+            orders_data = [
+                {'user_id': 1, 'status': 'pending',
+                 'items': [{'product_id': 1, 'quantity': 2, 'price': 10.0}]},
+                {'user_id': 2, 'items': []},
+                {'user_id': 3, 'status': 'shipped',
+                 'items': [{'product_id': 2, 'quantity': 1, 'price': 5.0},
+                           {'product_id': 3, 'quantity': 3, 'price': 1.0}]},
+            ]
+
+            response = self.app.post('/orders/bulk', json=orders_data)
+            data = json.loads(response.data.decode('utf-8'))
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(data['created'], 2)
+            self.assertEqual(data['failed'], 1)
+            self.assertEqual(data['results'][1], {'index': 1, 'error': "Missing 'status' field"})
+
+            first = db.session.get(Order, data['results'][0]['order_id'])
+            self.assertEqual(first.total_price, 20.0)
+            self.assertEqual(first.status, StatusEnum.PENDING)
+            third = db.session.get(Order, data['results'][2]['order_id'])
+            self.assertEqual(third.total_price, 8.0)
+            self.assertEqual(third.items.count(), 2)
+
+    def test_create_orders_bulk_ndjson_chunks(self):
+        """ Test NDJSON bulk creation inserts items with one statement per chunk """
+        with app.app_context():
+            lines = [
+                json.dumps({'user_id': index, 'status': 'pending',
+                            'items': [{'product_id': 1, 'quantity': 1, 'price': 1.0}]})
+                for index in range(5)
+            ]
+            chunk_size = app.config['BULK_INSERT_CHUNK_SIZE']
+            app.config['BULK_INSERT_CHUNK_SIZE'] = 2
+            try:
+                with count_queries() as statements:
+                    response = self.app.post(
+                        '/orders/bulk',
+                        data='\n'.join(lines) + '\n',
+                        content_type='application/x-ndjson'
+                    )
+            finally:
+                app.config['BULK_INSERT_CHUNK_SIZE'] = chunk_size
+            data = json.loads(response.data.decode('utf-8'))
+
+            self.assertEqual(data['created'], 5)
+            item_inserts = [s for s in statements if s.startswith('INSERT INTO order_items')]
+            self.assertEqual(len(item_inserts), 3)
+            self.assertEqual(Order.query.count(), 5)
+            self.assertEqual(OrderItem.query.count(), 5)
+
+    def test_create_orders_bulk_invalid_body(self):
+        """ Test a bulk body that is not a list of orders is rejected """
+        with app.app_context():
+            response = self.app.post('/orders/bulk', json={'user_id': 1})
+            self.assertEqual(response.status_code, 400)
+
+    def test_get_order_details_cached(self):
+        """ Test repeated order lookups are answered from the cache """
+        with app.app_context():
+            self._seed_orders(1)
+
+            first = self.app.get('/orders/1')
+            with count_queries() as statements:
+                second = self.app.get('/orders/1')
+
+            self.assertEqual(second.status_code, 200)
+            self.assertEqual(first.data, second.data)
+            self.assertEqual(len(statements), 0)
+            self.assertGreaterEqual(app.extensions['order_cache'].stats()['hits'], 1)
+
+    def test_update_order_status_invalidates_cache(self):
+        """ Test a status change is visible to the next lookup """
+        with app.app_context():
+            self._seed_orders(1)
+
+            self.app.get('/orders/1')
+            self.app.patch('/orders/1', json={'status': 'shipped'})
+            data = json.loads(self.app.get('/orders/1').data.decode('utf-8'))
+
+            self.assertEqual(data['status'], 'shipped')
+
+    def test_cancel_order_invalidates_cache(self):
+        """ Test a canceled order is no longer served from the cache """
+        with app.app_context():
+            self._seed_orders(1)
+
+            self.app.get('/orders/1')
+            self.app.delete('/orders/1')
+            response = self.app.get('/orders/1')
+
+            self.assertEqual(response.status_code, 404)
+
+    def test_get_order_details_etag(self):
+        """ Test If-None-Match returns 304 from a single narrow query """
+        with app.app_context():
+            self._seed_orders(1)
+
+            response = self.app.get('/orders/1')
+            etag = response.headers['ETag']
+            self.assertIsNotNone(response.headers.get('Last-Modified'))
+
+            app.extensions['order_cache'].clear()
+            with count_queries() as statements:
+                response = self.app.get('/orders/1', headers={'If-None-Match': etag})
+
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.data, b'')
+            self.assertEqual(response.headers['ETag'], etag)
+            self.assertEqual(len(statements), 1)
+            self.assertNotIn('order_items', statements[0])
+
+    def test_get_order_details_etag_changes_on_update(self):
+        """ Test a stale ETag gets the updated order """
+        with app.app_context():
+            self._seed_orders(1)
+
+            etag = self.app.get('/orders/1').headers['ETag']
+            self.app.patch('/orders/1', json={'status': 'shipped'})
+            response = self.app.get('/orders/1', headers={'If-None-Match': etag})
+            data = json.loads(response.data.decode('utf-8'))
+
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response.headers['ETag'], etag)
+            self.assertEqual(data['status'], 'shipped')
+            self.assertEqual(data['version'], 2)
+
+    def test_get_order_details_if_modified_since(self):
+        """ Test If-Modified-Since returns 304 for an unchanged order """
+        with app.app_context():
+            self._seed_orders(1)
+
+            last_modified = self.app.get('/orders/1').headers['Last-Modified']
+            response = self.app.get('/orders/1', headers={'If-Modified-Since': last_modified})
+
+            self.assertEqual(response.status_code, 304)
+
+    def test_get_order_items_etag(self):
+        """ Test the items of an order support conditional requests """
+        with app.app_context():
+            self._seed_orders(1)
+
+            response = self.app.get('/orders/1/items')
+            etag = response.headers['ETag']
+            self.assertNotEqual(etag, self.app.get('/orders/1').headers['ETag'])
+
+            response = self.app.get('/orders/1/items', headers={'If-None-Match': etag})
+            self.assertEqual(response.status_code, 304)
+
+    def test_get_order_items_projection_etag(self):
+        """ Test each items projection has its own ETag """
+        with app.app_context():
+            self._seed_orders(1)
+            etag = self.app.get('/orders/1/items').headers['ETag']
+
+            response = self.app.get('/orders/1/items?fields=quantity',
+                                    headers={'If-None-Match': etag})
+            self.assertEqual(response.status_code, 200)
+            projected = response.headers['ETag']
+            self.assertNotEqual(projected, etag)
+
+            response = self.app.get('/orders/1/items?fields=quantity,quantity',
+                                    headers={'If-None-Match': projected})
+            self.assertEqual(response.status_code, 304)
+            response = self.app.get('/orders/1/items?fields=price',
+                                    headers={'If-None-Match': projected})
+            self.assertEqual(response.status_code, 200)
+
+    def test_update_order_status_single_statement(self):
+        """ Test a status change is one UPDATE plus its summary and outbox writes """
+        with app.app_context():
+            self.app.post('/orders', json={
+                'user_id': 3, 'status': 'pending',
+                'items': [{'product_id': 1, 'quantity': 1, 'price': 4.0}]
+            })
+
+            with count_queries() as statements:
+                response = self.app.patch('/orders/1', json={'status': 'processing'})
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(statements), 3)
+            self.assertTrue(statements[0].startswith('UPDATE orders'))
+            self.assertTrue(statements[1].startswith('INSERT INTO user_order_summaries'))
+            self.assertTrue(statements[2].startswith('INSERT INTO outbox_events'))
+            order = db.session.get(Order, 1)
+            self.assertEqual(order.status, StatusEnum.PROCESSING)
+            self.assertEqual(order.version, 2)
+
+            # Two statuses may move to shipped; SQLite cannot return the
+            # previous one from the UPDATE, so it is read first
+            with count_queries() as statements:
+                response = self.app.patch('/orders/1', json={'status': 'shipped'})
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(statements), 4)
+            self.assertTrue(statements[0].startswith('SELECT'))
+            self.assertEqual(len([s for s in statements if s.startswith('UPDATE')]), 1)
+            self.assertEqual(db.session.get(Order, 1).version, 3)
+            self.assertEqual(self._user_summary(3)['status_counts'],
+                             {'pending': 0, 'processing': 0, 'shipped': 1})
+
+    def test_update_order_status_statement_on_postgresql(self):
+        """ Test PostgreSQL gets the previous status from the UPDATE itself """
+        executed = []
+
+        def execute(statement):
+            executed.append(statement)
+            return mock.Mock(first=mock.Mock(return_value=None))
+
+        with app.app_context():
+            bind = mock.Mock()
+            bind.dialect.name = 'postgresql'
+            with mock.patch.object(db.session, 'get_bind', return_value=bind), \
+                    mock.patch.object(db.session, 'execute', side_effect=execute):
+                _update_order_status(1, [], source_statuses(StatusEnum.SHIPPED),
+                                     StatusEnum.SHIPPED)
+
+        self.assertEqual(len(executed), 1)
+        sql = str(executed[0].compile(dialect=postgresql.dialect()))
+        self.assertTrue(sql.startswith('UPDATE orders SET'))
+        self.assertIn('FROM (SELECT orders.id AS id, orders.status AS old_status', sql)
+        self.assertIn('orders.status = previous.old_status', sql)
+        self.assertIn('RETURNING orders.user_id, previous.old_status', sql)
+
+    def test_update_order_status_not_found(self):
+        """ Test updating a missing order returns 404 """
+        with app.app_context():
+            response = self.app.patch('/orders/42', json={'status': 'shipped'})
+            self.assertEqual(response.status_code, 404)
+
+    def test_update_order_status_invalid_transition(self):
+        """ Test orders cannot move back to an earlier status """
+        with app.app_context():
+            self._seed_orders(1, status=StatusEnum.SHIPPED)
+
+            response = self.app.patch('/orders/1', json={'status': 'pending'})
+            data = json.loads(response.data.decode('utf-8'))
+
+            self.assertEqual(response.status_code, 409)
+            self.assertIn("from 'shipped' to 'pending'", data['error'])
+            self.assertEqual(db.session.get(Order, 1).version, 1)
+
+    def test_update_order_status_preconditions(self):
+        """ Test expected status and version preconditions """
+        with app.app_context():
+            self._seed_orders(1)
+
+            response = self.app.patch(
+                '/orders/1', json={'status': 'shipped', 'expected_version': 5})
+            self.assertEqual(response.status_code, 409)
+
+            response = self.app.patch(
+                '/orders/1', json={'status': 'shipped', 'expected_status': 'processing'})
+            self.assertEqual(response.status_code, 409)
+
+            response = self.app.patch('/orders/1', json={
+                'status': 'processing', 'expected_status': 'pending', 'expected_version': 1})
+            self.assertEqual(response.status_code, 200)
+
+            # A second writer holding the old version loses
+            response = self.app.patch(
+                '/orders/1', json={'status': 'shipped', 'expected_version': 1})
+            self.assertEqual(response.status_code, 409)
+
+            response = self.app.patch(
+                '/orders/1', json={'status': 'shipped', 'expected_version': 'one'})
+            self.assertEqual(response.status_code, 400)
+
+    def test_update_orders_status_bulk_by_ids(self):
+        """ Test shipping many orders by ID in chunked UPDATE statements """
+        with app.app_context():
+            self._seed_orders(5, status=StatusEnum.PROCESSING)
+            self._seed_orders(1, status=StatusEnum.SHIPPED)
+
+            chunk_size = app.config['IN_CLAUSE_CHUNK_SIZE']
+            app.config['IN_CLAUSE_CHUNK_SIZE'] = 3
+            try:
+                with count_queries() as statements:
+                    response = self.app.patch('/orders/status', json={
+                        'ids': [1, 2, 3, 4, 5, 6, 99], 'status': 'shipped'})
+            finally:
+                app.config['IN_CLAUSE_CHUNK_SIZE'] = chunk_size
+            data = json.loads(response.data.decode('utf-8'))
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(data, {'updated': 5, 'not_found': 1, 'rejected': 1})
+            updates = [s for s in statements if s.startswith('UPDATE orders')]
+            # One UPDATE per chunk for each status allowed to become shipped
+            self.assertEqual(len(updates), 6)
+            order = db.session.get(Order, 1)
+            self.assertEqual(order.status, StatusEnum.SHIPPED)
+            self.assertEqual(order.version, 2)
+
+    def test_update_orders_status_bulk_by_filter(self):
+        """ Test shipping every processing order of one user """
+        with app.app_context():
+            self._seed_orders(10, status=StatusEnum.PROCESSING)
+
+            response = self.app.patch('/orders/status', json={
+                'filter': {'status': 'processing', 'user_id': 2}, 'status': 'shipped'})
+            data = json.loads(response.data.decode('utf-8'))
+
+            self.assertEqual(data, {'updated': 2, 'not_found': 0, 'rejected': 0})
+            self.assertEqual(Order.query.filter_by(status=StatusEnum.SHIPPED).count(), 2)
+
+    def test_update_orders_status_bulk_invalid(self):
+        """ Test malformed bulk status updates are rejected """
+        with app.app_context():
+            for body in ({'ids': [1], 'status': 'lost'},
+                         {'status': 'shipped'},
+                         {'ids': [1], 'filter': {'user_id': 1}, 'status': 'shipped'},
+                         {'ids': ['1'], 'status': 'shipped'},
+                         {'filter': {'total_price': 5}, 'status': 'shipped'}):
+                response = self.app.patch('/orders/status', json=body)
+                self.assertEqual(response.status_code, 400, body)
+
+    def test_cancel_order_statement_count(self):
+        """ Test cancellation cost does not depend on the number of items """
+        with app.app_context():
+            self._seed_orders(1, items_per_order=1)
+            self._seed_orders(1, items_per_order=50)
+
+            with count_queries() as small:
+                self.app.delete('/orders/1')
+            with count_queries() as large:
+                response = self.app.delete('/orders/2')
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(small), len(large))
+            self.assertEqual(len(large), 5)
+            self.assertEqual(OrderItem.query.count(), 0)
+
+    def test_cancel_order_not_found(self):
+        """ Test canceling a missing order leaves stray items alone """
+        with app.app_context():
+            db.session.add(OrderItem(order_id=7, product_id=1, quantity=1, price=1.0))
+            db.session.commit()
+
+            response = self.app.delete('/orders/7')
+
+            self.assertEqual(response.status_code, 404)
+            self.assertEqual(OrderItem.query.count(), 1)
+
+    def test_cancel_orders_bulk(self):
+        """ Test canceling several orders at once """
+        with app.app_context():
+            self._seed_orders(3)
+
+            response = self.app.post('/orders/cancel', json={'ids': [1, 3, 8]})
+            data = json.loads(response.data.decode('utf-8'))
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(data, {'canceled': 2, 'not_found': 1})
+            self.assertEqual([order.id for order in Order.query.all()], [2])
+            self.assertEqual(OrderItem.query.count(), 3)
+
+            response = self.app.post('/orders/cancel', json={'ids': 'all'})
+            self.assertEqual(response.status_code, 400)
+
+    def test_get_orders_fields_projection(self):
+        """ Test ?fields= returns only the requested fields and skips items """
+        with app.app_context():
+            self._seed_orders(3)
+
+            with count_queries() as statements:
+                response = self.app.get('/orders?fields=id,status')
+            data = json.loads(response.data.decode('utf-8'))
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(data[0], {'id': 1, 'status': 'pending'})
+            self.assertEqual(len(statements), 1)
+
+            response = self.app.get('/orders/status/pending?fields=total_price,items')
+            data = json.loads(response.data.decode('utf-8'))
+            self.assertEqual(set(data[0]), {'total_price', 'items'})
+            self.assertEqual(len(data[0]['items']), 3)
+
+    def test_get_orders_by_user_include_items(self):
+        """ Test ?include=items adds items to the per-user listing """
+        with app.app_context():
+            self._seed_orders(5)
+
+            data = json.loads(self.app.get('/orders/user/1').data.decode('utf-8'))
+            self.assertNotIn('items', data[0])
+
+            data = json.loads(self.app.get('/orders/user/1?include=items').data.decode('utf-8'))
+            self.assertEqual(len(data[0]['items']), 3)
+
+            response = self.app.get('/orders/user/1?limit=5&fields=id')
+            data = json.loads(response.data.decode('utf-8'))
+            self.assertEqual(data['orders'], [{'id': 2}])
+
+    def test_get_orders_invalid_projection(self):
+        """ Test unknown fields are rejected """
+        with app.app_context():
+            for url in ('/orders?fields=id,password', '/orders?fields=',
+                        '/orders/user/1?include=payments', '/orders?include=payments',
+                        '/orders/status/pending?include=payments',
+                        '/orders/1/items?fields=sku'):
+                response = self.app.get(url)
+                self.assertEqual(response.status_code, 400, url)
+
+    def test_get_orders_by_ids(self):
+        """ Test fetching several orders by ID in two queries """
+        with app.app_context():
+            self._seed_orders(5)
+
+            with count_queries() as statements:
+                response = self.app.get('/orders?ids=4,2,9,2')
+            data = json.loads(response.data.decode('utf-8'))
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([order['id'] for order in data['orders']], [4, 2])
+            self.assertEqual(data['missing'], [9])
+            self.assertTrue(all(len(order['items']) == 3 for order in data['orders']))
+            self.assertEqual(len(statements), 2)
+
+            response = self.app.get('/orders?ids=1,x')
+            self.assertEqual(response.status_code, 400)
+
+    def test_lookup_orders_chunked(self):
+        """ Test POST /orders/lookup splits large ID lists into chunks """
+        with app.app_context():
+            self._seed_orders(5)
+
+            chunk_size = app.config['IN_CLAUSE_CHUNK_SIZE']
+            app.config['IN_CLAUSE_CHUNK_SIZE'] = 2
+            try:
+                with count_queries() as statements:
+                    response = self.app.post(
+                        '/orders/lookup?fields=id', json={'ids': [1, 2, 3, 4, 5, 6]})
+            finally:
+                app.config['IN_CLAUSE_CHUNK_SIZE'] = chunk_size
+            data = json.loads(response.data.decode('utf-8'))
+
+            self.assertEqual(data['orders'], [{'id': i} for i in range(1, 6)])
+            self.assertEqual(data['missing'], [6])
+            self.assertEqual(len(statements), 3)
+
+            response = self.app.post('/orders/lookup', json={'ids': [1, 'two']})
+            self.assertEqual(response.status_code, 400)
+
+    def test_get_order_changes(self):
+        """ Test following creations, updates and cancellations with a cursor """
+        with app.app_context():
+            self._seed_orders(3)
+
+            response = self.app.get('/orders/changes?limit=2')
+            data = json.loads(response.data.decode('utf-8'))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([c['order_id'] for c in data['changes']], [1, 2])
+            self.assertEqual(data['changes'][0]['type'], 'created')
+            self.assertEqual(len(data['changes'][0]['order']['items']), 3)
+            self.assertTrue(data['has_more'])
+
+            data = json.loads(self.app.get(
+                f"/orders/changes?since={data['next_cursor']}").data.decode('utf-8'))
+            self.assertEqual([c['order_id'] for c in data['changes']], [3])
+            self.assertFalse(data['has_more'])
+            cursor = data['next_cursor']
+
+            data = json.loads(self.app.get(f'/orders/changes?since={cursor}').data.decode('utf-8'))
+            self.assertEqual(data['changes'], [])
+            self.assertEqual(data['next_cursor'], cursor)
+
+            self.app.patch('/orders/2', json={'status': 'shipped'})
+            self.app.delete('/orders/1')
+            data = json.loads(self.app.get(f'/orders/changes?since={cursor}').data.decode('utf-8'))
+            self.assertEqual(
+                [(c['type'], c['order_id']) for c in data['changes']],
+                [('updated', 2), ('canceled', 1)]
+            )
+            self.assertEqual(data['changes'][0]['order']['status'], 'shipped')
+            self.assertNotIn('order', data['changes'][1])
+
+    def test_get_order_changes_lag(self):
+        """ Test recent changes are held back until they settle """
+        with app.app_context():
+            self._seed_orders(1)
+            app.config['CHANGES_FEED_LAG_SECONDS'] = 60
+
+            data = json.loads(self.app.get('/orders/changes').data.decode('utf-8'))
+            self.assertEqual(data['changes'], [])
+            self.assertIsNone(data['next_cursor'])
+
+    def _user_summary(self, user_id):
+        """ Fetch a user's order summary """
+        response = self.app.get(f'/users/{user_id}/order-summary')
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.data.decode('utf-8'))
+
+    def test_user_order_summary_tracks_changes(self):
+        """ Test the user summary follows creates, status changes and cancellations """
+        with app.app_context():
+            item = {'product_id': 1, 'quantity': 2, 'price': 5.0}
+            self.app.post('/orders', json={'user_id': 4, 'status': 'pending', 'items': [item]})
+            self.app.post('/orders/bulk', json=[
+                {'user_id': 4, 'status': 'processing', 'items': [item, item]},
+                {'user_id': 4, 'status': 'pending', 'items': [item]},
+                {'user_id': 8, 'status': 'shipped', 'items': [item]}
+            ])
+            self.app.patch('/orders/1', json={'status': 'shipped'})
+            self.app.patch('/orders/status', json={'ids': [2, 3], 'status': 'shipped'})
+            self.app.delete('/orders/3')
+
+            summary = self._user_summary(4)
+            self.assertEqual(summary['order_count'], 2)
+            self.assertEqual(summary['total_spend'], 30.0)
+            self.assertEqual(summary['status_counts'],
+                             {'pending': 0, 'processing': 0, 'shipped': 2})
+            self.assertEqual(self._user_summary(8)['order_count'], 1)
+
+            # Matches aggregating the user's orders directly
+            orders = Order.query.filter_by(user_id=4).all()
+            self.assertEqual(summary['order_count'], len(orders))
+            self.assertEqual(summary['total_spend'], sum(o.total_price for o in orders))
+
+    def test_user_order_summary_last_order_after_cancel(self):
+        """ Test canceling the latest order moves the last order time back """
+        with app.app_context():
+            item = {'product_id': 1, 'quantity': 1, 'price': 1.0}
+            self.app.post('/orders', json={'user_id': 2, 'status': 'pending', 'items': [item]})
+            first_at = self._user_summary(2)['last_order_at']
+            self.app.post('/orders', json={'user_id': 2, 'status': 'pending', 'items': [item]})
+
+            self.app.delete('/orders/2')
+            self.assertEqual(self._user_summary(2)['last_order_at'], first_at)
+            self.app.delete('/orders/1')
+            summary = self._user_summary(2)
+            self.assertIsNone(summary['last_order_at'])
+            self.assertEqual(summary['order_count'], 0)
+
+    @mock.patch.dict('app.services._UPSERT_INSERTS', clear=True)
+    def test_user_order_summary_without_upsert(self):
+        """ Test summaries follow changes on databases without INSERT ... ON CONFLICT """
+        self.test_user_order_summary_tracks_changes()
+
+    @mock.patch.dict('app.services._UPSERT_INSERTS', clear=True)
+    def test_user_order_summary_last_order_without_upsert(self):
+        """ Test the last order time is recomputed without INSERT ... ON CONFLICT """
+        self.test_user_order_summary_last_order_after_cancel()
+
+    def test_user_order_summary_single_lookup(self):
+        """ Test the summary is one primary key lookup, zero for unknown users """
+        with app.app_context():
+            with count_queries() as statements:
+                summary = self._user_summary(123)
+
+            self.assertEqual(len(statements), 1)
+            self.assertEqual(summary['order_count'], 0)
+            self.assertEqual(summary['status_counts'],
+                             {'pending': 0, 'processing': 0, 'shipped': 0})
+
+    def _seed_stats_orders(self):
+        """ Insert orders spread over two months with known items """
+        rows = [
+            (datetime(2024, 1, 1, 9), StatusEnum.PENDING, [(1, 2, 5.0), (2, 1, 20.0)]),
+            (datetime(2024, 1, 1, 18), StatusEnum.SHIPPED, [(1, 3, 5.0)]),
+            (datetime(2024, 1, 3, 12), StatusEnum.SHIPPED, [(3, 1, 100.0)]),
+            (datetime(2024, 2, 10, 12), StatusEnum.PROCESSING, [(2, 4, 20.0)]),
+        ]
+        for created_at, status, items in rows:
+            order = Order(user_id=1, status=status, created_at=created_at,
+                          total_price=sum(quantity * price for _, quantity, price in items))
+            for product_id, quantity, price in items:
+                order.items.append(
+                    OrderItem(product_id=product_id, quantity=quantity, price=price)
+                )
+            db.session.add(order)
+        db.session.commit()
+
+    def test_get_order_stats(self):
+        """ Test status counts, daily revenue and top products """
+        with app.app_context():
+            self._seed_stats_orders()
+            response = self.app.get('/orders/stats?top=2')
+            data = json.loads(response.data.decode('utf-8'))
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(data['order_count'], 4)
+            self.assertEqual(data['revenue'], 225.0)
+            self.assertEqual(data['status_counts'],
+                             {'pending': 1, 'processing': 1, 'shipped': 2})
+            self.assertEqual(data['revenue_by_bucket'], [
+                {'bucket': '2024-01-01', 'order_count': 2, 'revenue': 45.0},
+                {'bucket': '2024-01-03', 'order_count': 1, 'revenue': 100.0},
+                {'bucket': '2024-02-10', 'order_count': 1, 'revenue': 80.0},
+            ])
+            self.assertEqual(data['top_products'], [
+                {'product_id': 1, 'quantity': 5, 'revenue': 25.0},
+                {'product_id': 2, 'quantity': 5, 'revenue': 100.0},
+            ])
+
+    def test_get_order_stats_buckets_and_range(self):
+        """ Test week and month buckets and the creation date filters """
+        with app.app_context():
+            self._seed_stats_orders()
+
+            weekly = json.loads(self.app.get('/orders/stats?bucket=week').data)
+            # 2024-01-01 is a Monday and 2024-02-10 a Saturday
+            self.assertEqual([row['bucket'] for row in weekly['revenue_by_bucket']],
+                             ['2024-01-01', '2024-02-05'])
+            monthly = json.loads(self.app.get('/orders/stats?bucket=month').data)
+            self.assertEqual(
+                [(row['bucket'], row['order_count']) for row in monthly['revenue_by_bucket']],
+                [('2024-01-01', 3), ('2024-02-01', 1)]
+            )
+
+            ranged = json.loads(self.app.get('/orders/stats?from=2024-01-02&to=2024-02-10').data)
+            self.assertEqual(ranged['order_count'], 1)
+            self.assertEqual(ranged['top_products'],
+                             [{'product_id': 3, 'quantity': 1, 'revenue': 100.0}])
+
+    def test_get_order_stats_cached(self):
+        """ Test repeated stats requests are served without queries """
+        with app.app_context():
+            self._seed_stats_orders()
+            self.app.get('/orders/stats')
+
+            with count_queries() as statements:
+                response = self.app.get('/orders/stats')
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(statements, [])
+            self.assertEqual(json.loads(response.data)['order_count'], 4)
+
+    def test_get_order_stats_invalid_parameters(self):
+        """ Test invalid stats parameters are rejected """
+        with app.app_context():
+            for query in ('bucket=year', 'top=0', 'top=abc', 'from=yesterday'):
+                response = self.app.get(f'/orders/stats?{query}')
+                self.assertEqual(response.status_code, 400, query)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,189 @@
+"""
+Module Docstring: TestGroupCommit
+
+This module contains unit tests for the group commit writer of order creations.
+"""
+
+import json
+import threading
+from contextlib import contextmanager
+import unittest
+from unittest import mock
+from app import create_app, db
+from app.group_commit import GroupCommitWriter
+from app.models import Order, OrderItem, OutboxEvent, UserOrderSummary
+
+
+def new_order(user_id, status='pending'):
+    """ Build an order payload with two items """
+    return {
+        'user_id': user_id,
+        'status': status,
+        'items': [{'product_id': 1, 'quantity': 2, 'price': 5.0},
+                  {'product_id': 2, 'quantity': 1, 'price': 3.0}]
+    }
+
+
+@contextmanager
+def blocked_writer(writer):
+    """ Hold `writer` in its next batch until the yielded `release` event is set """
+    entered, release = threading.Event(), threading.Event()
+    write_batch = writer.write_batch
+
+    def blocked_write_batch(batch):
+        entered.set()
+        release.wait(5)
+        write_batch(batch)
+
+    with mock.patch.object(writer, 'write_batch', side_effect=blocked_write_batch):
+        yield entered, release
+
+
+class TestGroupCommitWriter(unittest.TestCase):
+    """
+    TestGroupCommitWriter Class
+
+    This class checks how submitted orders are batched and resolved.
+    """
+    def setUp(self):
+        """ Set up an app and a writer waiting long enough to batch """
+        self.app = create_app()
+        with self.app.app_context():
+            db.create_all()
+        self.writer = GroupCommitWriter(self.app, max_batch_size=3, max_delay=0.2)
+
+    def tearDown(self):
+        """ Remove test environment """
+        self.writer.stop(timeout=5)
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_orders_written_in_batches(self):
+        """ Test concurrent orders share transactions of at most the batch size """
+        futures = [self.writer.submit(new_order(user_id)) for user_id in range(1, 6)]
+        order_ids = [future.result(timeout=5) for future in futures]
+
+        self.assertEqual(len(set(order_ids)), 5)
+        self.assertEqual(self.writer.stats(), {
+            'batches': 2, 'orders': 5, 'largest_batch': 3, 'queued': 0
+        })
+        with self.app.app_context():
+            orders = {order.id: order for order in Order.query.all()}
+            self.assertEqual(sorted(orders), sorted(order_ids))
+            for user_id, order_id in zip(range(1, 6), order_ids):
+                self.assertEqual(orders[order_id].user_id, user_id)
+                self.assertEqual(orders[order_id].total_price, 13.0)
+            self.assertEqual(OrderItem.query.count(), 10)
+            self.assertEqual(OutboxEvent.query.count(), 5)
+            self.assertEqual(UserOrderSummary.query.count(), 5)
+
+    def test_failing_order_only_fails_its_caller(self):
+        """ Test a batch with an invalid order is retried order by order """
+        futures = [self.writer.submit(new_order(1)),
+                   self.writer.submit(new_order(2, status='lost')),
+                   self.writer.submit(new_order(3))]
+
+        self.assertIsInstance(futures[0].result(timeout=5), int)
+        with self.assertRaises(KeyError):
+            futures[1].result(timeout=5)
+        self.assertIsInstance(futures[2].result(timeout=5), int)
+        with self.app.app_context():
+            self.assertEqual(sorted(order.user_id for order in Order.query.all()), [1, 3])
+
+    def test_cancelled_orders_are_not_written(self):
+        """ Test an order withdrawn while queued is dropped, one already taken is not """
+        self.writer.max_batch_size = 1
+        with blocked_writer(self.writer) as (entered, release):
+            taken = self.writer.submit(new_order(1))
+            queued = self.writer.submit(new_order(2))
+            self.assertTrue(entered.wait(5))
+            self.assertFalse(taken.cancel())
+            self.assertTrue(queued.cancel())
+            release.set()
+            self.assertIsInstance(taken.result(timeout=5), int)
+            self.writer.stop(timeout=5)
+
+        with self.app.app_context():
+            self.assertEqual([order.user_id for order in Order.query.all()], [1])
+
+    def test_stop_writes_queued_orders(self):
+        """ Test stopping the writer still writes the orders already queued """
+        future = self.writer.submit(new_order(1))
+        self.writer.stop(timeout=5)
+        self.assertIsInstance(future.result(timeout=0), int)
+
+        # A later order starts a new writer thread
+        self.assertIsInstance(self.writer.submit(new_order(2)).result(timeout=5), int)
+
+
+class TestGroupCommitEndpoint(unittest.TestCase):
+    """
+    TestGroupCommitEndpoint Class
+
+    This class checks POST /orders through the group commit writer.
+    """
+    def setUp(self):
+        """ Set up an app with group commit enabled """
+        self.app = create_app({'GROUP_COMMIT_ENABLED': True, 'GROUP_COMMIT_MAX_DELAY_MS': 200})
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            db.create_all()
+        self.writer = self.app.extensions['group_commit']
+
+    def tearDown(self):
+        """ Remove test environment """
+        self.writer.stop(timeout=5)
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_timed_out_request_creates_no_order(self):
+        """ Test a request timing out while its order is queued leaves no order behind """
+        self.app.config['GROUP_COMMIT_TIMEOUT'] = 0.2
+        responses = []
+
+        def create(user_id):
+            response = self.app.test_client().post('/orders', json=new_order(user_id))
+            responses.append(response.status_code)
+
+        with blocked_writer(self.writer) as (entered, release):
+            # The first order holds the writer, so the second stays queued
+            first = threading.Thread(target=create, args=(1,))
+            first.start()
+            self.assertTrue(entered.wait(5))
+            self.assertEqual(self.client.post('/orders', json=new_order(2)).status_code, 500)
+            release.set()
+            first.join()
+            self.writer.stop(timeout=5)
+
+        # The first order was taken before its timeout, so its caller waited for it
+        self.assertEqual(responses, [201])
+        with self.app.app_context():
+            self.assertEqual([order.user_id for order in Order.query.all()], [1])
+
+    def test_disabled_by_default(self):
+        """ Test apps have no writer unless group commit is enabled """
+        self.assertNotIn('group_commit', create_app().extensions)
+
+    def test_concurrent_creations_share_a_transaction(self):
+        """ Test concurrent requests each get their own order """
+        responses = []
+
+        def create(user_id):
+            response = self.app.test_client().post('/orders', json=new_order(user_id))
+            responses.append((user_id, response.status_code, json.loads(response.data)))
+
+        threads = [threading.Thread(target=create, args=(user_id,)) for user_id in range(1, 5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertTrue(all(status == 201 for _, status, _ in responses))
+        for user_id, _, data in responses:
+            order = json.loads(self.client.get(f"/orders/{data['order_id']}").data)
+            self.assertEqual(order['user_id'], user_id)
+        stats = json.loads(self.client.get('/health').data)['group_commit']
+        self.assertEqual(stats['orders'], 4)
+        self.assertLess(stats['batches'], 4)
@@ -0,0 +1,177 @@
+"""
+Module Docstring: TestIdempotency
+
+This module contains unit tests for Idempotency-Key support of order creation.
+"""
+
+import json
+import threading
+import unittest
+from datetime import datetime, timedelta
+from app import create_app, db
+from app.idempotency import IdempotencySweeper, sweep_expired_keys
+from app.models import IdempotencyKey, Order, OrderItem
+from tests.utils import query_budget
+
+app = create_app()
+
+ORDER = {
+    'user_id': 7,
+    'status': 'pending',
+    'items': [{'product_id': 3, 'quantity': 2, 'price': 5.0}]
+}
+
+
+class TestIdempotency(unittest.TestCase):
+    """
+    TestIdempotency Class
+
+    This class checks retried order creations are answered from the stored key.
+    """
+    def setUp(self):
+        """ Set up test environment """
+        self.app = app.test_client()
+
+        with app.app_context():
+            db.create_all()
+            app.extensions['idempotency_cache'].clear()
+
+    def tearDown(self):
+        """ Remove test environment """
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def _post(self, key, order=None):
+        return self.app.post('/orders', json=order or ORDER, headers={'Idempotency-Key': key})
+
+    def _expire(self, key):
+        with app.app_context():
+            db.session.execute(
+                db.update(IdempotencyKey).where(IdempotencyKey.key == key)
+                .values(expires_at=datetime.utcnow() - timedelta(seconds=1))
+            )
+            db.session.commit()
+        app.extensions['idempotency_cache'].clear()
+
+    def test_retry_returns_original_response(self):
+        """ Test a retried request gets the same order without creating another """
+        first = self._post('retry-1')
+        second = self._post('retry-1')
+
+        self.assertEqual(first.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', first.headers)
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second.headers['Idempotent-Replayed'], 'true')
+        self.assertEqual(json.loads(second.data), json.loads(first.data))
+        with app.app_context():
+            self.assertEqual(Order.query.count(), 1)
+            self.assertEqual(OrderItem.query.count(), 1)
+
+    def test_replay_served_from_cache(self):
+        """ Test replays read the key from the cache, or once from the table """
+        self._post('cached-1')
+        with app.app_context():
+            with query_budget(0):
+                self.assertEqual(self._post('cached-1').status_code, 201)
+            app.extensions['idempotency_cache'].clear()
+            with query_budget(1):
+                self.assertEqual(self._post('cached-1').status_code, 201)
+            with query_budget(0):
+                self.assertEqual(self._post('cached-1').status_code, 201)
+
+    def test_key_reused_with_different_body(self):
+        """ Test a key sent again with another order is refused """
+        self._post('reused-1')
+        response = self._post('reused-1', dict(ORDER, user_id=8))
+
+        self.assertEqual(response.status_code, 422)
+        with app.app_context():
+            self.assertEqual(Order.query.count(), 1)
+
+    def test_invalid_key(self):
+        """ Test empty and overlong keys are rejected """
+        self.assertEqual(self._post('').status_code, 400)
+        self.assertEqual(self._post('k' * 256).status_code, 400)
+        self.assertEqual(self._post('k' * 255).status_code, 201)
+
+    def test_failed_request_not_stored(self):
+        """ Test a key is only stored once its order is created """
+        self.assertEqual(self._post('fixed-1', dict(ORDER, status='lost')).status_code, 400)
+        response = self._post('fixed-1')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', response.headers)
+
+    def test_expired_key_creates_new_order(self):
+        """ Test a key past its TTL is stored again for a new order """
+        first = json.loads(self._post('expired-1').data)
+        self._expire('expired-1')
+        second = self._post('expired-1')
+
+        self.assertNotIn('Idempotent-Replayed', second.headers)
+        self.assertNotEqual(json.loads(second.data)['order_id'], first['order_id'])
+        with app.app_context():
+            self.assertEqual(IdempotencyKey.query.count(), 1)
+
+    def test_sweep_expired_keys(self):
+        """ Test sweeping deletes expired keys only """
+        for key in ('old-1', 'old-2', 'old-3', 'new-1'):
+            self._post(key)
+        for key in ('old-1', 'old-2', 'old-3'):
+            self._expire(key)
+
+        with app.app_context():
+            self.assertEqual(sweep_expired_keys(batch_size=2), 3)
+            self.assertEqual([row.key for row in IdempotencyKey.query.all()], ['new-1'])
+        self.assertEqual(IdempotencySweeper(app, interval=60).run_once(), 0)
+
+    def test_sweep_command(self):
+        """ Test the CLI command sweeps expired keys """
+        self._post('old-1')
+        self._expire('old-1')
+
+        result = app.test_cli_runner().invoke(args=['idempotency-sweep'])
+        self.assertIn('Deleted 1 expired idempotency keys', result.output)
+
+
+class TestIdempotencyGroupCommit(unittest.TestCase):
+    """
+    TestIdempotencyGroupCommit Class
+
+    This class checks idempotency keys of orders written by the group commit writer.
+    """
+    def setUp(self):
+        """ Set up an app with group commit enabled """
+        self.app = create_app({'GROUP_COMMIT_ENABLED': True, 'GROUP_COMMIT_MAX_DELAY_MS': 200})
+        with self.app.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        """ Remove test environment """
+        self.app.extensions['group_commit'].stop(timeout=5)
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_concurrent_retries_create_one_order(self):
+        """ Test concurrent requests with the same key share one order """
+        responses = []
+
+        def create():
+            response = self.app.test_client().post(
+                '/orders', json=ORDER, headers={'Idempotency-Key': 'race-1'}
+            )
+            responses.append((response.status_code, json.loads(response.data)))
+
+        threads = [threading.Thread(target=create) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([status for status, _ in responses], [201] * 3)
+        self.assertEqual(len({data['order_id'] for _, data in responses}), 1)
+        with self.app.app_context():
+            self.assertEqual(Order.query.count(), 1)
+            self.assertEqual(IdempotencyKey.query.count(), 1)
@@ -0,0 +1,61 @@
+"""
+Module Docstring: TestOrjsonProvider
+
+This module contains unit tests for the orjson-based JSON provider.
+"""
+
+import unittest
+from datetime import datetime
+from flask.json.provider import DefaultJSONProvider
+from app import create_app
+from app.json_provider import OrjsonProvider, orjson
+
+app = create_app()
+
+
+@unittest.skipIf(orjson is None, "orjson is not installed")
+class TestOrjsonProvider(unittest.TestCase):
+    """
+    TestOrjsonProvider Class
+
+    This class checks the orjson provider produces the same documents as
+    Flask's default provider.
+    """
+    def setUp(self):
+        """ Set up both providers """
+        self.fast = OrjsonProvider(app)
+        self.default = DefaultJSONProvider(app)
+
+    def test_same_output_as_default(self):
+        """ Test key order, dates and numbers match byte for byte """
+        document = {
+            'updated_at': datetime(2023, 12, 2, 19, 57, 18, 57326),
+            'id': 1,
+            'total_price': 20.5,
+            'status': 'pending',
+            'items': [{'quantity': 2, 'price': None}]
+        }
+        self.assertEqual(
+            self.fast.dumps(document),
+            self.default.dumps(document, separators=(',', ':'))
+        )
+
+    def test_non_ascii_text(self):
+        """ Test non-ASCII text decodes to the same value """
+        document = {'note': 'caf\u00e9 \u2713'}
+        self.assertEqual(self.default.loads(self.fast.dumps(document)), document)
+
+    def test_indented_output_falls_back(self):
+        """ Test options orjson lacks are honoured through the default encoder """
+        self.assertEqual(
+            self.fast.dumps({'b': 1, 'a': 2}, indent=2),
+            self.default.dumps({'b': 1, 'a': 2}, indent=2)
+        )
+
+    def test_loads(self):
+        """ Test decoding text and bytes """
+        self.assertEqual(self.fast.loads('{"a": [1, 2.5, null]}'), {'a': [1, 2.5, None]})
+        self.assertEqual(self.fast.loads(b'{"a": true}'), {'a': True})
+
+if __name__ == '__main__':
+    unittest.main()
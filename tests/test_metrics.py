@@ -0,0 +1,109 @@
+"""
+Module Docstring: TestMetrics
+
+This module contains unit tests for the request metrics and GET /metrics.
+"""
+
+import unittest
+from unittest.mock import patch
+from app import create_app, db
+from app.metrics import CounterFamily, HistogramFamily
+
+
+class TestMetricsEndpoint(unittest.TestCase):
+    """
+    TestMetricsEndpoint Class
+
+    This class checks requests are counted, timed and exposed per route.
+    """
+    def setUp(self):
+        """ Set up an app with its own metrics """
+        self.app = create_app()
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            db.create_all()
+        self.metrics = self.app.extensions['metrics']
+
+    def tearDown(self):
+        """ Remove test environment """
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_requests_counted_by_route_template(self):
+        """ Test requests are labelled by route template and status """
+        self.client.post('/orders', json={'user_id': 1, 'status': 'pending', 'items': []})
+        self.client.get('/orders/1')
+        self.client.get('/orders/2')
+        self.client.get('/no/such/page')
+
+        requests = self.metrics.requests
+        self.assertEqual(requests.value(('GET', '/orders/<int:order_id>', '200')), 1)
+        self.assertEqual(requests.value(('GET', '/orders/<int:order_id>', '404')), 1)
+        self.assertEqual(requests.value(('POST', '/orders', '201')), 1)
+        self.assertEqual(requests.value(('GET', '<unmatched>', '404')), 1)
+        latency = self.metrics.latency.snapshot(('GET', '/orders/<int:order_id>'))
+        self.assertEqual(latency['count'], 2)
+
+    def test_sql_statements_per_request(self):
+        """ Test the SQL statements of each request are counted and timed """
+        self.client.get('/orders/status/pending')
+
+        statements = self.metrics.db_statements.snapshot(('GET', '/orders/status/<string:status>'))
+        self.assertEqual(statements['count'], 1)
+        self.assertEqual(statements['sum'], 1)
+        db_time = self.metrics.db_time.snapshot(('GET', '/orders/status/<string:status>'))
+        self.assertGreater(db_time['sum'], 0)
+
+    def test_server_errors_counted(self):
+        """ Test 5xx responses are counted as errors """
+        with patch('app.routes.order_service.get_orders_by_status', side_effect=RuntimeError):
+            response = self.client.get('/orders/status/pending')
+
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(
+            self.metrics.errors.value(('GET', '/orders/status/<string:status>', '500')), 1)
+
+    def test_metrics_exposition(self):
+        """ Test GET /metrics serves the Prometheus text format """
+        self.client.get('/health')
+        response = self.client.get('/metrics')
+        text = response.get_data(as_text=True)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.mimetype.startswith('text/plain'))
+        self.assertIn('# TYPE http_requests_total counter', text)
+        self.assertIn('http_requests_total{method="GET",route="/health",status="200"} 1', text)
+        self.assertIn('http_request_duration_seconds_count{method="GET",route="/health"} 1', text)
+        self.assertIn('# TYPE db_pool_checked_out gauge', text)
+
+
+class TestMetricFamilies(unittest.TestCase):
+    """
+    TestMetricFamilies Class
+
+    This class contains unit tests for the labelled metric families.
+    """
+    def test_counter_render(self):
+        """ Test counters render one sample per label set, escaping values """
+        counter = CounterFamily('hits_total', 'Hits.', ('path',))
+        counter.inc(('/a"b',), 2)
+        self.assertEqual(counter.render(), [
+            '# HELP hits_total Hits.', '# TYPE hits_total counter',
+            'hits_total{path="/a\\"b"} 2'
+        ])
+
+    def test_histogram_render(self):
+        """ Test histograms render cumulative buckets, sum and count """
+        histogram = HistogramFamily('size', 'Sizes.', ('kind',), buckets=(1, 10))
+        histogram.observe(('x',), 5)
+        self.assertEqual(histogram.render()[2:], [
+            'size_bucket{kind="x",le="1"} 0',
+            'size_bucket{kind="x",le="10"} 1',
+            'size_bucket{kind="x",le="+Inf"} 1',
+            'size_sum{kind="x"} 5.0',
+            'size_count{kind="x"} 1',
+        ])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,201 @@
+"""
+Module Docstring: TestOutbox
+
+This module contains unit tests for the transactional outbox and its relay.
+"""
+
+import json
+import os
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta
+from app import create_app, db
+from app.models import OutboxEvent
+from app.outbox import NdjsonFileSink, OutboxRelay, QueueSink, purge_published_events
+
+app = create_app()
+
+
+class FailingSink(QueueSink):
+    """ Sink that rejects every batch """
+    def publish(self, events):
+        raise RuntimeError('sink unavailable')
+
+
+class TestOutbox(unittest.TestCase):
+    """
+    TestOutbox Class
+
+    This class contains unit tests for the events recorded by order changes
+    and for their delivery by the relay.
+    """
+    def setUp(self):
+        """ Set up test environment """
+        self.app = app.test_client()
+
+        with app.app_context():
+            app.config['TESTING'] = True
+            db.create_all()
+            app.extensions['order_cache'].clear()
+
+    def tearDown(self):
+        """ Remove test environment """
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def _create_order(self, status='pending'):
+        response = self.app.post('/orders', json={
+            'user_id': 7,
+            'status': status,
+            'items': [{'product_id': 3, 'quantity': 2, 'price': 5.0}]
+        })
+        return json.loads(response.data)['order_id']
+
+    def _events(self):
+        with app.app_context():
+            return [
+                (event.event_type, event.order_id, json.loads(event.payload))
+                for event in OutboxEvent.query.order_by(OutboxEvent.id)
+            ]
+
+    def test_write_paths_record_events(self):
+        """ Test every order change records an event """
+        order_id = self._create_order()
+        self.app.patch(f'/orders/{order_id}', json={'status': 'processing'})
+        self.app.delete(f'/orders/{order_id}')
+
+        self.assertEqual(self._events(), [
+            ('order.created', order_id, {
+                'user_id': 7, 'status': 'pending', 'total_price': 10.0,
+                'items': [{'product_id': 3, 'quantity': 2, 'price': 5.0}]
+            }),
+            ('order.status_changed', order_id, {'status': 'processing'}),
+            ('order.canceled', order_id, {})
+        ])
+
+    def test_bulk_paths_record_events(self):
+        """ Test bulk writes record one event per order actually changed """
+        order = {'user_id': 1, 'status': 'pending',
+                 'items': [{'product_id': 1, 'quantity': 1, 'price': 1.0}]}
+        self.app.post('/orders/bulk', json=[order, order, dict(order, status='shipped')])
+        self.app.patch('/orders/status', json={'ids': [1, 2, 3, 99], 'status': 'processing'})
+        self.app.post('/orders/cancel', json={'ids': [1, 3, 99]})
+
+        self.assertEqual(
+            [(event_type, order_id) for event_type, order_id, _ in self._events()],
+            [('order.created', 1), ('order.created', 2), ('order.created', 3),
+             ('order.status_changed', 1), ('order.status_changed', 2),
+             ('order.canceled', 1), ('order.canceled', 3)]
+        )
+
+    def test_rejected_change_records_no_event(self):
+        """ Test a rejected transition leaves the outbox untouched """
+        order_id = self._create_order(status='shipped')
+        response = self.app.patch(f'/orders/{order_id}', json={'status': 'pending'})
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual([event[0] for event in self._events()], ['order.created'])
+
+    def test_relay_publishes_in_order_and_marks_published(self):
+        """ Test the relay delivers pending events once, oldest first """
+        first = self._create_order()
+        second = self._create_order()
+        sink = QueueSink()
+        relay = OutboxRelay(app, sink, batch_size=1)
+
+        self.assertEqual(relay.run_once(), 1)
+        self.assertEqual(relay.run_once(), 1)
+        self.assertEqual(relay.run_once(), 0)
+
+        published = [sink.queue.get_nowait(), sink.queue.get_nowait()]
+        self.assertTrue(sink.queue.empty())
+        self.assertEqual([event['order_id'] for event in published], [first, second])
+        self.assertEqual(published[0]['type'], 'order.created')
+        self.assertEqual(published[0]['data']['user_id'], 7)
+        with app.app_context():
+            self.assertEqual(
+                OutboxEvent.query.filter(OutboxEvent.published_at.is_(None)).count(), 0
+            )
+
+    def test_relay_retries_after_sink_failure(self):
+        """ Test events stay pending when the sink fails """
+        self._create_order()
+
+        with self.assertRaises(RuntimeError):
+            OutboxRelay(app, FailingSink()).run_once()
+
+        sink = QueueSink()
+        self.assertEqual(OutboxRelay(app, sink).run_once(), 1)
+        self.assertEqual(sink.queue.get_nowait()['type'], 'order.created')
+
+    def _publish_all(self, published_ago):
+        """ Publish every pending event, backdating its publication """
+        OutboxRelay(app, QueueSink()).run_once()
+        with app.app_context():
+            db.session.execute(
+                db.update(OutboxEvent).where(OutboxEvent.published_at.is_not(None))
+                .values(published_at=datetime.utcnow() - timedelta(seconds=published_ago))
+            )
+            db.session.commit()
+
+    def test_purge_deletes_old_published_events(self):
+        """ Test purging keeps pending and recently published events """
+        for _ in range(3):
+            self._create_order()
+        self._publish_all(3600)
+        self._create_order()
+        pending = self._create_order()
+        OutboxRelay(app, QueueSink(), batch_size=1).run_once()
+
+        with app.app_context():
+            self.assertEqual(purge_published_events(older_than=60, batch_size=2), 3)
+            self.assertEqual(
+                [(event.order_id, event.published_at is None)
+                 for event in OutboxEvent.query.order_by(OutboxEvent.id)],
+                [(pending - 1, False), (pending, True)]
+            )
+
+    def test_relay_purges_when_drained(self):
+        """ Test a relay with a retention purges once the outbox is drained """
+        self._create_order()
+        self._publish_all(3600)
+        relay = OutboxRelay(app, QueueSink(), poll_interval=0, retention=60)
+
+        relay.start()
+        try:
+            deadline = time.monotonic() + 5
+            while self._events() and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            relay.stop(timeout=5)
+        self.assertEqual(self._events(), [])
+
+    def test_purge_command(self):
+        """ Test the CLI command purges events older than --older-than """
+        self._create_order()
+        self._publish_all(3600)
+
+        runner = app.test_cli_runner()
+        result = runner.invoke(args=['outbox-purge', '--older-than', '7200'])
+        self.assertIn('Deleted 0 published events', result.output)
+        result = runner.invoke(args=['outbox-purge', '--older-than', '60'])
+        self.assertIn('Deleted 1 published events', result.output)
+
+    def test_ndjson_sink_appends_lines(self):
+        """ Test the file sink writes one JSON document per event """
+        handle, path = tempfile.mkstemp(suffix='.ndjson')
+        os.close(handle)
+        try:
+            sink = NdjsonFileSink(path)
+            sink.publish([{'id': 1}])
+            sink.publish([{'id': 2}, {'id': 3}])
+            with open(path, encoding='utf-8') as stream:
+                self.assertEqual([json.loads(line)['id'] for line in stream], [1, 2, 3])
+        finally:
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
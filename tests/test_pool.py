@@ -0,0 +1,105 @@
+"""
+Module Docstring: TestPool
+
+This module contains unit tests for the connection pool configuration and
+its statistics.
+"""
+
+import os
+import tempfile
+import unittest
+from sqlalchemy import create_engine, exc
+from app import create_app
+from app.metrics import Histogram
+from app.pool import TimedQueuePool, engine_options, pool_stats
+
+POOL_CONFIG = {
+    'DB_POOL_SIZE': 3, 'DB_MAX_OVERFLOW': 2, 'DB_POOL_TIMEOUT': 7.0,
+    'DB_POOL_RECYCLE': 600, 'DB_POOL_PRE_PING': True,
+}
+
+
+class TestPool(unittest.TestCase):
+    """
+    TestPool Class
+
+    This class contains unit tests for the engine options and pool metrics.
+    """
+    def setUp(self):
+        """ Set up a temporary SQLite database file """
+        handle, self.path = tempfile.mkstemp(suffix='.db')
+        os.close(handle)
+
+    def tearDown(self):
+        """ Remove the database file """
+        os.remove(self.path)
+
+    def test_engine_options_from_settings(self):
+        """ Test file databases get a sized, timed queue pool """
+        options = engine_options({**POOL_CONFIG,
+                                  'SQLALCHEMY_DATABASE_URI': f'sqlite:///{self.path}'})
+        self.assertEqual(options, {
+            'pool_pre_ping': True, 'pool_recycle': 600, 'poolclass': TimedQueuePool,
+            'pool_size': 3, 'max_overflow': 2, 'pool_timeout': 7.0,
+        })
+
+    def test_engine_options_memory_database(self):
+        """ Test in-memory SQLite keeps its single shared connection """
+        options = engine_options({**POOL_CONFIG, 'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+        self.assertNotIn('pool_size', options)
+        self.assertNotIn('poolclass', options)
+
+    def test_explicit_engine_options_win(self):
+        """ Test SQLALCHEMY_ENGINE_OPTIONS overrides the pool settings """
+        options = engine_options({**POOL_CONFIG,
+                                  'SQLALCHEMY_DATABASE_URI': f'sqlite:///{self.path}',
+                                  'SQLALCHEMY_ENGINE_OPTIONS': {'pool_size': 9}})
+        self.assertEqual(options['pool_size'], 9)
+        self.assertEqual(options['max_overflow'], 2)
+
+    def test_pool_stats_record_waits_and_timeouts(self):
+        """ Test checkouts are timed and exhausted pools count timeouts """
+        engine = create_engine(f'sqlite:///{self.path}', poolclass=TimedQueuePool,
+                               pool_size=1, max_overflow=0, pool_timeout=0.05)
+        with engine.connect():
+            stats = pool_stats(engine)
+            self.assertEqual(stats['checked_out'], 1)
+            self.assertEqual(stats['overflow'], 0)
+            with self.assertRaises(exc.TimeoutError):
+                engine.connect()
+
+        stats = pool_stats(engine)
+        self.assertEqual(stats['class'], 'TimedQueuePool')
+        self.assertEqual(stats['checked_out'], 0)
+        self.assertEqual(stats['timeouts'], 1)
+        self.assertEqual(stats['wait_seconds']['count'], 2)
+        self.assertGreaterEqual(stats['wait_seconds']['sum'], 0.05)
+
+        engine.dispose()
+        self.assertEqual(pool_stats(engine)['timeouts'], 1)
+
+    def test_health_reports_pool(self):
+        """ Test GET /health includes the pool statistics """
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{self.path}'})
+        response = app.test_client().get('/health')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['db_pool']['class'], 'TimedQueuePool')
+
+
+class TestHistogram(unittest.TestCase):
+    """
+    TestHistogram Class
+
+    This class contains unit tests for the histogram metric.
+    """
+    def test_cumulative_buckets(self):
+        """ Test observations are counted in every bucket they fit """
+        histogram = Histogram(buckets=(1, 5))
+        for value in (0.5, 1, 3, 10):
+            histogram.observe(value)
+        self.assertEqual(histogram.snapshot(), {
+            'count': 4, 'sum': 14.5, 'buckets': {'1': 2, '5': 3, '+Inf': 4}
+        })
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+"""
+Module Docstring: TestProfiling
+
+This module contains unit tests for the opt-in request profiling.
+"""
+
+import json
+import os
+import pstats
+import shutil
+import tempfile
+import unittest
+from app import create_app, db
+from app.profiling import phase, rotate_profiles
+
+
+class TestRequestProfiling(unittest.TestCase):
+    """
+    TestRequestProfiling Class
+
+    This class checks which requests are profiled and what is recorded.
+    """
+    def setUp(self):
+        """ Set up a profiles directory """
+        self.directory = tempfile.mkdtemp()
+        self.app = None
+
+    def tearDown(self):
+        """ Remove test environment """
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+        shutil.rmtree(self.directory)
+
+    def make_client(self, **settings):
+        """ Create an app with profiling configured by `settings` and some orders """
+        config = {'PROFILING_ENABLED': True, 'PROFILING_DIR': self.directory,
+                  'PROFILING_SLOW_MS': 60000}
+        config.update(settings)
+        self.app = create_app(config)
+        with self.app.app_context():
+            db.create_all()
+        client = self.app.test_client()
+        for user_id in range(3):
+            client.post('/orders', json={
+                'user_id': user_id, 'status': 'pending',
+                'items': [{'product_id': 1, 'quantity': 2, 'price': 5.0}]
+            })
+        return client
+
+    def profiles(self):
+        """ List the pstats files written """
+        return sorted(name for name in os.listdir(self.directory) if name.endswith('.prof'))
+
+    def test_disabled_by_default(self):
+        """ Test profiling ignores the header unless enabled """
+        client = self.make_client(PROFILING_ENABLED=False, PROFILING_SLOW_MS=0)
+        response = client.get('/orders/status/pending', headers={'X-Profile': '1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Server-Timing', response.headers)
+        self.assertEqual(self.profiles(), [])
+
+    def test_header_returns_phase_breakdown(self):
+        """ Test a request sending the header gets its phases in Server-Timing """
+        client = self.make_client()
+        response = client.get('/orders/status/pending', headers={'X-Profile': '1'})
+        self.assertEqual(response.status_code, 200)
+        timings = dict(
+            metric.split(';dur=') for metric in response.headers['Server-Timing'].split(', ')
+        )
+        self.assertEqual(list(timings), ['db', 'serialization', 'json', 'other', 'total'])
+        self.assertGreater(float(timings['db']), 0)
+        self.assertGreater(float(timings['serialization']), 0)
+        self.assertGreater(float(timings['json']), 0)
+        self.assertEqual(self.profiles(), [])
+
+        response = client.get('/orders/status/pending')
+        self.assertNotIn('Server-Timing', response.headers)
+
+    def test_slow_request_dumped(self):
+        """ Test requests over the threshold are dumped with a summary """
+        client = self.make_client(PROFILING_SLOW_MS=0)
+        client.get('/orders/status/pending?limit=2', headers={'X-Profile': '1'})
+
+        profiles = self.profiles()
+        self.assertEqual(len(profiles), 1)
+        self.assertIn('-GET-orders_status_string_status-', profiles[0])
+        path = os.path.join(self.directory, profiles[0])
+        self.assertGreater(pstats.Stats(path).total_calls, 0)
+        with open(path[:-len('.prof')] + '.json', encoding='utf-8') as summary_file:
+            summary = json.load(summary_file)
+        self.assertEqual(summary['path'], '/orders/status/pending?limit=2')
+        self.assertEqual(summary['route'], '/orders/status/<string:status>')
+        self.assertEqual(summary['status'], 200)
+        self.assertEqual(summary['trigger'], 'header')
+        self.assertEqual(set(summary['phases_ms']), {'db', 'serialization', 'json', 'other'})
+
+    def test_sampled_requests(self):
+        """ Test sampled requests are dumped without a Server-Timing header """
+        client = self.make_client(PROFILING_SLOW_MS=0, PROFILING_SAMPLE_RATE=1.0)
+        profiled = len(self.profiles())
+        response = client.get('/orders/1')
+        self.assertNotIn('Server-Timing', response.headers)
+        self.assertEqual(len(self.profiles()), profiled + 1)
+
+    def test_profiles_rotated(self):
+        """ Test only the newest profiles are kept """
+        client = self.make_client(PROFILING_SLOW_MS=0, PROFILING_MAX_FILES=2)
+        for order_id in (1, 2, 3):
+            client.get(f'/orders/{order_id}', headers={'X-Profile': '1'})
+        self.assertEqual(len(self.profiles()), 2)
+        self.assertEqual(len(os.listdir(self.directory)), 4)
+
+        rotate_profiles(self.directory, 0)
+        self.assertEqual(os.listdir(self.directory), [])
+
+
+class TestPhase(unittest.TestCase):
+    """
+    TestPhase Class
+
+    This class checks phase timers outside profiled requests.
+    """
+    def test_no_op_outside_requests(self):
+        """ Test a phase outside a request records nothing """
+        with phase('serialization') as timer:
+            self.assertIsNone(timer)
+
+    def test_no_op_in_unprofiled_request(self):
+        """ Test a phase in a request that is not profiled records nothing """
+        app = create_app()
+        with app.test_request_context('/orders'):
+            with phase('serialization') as timer:
+                self.assertIsNone(timer)
@@ -0,0 +1,198 @@
+"""
+Module Docstring: TestQueryBudgets
+
+This module contains the SQL statement and time budgets of every route.
+
+Each test requests a route on a generated dataset of 1000 orders with 3
+items each, so a query per order or item (an N+1 pattern) exceeds the
+budget by hundreds of statements.
+"""
+
+import math
+import unittest
+from app import create_app, db
+from benchmarks.datagen import load_dataset
+from tests.utils import query_budget
+
+app = create_app()
+
+USERS = 50
+ORDERS_PER_USER = 20
+ITEMS_PER_ORDER = 3
+ORDERS = USERS * ORDERS_PER_USER
+# Orders or IDs sent to the batch endpoints
+BATCH = 50
+# Wall time allowed per request; generous, so only gross slowdowns fail
+REQUEST_SECONDS = 2.0
+
+# Routes with a budget test below, as (method, rule)
+BUDGETED_ROUTES = {
+    ('GET', '/health'),
+    ('GET', '/metrics'),
+    ('POST', '/orders'),
+    ('POST', '/orders/bulk'),
+    ('GET', '/orders'),
+    ('GET', '/orders/changes'),
+    ('GET', '/orders/stats'),
+    ('POST', '/orders/lookup'),
+    ('GET', '/orders/<int:order_id>'),
+    ('PATCH', '/orders/<int:order_id>'),
+    ('PATCH', '/orders/status'),
+    ('GET', '/orders/user/<int:user_id>'),
+    ('GET', '/users/<int:user_id>/order-summary'),
+    ('DELETE', '/orders/<int:order_id>'),
+    ('POST', '/orders/cancel'),
+    ('GET', '/orders/status/<string:status>'),
+    ('GET', '/orders/<int:order_id>/items'),
+}
+
+
+def item_chunks(orders):
+    """Number of IN queries loading the items of `orders` orders."""
+    return math.ceil(orders / app.config['IN_CLAUSE_CHUNK_SIZE'])
+
+
+def new_order(user_id, items=ITEMS_PER_ORDER):
+    """Builds an order payload with `items` items."""
+    return {
+        'user_id': user_id,
+        'status': 'pending',
+        'items': [{'product_id': product_id, 'quantity': 1, 'price': 9.5}
+                  for product_id in range(1, items + 1)]
+    }
+
+
+class TestQueryBudgets(unittest.TestCase):
+    """
+    TestQueryBudgets Class
+
+    This class checks every route stays within its SQL statement budget.
+    """
+    def setUp(self):
+        """ Set up the generated dataset """
+        self.client = app.test_client()
+        with app.app_context():
+            db.create_all()
+            load_dataset(db.engine, USERS, ORDERS_PER_USER, ITEMS_PER_ORDER)
+            app.extensions['order_cache'].clear()
+            app.extensions['order_stats_cache'].clear()
+            app.config['CHANGES_FEED_LAG_SECONDS'] = 0
+
+    def tearDown(self):
+        """ Remove test environment """
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def assert_budget(self, max_statements, method, path, body=None, headers=None):
+        """ Request `path`, reading the whole response, within the budgets """
+        with app.app_context():
+            with query_budget(max_statements, REQUEST_SECONDS):
+                response = self.client.open(path, method=method, json=body, headers=headers)
+                response.get_data()
+        self.assertLess(response.status_code, 400, response.get_data(as_text=True))
+        return response
+
+    def test_every_route_has_a_budget(self):
+        """ Test the budgets cover every route of the app """
+        routes = {
+            (method, rule.rule)
+            for rule in app.url_map.iter_rules() if rule.endpoint != 'static'
+            for method in rule.methods - {'HEAD', 'OPTIONS'}
+        }
+        self.assertEqual(routes, BUDGETED_ROUTES)
+
+    def test_health_and_metrics(self):
+        """ Test health and metrics do not query the database """
+        self.assert_budget(0, 'GET', '/health')
+        self.assert_budget(0, 'GET', '/metrics')
+
+    def test_create_order(self):
+        """ Test creating an order takes the same statements for any number of items """
+        self.assert_budget(4, 'POST', '/orders', new_order(1, items=1))
+        self.assert_budget(4, 'POST', '/orders', new_order(1, items=50))
+
+    def test_create_order_with_idempotency_key(self):
+        """ Test a keyed creation also looks up and stores its key, and a replay neither """
+        headers = {'Idempotency-Key': 'budget-1'}
+        self.assert_budget(7, 'POST', '/orders', new_order(1), headers)
+        self.assert_budget(0, 'POST', '/orders', new_order(1), headers)
+
+    def test_create_orders_bulk(self):
+        """ Test bulk creation inserts all items of a chunk at once """
+        # SQLite cannot batch INSERT ... RETURNING, so each order's INSERT is
+        # its own statement there; items, summaries and events are one each
+        self.assert_budget(
+            BATCH + 3, 'POST', '/orders/bulk',
+            [new_order(user_id) for user_id in range(1, BATCH + 1)]
+        )
+
+    def test_get_orders(self):
+        """ Test listing orders loads items in chunks, not per order """
+        self.assert_budget(1 + item_chunks(ORDERS), 'GET', '/orders')
+        self.assert_budget(1 + item_chunks(ORDERS), 'GET', '/orders?stream=1')
+        self.assert_budget(2, 'GET', '/orders?limit=100')
+        self.assert_budget(1, 'GET', '/orders?limit=100&fields=id,status')
+        ids = ','.join(str(order_id) for order_id in range(1, BATCH + 1))
+        self.assert_budget(2, 'GET', f'/orders?ids={ids}')
+
+    def test_get_order_changes(self):
+        """ Test the change feed reads orders, tombstones and items once each """
+        self.assert_budget(3, 'GET', '/orders/changes?limit=100')
+
+    def test_get_order_stats(self):
+        """ Test statistics take one aggregate query per section """
+        self.assert_budget(3, 'GET', '/orders/stats')
+
+    def test_lookup_orders(self):
+        """ Test looking up many orders by ID """
+        self.assert_budget(2, 'POST', '/orders/lookup', {'ids': list(range(1, BATCH + 1))})
+
+    def test_get_order(self):
+        """ Test an order is read with its items, then served from the cache """
+        response = self.assert_budget(2, 'GET', '/orders/7')
+        # Validators are always read from the database, never from the cache
+        self.assert_budget(1, 'GET', '/orders/7', headers={'If-None-Match': response.headers['ETag']})
+        self.assert_budget(0, 'GET', '/orders/7')
+
+    def test_update_order_status(self):
+        """ Test changing an order's status """
+        # SQLite reads the previous status before the UPDATE when more than
+        # one status may move to the new one; PostgreSQL returns it instead
+        self.assert_budget(4, 'PATCH', '/orders/7', {'status': 'shipped'})
+
+    def test_update_orders_status_bulk(self):
+        """ Test changing many statuses takes one UPDATE per source status """
+        self.assert_budget(
+            5, 'PATCH', '/orders/status', {'ids': list(range(1, BATCH + 1)), 'status': 'shipped'}
+        )
+        self.assert_budget(
+            6, 'PATCH', '/orders/status', {'filter': {'user_id': 3}, 'status': 'shipped'}
+        )
+
+    def test_get_orders_by_user(self):
+        """ Test listing a user's orders """
+        self.assert_budget(1, 'GET', '/orders/user/3')
+        self.assert_budget(1, 'GET', '/orders/user/3?limit=5')
+        self.assert_budget(2, 'GET', '/orders/user/3?include=items')
+
+    def test_get_user_order_summary(self):
+        """ Test a user's summary is one lookup """
+        self.assert_budget(1, 'GET', '/users/3/order-summary')
+
+    def test_cancel_order(self):
+        """ Test canceling an order """
+        self.assert_budget(5, 'DELETE', '/orders/9')
+
+    def test_cancel_orders_bulk(self):
+        """ Test canceling many orders takes the same statements as one """
+        self.assert_budget(5, 'POST', '/orders/cancel', {'ids': list(range(100, 100 + BATCH))})
+
+    def test_get_orders_by_status(self):
+        """ Test listing orders by status loads items in chunks """
+        self.assert_budget(1 + item_chunks(ORDERS), 'GET', '/orders/status/pending')
+        self.assert_budget(2, 'GET', '/orders/status/pending?limit=100')
+
+    def test_get_order_items(self):
+        """ Test listing an order's items """
+        self.assert_budget(2, 'GET', '/orders/8/items')
@@ -0,0 +1,155 @@
+"""
+Module Docstring: TestReplicas
+
+This module contains unit tests for routing reads to replicas, using two
+SQLite files as primary and replica.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+from sqlalchemy import insert
+from app import create_app, db
+from app.models import Order
+from app.replicas import STICKY_COOKIE, ReplicaSet
+
+
+class FakeClock:
+    """ Manually advanced clock """
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestReplicaRouting(unittest.TestCase):
+    """
+    TestReplicaRouting Class
+
+    This class checks which database serves the reads of each request.
+    """
+    def setUp(self):
+        """ Create a primary and a replica holding different data """
+        self.directory = tempfile.mkdtemp()
+        self.primary = f"sqlite:///{os.path.join(self.directory, 'primary.db')}"
+        self.replica = f"sqlite:///{os.path.join(self.directory, 'replica.db')}"
+
+    def tearDown(self):
+        """ Remove the database files """
+        shutil.rmtree(self.directory)
+
+    def _create_app(self, replicas, cache_backend='none'):
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': self.primary,
+            'DB_REPLICA_URIS': replicas,
+            'ORDER_CACHE_BACKEND': cache_backend,
+        })
+        with app.app_context():
+            db.create_all()
+            if replicas == [self.replica]:
+                replica = app.extensions['replicas'].engines['replica_0']
+                db.metadata.create_all(replica)
+                with replica.begin() as connection:
+                    connection.execute(insert(Order), {
+                        'id': 1, 'user_id': 99, 'total_price': 0.0, 'status': 'PENDING',
+                        'created_at': datetime.utcnow(), 'updated_at': datetime.utcnow()
+                    })
+        return app
+
+    def _place_order(self, client):
+        response = client.post('/orders', json={
+            'user_id': 1, 'status': 'pending',
+            'items': [{'product_id': 1, 'quantity': 1, 'price': 2.0}]
+        })
+        self.assertEqual(response.status_code, 201)
+        return response
+
+    def test_reads_go_to_replica(self):
+        """ Test GET requests and lookups read from the replica """
+        app = self._create_app([self.replica])
+        self._place_order(app.test_client())
+
+        reader = app.test_client()
+        self.assertEqual(reader.get('/orders/1').get_json()['user_id'], 99)
+        response = reader.post('/orders/lookup', json={'ids': [1]})
+        self.assertEqual(response.get_json()['orders'][0]['user_id'], 99)
+        self.assertIsNone(reader.get_cookie(STICKY_COOKIE))
+
+    def test_change_feed_ignores_lagging_replica(self):
+        """ Test the change feed reads from the primary, never from a replica """
+        app = self._create_app([self.replica])
+        app.config['CHANGES_FEED_LAG_SECONDS'] = 0
+        self._place_order(app.test_client())
+
+        # The replica has not received the order placed on the primary yet
+        changes = app.test_client().get('/orders/changes').get_json()['changes']
+        self.assertEqual([change['order']['user_id'] for change in changes], [1])
+
+    def test_writer_reads_own_writes(self):
+        """ Test a client reads from the primary for a while after writing """
+        app = self._create_app([self.replica])
+        writer = app.test_client()
+        response = self._place_order(writer)
+
+        self.assertIn(f"Max-Age={app.config['DB_REPLICA_STICKY_SECONDS']}",
+                      response.headers['Set-Cookie'])
+        self.assertEqual(writer.get('/orders/1').get_json()['user_id'], 1)
+
+    def test_order_cache_holds_primary_reads_only(self):
+        """ Test a lagging replica's order is not cached for a client reading its writes """
+        app = self._create_app([self.replica], cache_backend='memory')
+        writer = app.test_client()
+        self._place_order(writer)
+        writer.patch('/orders/1', json={'status': 'shipped'})
+
+        # The replica still holds an older copy of order 1
+        self.assertEqual(app.test_client().get('/orders/1').get_json()['status'], 'pending')
+        self.assertEqual(app.extensions['order_cache'].stats()['size'], 0)
+        self.assertEqual(writer.get('/orders/1').get_json()['status'], 'shipped')
+        self.assertEqual(writer.get('/orders/1').get_json()['status'], 'shipped')
+
+    def test_failed_replica_falls_back_to_primary(self):
+        """ Test a broken replica is skipped in favour of the primary """
+        broken = f"sqlite:///{os.path.join(self.directory, 'missing', 'replica.db')}"
+        app = self._create_app([broken])
+        self._place_order(app.test_client())
+
+        response = app.test_client().get('/orders/1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['user_id'], 1)
+        health = app.test_client().get('/health').get_json()
+        self.assertFalse(health['db_replicas']['replica_0']['up'])
+
+    def test_without_replicas(self):
+        """ Test no routing cookie is set when no replica is configured """
+        app = self._create_app([])
+        response = self._place_order(app.test_client())
+        self.assertNotIn('Set-Cookie', response.headers)
+        self.assertEqual(app.test_client().get('/health').get_json()['db_replicas'], {})
+
+
+class TestReplicaSet(unittest.TestCase):
+    """
+    TestReplicaSet Class
+
+    This class contains unit tests for the replica selection.
+    """
+    def test_round_robin_skips_down_replicas(self):
+        """ Test replicas alternate and failed ones are retried later """
+        clock = FakeClock()
+        replicas = ReplicaSet({'a': None, 'b': None}, retry_seconds=10, clock=clock)
+        self.assertEqual([replicas.choose() for _ in range(4)], ['a', 'b', 'a', 'b'])
+
+        replicas.mark_down('a')
+        self.assertEqual([replicas.choose() for _ in range(2)], ['b', 'b'])
+        replicas.mark_down('b')
+        self.assertIsNone(replicas.choose())
+
+        clock.now = 10
+        self.assertEqual(replicas.status(), {'a': True, 'b': True})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+"""
+Module Docstring: utils
+
+Helpers shared by the test modules.
+"""
+
+import time
+from contextlib import contextmanager
+from sqlalchemy import event
+from app import db
+
+# Statements listed in the message of an exceeded query budget
+LISTED_STATEMENTS = 20
+
+
+@contextmanager
+def count_queries():
+    """
+    Counts the SQL statements executed on the database engine.
+
+    Yields:
+    - list: Executed statements; inspect its length once the block exits.
+    """
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        # pylint: disable=unused-argument
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+
+@contextmanager
+def query_budget(max_statements, max_seconds=None):
+    """
+    Fails when a block runs more SQL statements, or takes longer, than allowed.
+
+    Use it around the requests of an endpoint, seeded with enough rows that a
+    query per row (an N+1 pattern) would exceed the budget.
+
+    Args:
+    - max_statements (int): Largest number of statements the block may run.
+    - max_seconds (float or None): Largest wall time of the block, if any.
+
+    Yields:
+    - list: Executed statements, as for `count_queries`.
+
+    Raises:
+    - AssertionError: If the block exceeds a budget; the message lists the
+      first statements executed.
+    """
+    started = time.perf_counter()
+    with count_queries() as statements:
+        yield statements
+    elapsed = time.perf_counter() - started
+    if len(statements) > max_statements:
+        listed = statements[:LISTED_STATEMENTS]
+        raise AssertionError(
+            f"{len(statements)} SQL statements executed, budget is {max_statements}:\n"
+            + '\n'.join(f'  {statement}' for statement in listed)
+            + (f'\n  ... and {len(statements) - len(listed)} more'
+               if len(statements) > len(listed) else '')
+        )
+    if max_seconds is not None and elapsed > max_seconds:
+        raise AssertionError(f"Took {elapsed:.3f} s, budget is {max_seconds} s")